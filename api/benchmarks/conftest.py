@@ -0,0 +1,44 @@
+import os
+import sys
+import pytest
+
+# Benchmarks import the API modules directly, the same way main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+SAMPLE_TRANSCRIPT = (
+    "Ladies and gentlemen, we gather today to discuss matters of international importance. "
+    "We strongly disagree with the proposed deadline and believe this is a mistake. "
+    "The Security Council must take immediate action to address this crisis. "
+    "We know now is the time to work together to find peaceful solutions. "
+)
+
+
+@pytest.fixture(scope="session")
+def sample_video_path(tmp_path_factory):
+    """A synthetic 10 second 640x480 clip at 30 fps"""
+    import cv2
+    import numpy as np
+    path = str(tmp_path_factory.mktemp("video") / "sample.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (640, 480))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    for i in range(300):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+    return path
+
+
+@pytest.fixture(scope="session")
+def jpeg_frame():
+    """A 1280x720 frame encoded the way the video routes encode it"""
+    import numpy as np
+    from services.video_frames import encode_frame_jpeg
+    rng = np.random.default_rng(0)
+    return encode_frame_jpeg(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8))
+
+
+@pytest.fixture(scope="session")
+def large_transcript():
+    """Roughly 1 MB of meeting transcript"""
+    return SAMPLE_TRANSCRIPT * (1_000_000 // len(SAMPLE_TRANSCRIPT))
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.cultural_engine import CulturalEngine
+
+ALL_CULTURES = ["american", "japanese", "german", "chinese", "british", "french"]
+
+
+def test_analyze_cultural_context_all_cultures(benchmark):
+    engine = CulturalEngine()
+    result = benchmark(engine.analyze_cultural_context, ALL_CULTURES)
+    assert result["potential_mismatches"]
+
+
+def test_analyze_cultural_context_large_delegation_list(benchmark):
+    engine = CulturalEngine()
+    # Summit-sized query: many delegations, with repeats and unknown cultures
+    cultures = ALL_CULTURES * 8 + ["korean", "arab"] * 4
+    benchmark(engine.analyze_cultural_context, cultures)
+
+
+def test_flag_cultural_issues_in_large_text(benchmark, large_transcript):
+    engine = CulturalEngine()
+    flags = benchmark(engine.flag_cultural_issues_in_text, large_transcript, ["japanese", "american"])
+    assert flags
+
+
+def test_flag_cultural_issues_batch(benchmark, large_transcript):
+    engine = CulturalEngine()
+    # A backfill-sized batch of short texts, flagged with one matcher pass
+    texts = [large_transcript[i:i + 400] for i in range(0, min(len(large_transcript), 400 * 500), 400)]
+    cultures = [["japanese", "american"]] * len(texts)
+    flags = benchmark(engine.flag_cultural_issues_batch, texts, cultures)
+    assert len(flags) == len(texts)
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("cv2")
+
+from services.frame_pool import FramePool
+from services.video_frames import sample_video
+
+# Videos decoded at once, as from concurrent /analyze/video requests
+CONCURRENT_VIDEOS = 4
+WORKERS = max(2, os.cpu_count() or 1)
+
+
+async def with_loop_lag(decode):
+    """Run the decode coroutine while a ticker measures how late the event loop gets to run it"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    results = await decode
+    done.set()
+    await tick
+    return results, max(lags, default=0.0)
+
+
+def test_decode_inline(benchmark, sample_video_path):
+    """Baseline: the same work on the event loop, as the routes did before the frame pool"""
+    async def inline():
+        return [sample_video(sample_video_path) for _ in range(CONCURRENT_VIDEOS)]
+
+    loop = asyncio.new_event_loop()
+    lags = []
+
+    def run():
+        results, lag = loop.run_until_complete(with_loop_lag(inline()))
+        lags.append(lag)
+        return results
+
+    results = benchmark(run)
+    benchmark.extra_info.update(max_loop_lag_ms=round(max(lags) * 1000, 2))
+    loop.close()
+    assert all(len(frames) == 10 for _, frames in results)
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_decode_pool(benchmark, sample_video_path, mode):
+    pool = FramePool(mode, WORKERS)
+    loop = asyncio.new_event_loop()
+    # Workers are started and have loaded OpenCV before timing starts
+    loop.run_until_complete(pool.sample_video(sample_video_path))
+    lags = []
+
+    async def pooled():
+        return await asyncio.gather(*(pool.sample_video(sample_video_path) for _ in range(CONCURRENT_VIDEOS)))
+
+    def run():
+        results, lag = loop.run_until_complete(with_loop_lag(pooled()))
+        lags.append(lag)
+        return results
+
+    results = benchmark(run)
+    benchmark.extra_info.update(mode=mode, workers=WORKERS, max_loop_lag_ms=round(max(lags) * 1000, 2))
+    pool.stop()
+    loop.close()
+    assert all(len(frames) == 10 for _, frames in results)
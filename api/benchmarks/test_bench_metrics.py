@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.metrics import child, frame_queue_depth, http_request_duration, record_cache, record_model_call
+
+
+def test_request_metrics(benchmark):
+    """What one analyzed frame adds: the route histogram, a model call, the frame gauge and a cache lookup"""
+    def run():
+        with child(frame_queue_depth, "bench").track_inprogress():
+            record_model_call("openai_vision", "gpt-4o", 1840.0, None, 1020, 85, 765, 0.0034)
+        record_cache("encoded_payload", True)
+        child(http_request_duration, "POST", "/api/v1/analyze/video", "200").observe(2.1)
+    benchmark(run)
@@ -0,0 +1,11 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.openai_service import OpenAIService
+
+
+def test_build_facial_analysis_request(benchmark, jpeg_frame):
+    service = OpenAIService()
+    request_data = benchmark(service.build_facial_analysis_request, jpeg_frame)
+    assert request_data["messages"][1]["content"][1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
@@ -0,0 +1,39 @@
+import json
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.serialization import Encoded, dumps
+
+# Shaped like a facial analysis result; the cable and news results are larger still
+ANALYSIS = {
+    "emotions": [{"emotion": label, "confidence": 0.5 + i / 20, "participant": f"participant_{i % 3}"} for i, label in enumerate(
+        ["focused", "tense", "calm", "skeptical", "engaged", "reserved"] * 4
+    )],
+    "observable_behaviors": ["steady eye contact", "crossed arms", "leaning forward", "brief smile"] * 5,
+    "microexpressions": ["eyebrow_furrow", "lip_tightening"] * 5,
+    "overall_confidence_score": 0.74,
+    "analysis_tier": "model"
+}
+
+
+def envelopes(payload):
+    # One WebSocket event and one HTTP response carrying the same result
+    event = {"type": "facial_analysis_update", "meeting_id": "bench", "data": payload, "timestamp": "2026-01-01T00:00:00"}
+    response = {"meeting_id": "bench", "analysis": payload, "timestamp": "2026-01-01T00:00:00"}
+    return event, response
+
+
+def test_stdlib_json_twice(benchmark):
+    def run():
+        event, response = envelopes(ANALYSIS)
+        return json.dumps(event).encode(), json.dumps(response).encode()
+    benchmark(run)
+
+
+def test_orjson_encoded_once(benchmark):
+    def run():
+        event, response = envelopes(Encoded(ANALYSIS))
+        return dumps(event), dumps(response)
+    event_bytes, response_bytes = benchmark(run)
+    assert json.loads(event_bytes)["data"] == json.loads(response_bytes)["analysis"] == ANALYSIS
@@ -0,0 +1,34 @@
+import io
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.tracing import SpanExporter, Tracer
+
+
+def nested_stage(tracer: Tracer):
+    """A frame's worth of spans: one stage with two nested stages, as in frame.analyze"""
+    with tracer.span("frame.analyze", meeting_id="bench", frame=120):
+        with tracer.span("model.call", service="openai_vision") as span:
+            span.set_attributes(tokens=1105, cost_usd=0.0031)
+        with tracer.span("ws.broadcast", recipients=10):
+            pass
+
+
+def test_span_disabled(benchmark):
+    benchmark(nested_stage, Tracer(None, 0.0))
+
+
+def test_span_sampled_out(benchmark):
+    benchmark(nested_stage, Tracer(SpanExporter(stream=io.StringIO()), sample_ratio=1e-9))
+
+
+def test_span_recorded(benchmark):
+    exporter = SpanExporter(stream=io.StringIO())
+    tracer = Tracer(exporter, sample_ratio=1.0)
+
+    def run():
+        nested_stage(tracer)
+        # Export happens on the exporter thread in the API; only the buffer append is on the caller
+        exporter.buffer.clear()
+    benchmark(run)
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.simple_usage_tracker import SimpleUsageTracker
+
+
+@pytest.fixture(scope="module")
+def populated_tracker():
+    import contextlib
+    import io
+    tracker = SimpleUsageTracker()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(100_000):
+            tracker.log_request(
+                service=["openai_vision", "openai_whisper", "openai_news_analysis"][i % 3],
+                model="gpt-4o",
+                tokens=1000,
+                cost=0.005,
+                response_time_ms=850.0,
+                meeting_id=f"meeting-{i % 50}",
+                error="timeout" if i % 97 == 0 else None
+            )
+    return tracker
+
+
+def test_get_stats_at_scale(benchmark, populated_tracker):
+    stats = benchmark(populated_tracker.get_stats, 100)
+    assert stats["total_requests"] == 100_000
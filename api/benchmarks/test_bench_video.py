@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+cv2 = pytest.importorskip("cv2")
+
+from services.video_frames import read_sampled_frames, encode_frame_jpeg
+
+
+def test_read_sampled_frames(benchmark, sample_video_path):
+    def sample():
+        cap = cv2.VideoCapture(sample_video_path)
+        try:
+            return list(read_sampled_frames(cap))
+        finally:
+            cap.release()
+
+    frames = benchmark(sample)
+    assert len(frames) == 10
+
+
+def test_encode_frame_jpeg(benchmark):
+    import numpy as np
+    frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+    jpeg_bytes = benchmark(encode_frame_jpeg, frame)
+    assert jpeg_bytes[:2] == b"\xff\xd8"
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.event_stream import ConnectionManager, EventEncoder
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; sending just counts bytes"""
+
+    def __init__(self):
+        self.sent_bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        self.sent_bytes += len(message)
+
+
+@pytest.mark.parametrize("connections", [10, 500])
+def test_broadcast_many_sockets(benchmark, connections):
+    loop = asyncio.new_event_loop()
+    manager = ConnectionManager()
+    sockets = [FakeWebSocket() for _ in range(connections)]
+    for socket in sockets:
+        loop.run_until_complete(manager.connect(socket, "bench"))
+
+    event = {
+        "type": "facial_analysis_update",
+        "meeting_id": "bench",
+        "data": {"emotions": [{"emotion": "focused", "confidence": 0.8}], "overall_confidence_score": 0.7},
+        "frame": 120
+    }
+
+    benchmark(lambda: loop.run_until_complete(manager.broadcast(dict(event))))
+    loop.close()
+    assert sockets[-1].sent_bytes > 0
+
+
+class FakeBinaryWebSocket(FakeWebSocket):
+    async def send_bytes(self, message: bytes):
+        self.sent_bytes += len(message)
+
+
+@pytest.mark.parametrize("encoding,delta", [("json", False), ("json", True), ("msgpack", True)])
+def test_broadcast_encodings(benchmark, encoding, delta):
+    loop = asyncio.new_event_loop()
+    manager = ConnectionManager()
+    sockets = [FakeBinaryWebSocket() for _ in range(50)]
+    for socket in sockets:
+        loop.run_until_complete(manager.connect(socket, "bench", encoder=EventEncoder(encoding, delta)))
+
+    frames = iter(range(10 ** 9))
+
+    def broadcast():
+        frame = next(frames)
+        loop.run_until_complete(manager.broadcast({
+            "type": "facial_analysis_update",
+            "meeting_id": "bench",
+            "data": {
+                "emotions": [{"emotion": "focused", "confidence": 0.8}, {"emotion": "tense", "confidence": 0.3}],
+                "observable_behaviors": ["steady eye contact", "crossed arms"],
+                "overall_confidence_score": 0.7 + (frame % 10) / 100
+            },
+            "frame": frame
+        }))
+
+    benchmark(broadcast)
+    loop.close()
+    # Egress per event per client, to compare the encodings alongside their CPU cost
+    benchmark.extra_info["bytes_per_event"] = round(sockets[-1].sent_bytes / next(frames), 1)
+    assert sockets[-1].sent_bytes > 0
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use or by the startup warm-up, never by importing the app
+LAZY_MODULES = ("cv2", "numpy", "PIL", "openai", "supabase", "postgrest", "sqlalchemy", "yt_dlp")
+
+# Seconds the app's own modules may add to startup on top of FastAPI itself; override on slow machines
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "0.5"))
+
+PROBE = """
+import json, sys, time
+import fastapi, pydantic, starlette.applications
+start = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_app() -> dict:
+    """Import main in a fresh interpreter, timing only what the app adds beyond the framework"""
+    env = {**os.environ, "OPENAI_API_KEY": "import-test", "LOG_LEVEL": "ERROR"}
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=API_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_heavy_dependencies_are_lazy():
+    loaded = set(import_app()["modules"])
+    assert not [module for module in LAZY_MODULES if module in loaded]
+
+
+def test_import_time_budget():
+    # Best of three, so one slow run on a busy machine does not fail the check
+    seconds = min(import_app()["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS, f"importing the app took {seconds:.3f}s, budget {IMPORT_BUDGET_SECONDS}s"
@@ -5,12 +5,132 @@ load_dotenv()
 
 class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
+    # Point at a local fake OpenAI server for load and fault-injection testing
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL") or None
+    
+    # Resilience for upstream model calls
+    OPENAI_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+    OPENAI_MAX_ATTEMPTS: int = int(os.getenv("OPENAI_MAX_ATTEMPTS", "3"))
+    # Delay before a duplicate request is sent for latency-critical calls (0 disables hedging).
+    # The duplicate is billed: it is only sent with meeting budget and rate-limit headroom, and is charged to both
+    OPENAI_HEDGE_DELAY_SECONDS: float = float(os.getenv("OPENAI_HEDGE_DELAY_SECONDS", "0"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
     SUPABASE_URL: str = os.getenv("SUPABASE_URL")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY")
+    # Talk to a plain PostgREST server (e.g. the local stand-in in docker-compose.yml) instead of Supabase
+    SUPABASE_REST_URL: str = os.getenv("SUPABASE_REST_URL") or None
+    
+    # Write-behind persistence of analyses and cables
+    PERSISTENCE_MAX_QUEUE: int = int(os.getenv("PERSISTENCE_MAX_QUEUE", "10000"))
+    PERSISTENCE_BATCH_SIZE: int = int(os.getenv("PERSISTENCE_BATCH_SIZE", "100"))
+    PERSISTENCE_FLUSH_SECONDS: float = float(os.getenv("PERSISTENCE_FLUSH_SECONDS", "1.0"))
+    PERSISTENCE_MAX_RETRIES: int = int(os.getenv("PERSISTENCE_MAX_RETRIES", "5"))
+    
+    # Page sizes of the meeting timeline API
+    TIMELINE_DEFAULT_LIMIT: int = int(os.getenv("TIMELINE_DEFAULT_LIMIT", "200"))
+    TIMELINE_MAX_LIMIT: int = int(os.getenv("TIMELINE_MAX_LIMIT", "1000"))
+    TIMELINE_MAX_FIELDS: int = int(os.getenv("TIMELINE_MAX_FIELDS", "20"))
     
     # Admin configuration
     ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "diplosense-admin-2024")
     
+    # Data-driven lexicons used to flag cultural issues in text
+    CULTURAL_LEXICONS_PATH: str = os.getenv("CULTURAL_LEXICONS_PATH", os.path.join(os.path.dirname(__file__), "data", "cultural_lexicons.json"))
+    
+    # Cultural rules are loaded from the rule store, refreshed in the background and cached on disk
+    CULTURAL_RULES_CACHE_PATH: str = os.getenv("CULTURAL_RULES_CACHE_PATH", os.path.join(os.path.dirname(__file__), "data", "cache", "cultural_rules.json"))
+    CULTURAL_RULES_REFRESH_SECONDS: float = float(os.getenv("CULTURAL_RULES_REFRESH_SECONDS", "60"))
+    
+    # Usage accounting and per-meeting budget caps (0 disables the cap)
+    PRICING_TABLE_PATH: str = os.getenv("PRICING_TABLE_PATH", os.path.join(os.path.dirname(__file__), "data", "openai_pricing.json"))
+    MEETING_BUDGET_USD: float = float(os.getenv("MEETING_BUDGET_USD", "0"))
+    BUDGET_DOWNGRADE_RATIO: float = float(os.getenv("BUDGET_DOWNGRADE_RATIO", "0.8"))
+    
+    # Per-meeting and per-model rate governor (0 disables a limit)
+    GOVERNOR_MEETING_RPM: float = float(os.getenv("GOVERNOR_MEETING_RPM", "60"))
+    GOVERNOR_MEETING_TPM: float = float(os.getenv("GOVERNOR_MEETING_TPM", "150000"))
+    GOVERNOR_MEETING_USD_PER_HOUR: float = float(os.getenv("GOVERNOR_MEETING_USD_PER_HOUR", "0"))
+    GOVERNOR_MODEL_RPM: float = float(os.getenv("GOVERNOR_MODEL_RPM", "500"))
+    GOVERNOR_MODEL_TPM: float = float(os.getenv("GOVERNOR_MODEL_TPM", "300000"))
+    GOVERNOR_MODEL_USD_PER_HOUR: float = float(os.getenv("GOVERNOR_MODEL_USD_PER_HOUR", "0"))
+    GOVERNOR_QUEUE_DEADLINE_SECONDS: float = float(os.getenv("GOVERNOR_QUEUE_DEADLINE_SECONDS", "10"))
+    
+    # Bulk text analysis: batch size limit, concurrent model calls, and packing of short texts
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_PACK_MAX_CHARS: int = int(os.getenv("BATCH_PACK_MAX_CHARS", "600"))
+    BATCH_PACK_MAX_ITEMS: int = int(os.getenv("BATCH_PACK_MAX_ITEMS", "8"))
+    
+    # Long news texts are analyzed in chunks (map) and merged (reduce); chunk results are cached
+    NEWS_CHUNK_TOKENS: int = int(os.getenv("NEWS_CHUNK_TOKENS", "3000"))
+    NEWS_CHUNK_CONCURRENCY: int = int(os.getenv("NEWS_CHUNK_CONCURRENCY", "4"))
+    NEWS_CHUNK_CACHE_SIZE: int = int(os.getenv("NEWS_CHUNK_CACHE_SIZE", "2048"))
+    
+    # Local pre-classification tier that answers trivial /analyze/text snippets without GPT-4o
+    SENTIMENT_LEXICON_PATH: str = os.getenv("SENTIMENT_LEXICON_PATH", os.path.join(os.path.dirname(__file__), "data", "sentiment_lexicon.json"))
+    LOCAL_TIER_ENABLED: bool = os.getenv("LOCAL_TIER_ENABLED", "true").lower() == "true"
+    LOCAL_TIER_CONFIDENCE: float = float(os.getenv("LOCAL_TIER_CONFIDENCE", "0.8"))
+    LOCAL_TIER_MAX_TOKENS: int = int(os.getenv("LOCAL_TIER_MAX_TOKENS", "64"))
+    
+    # Server-side per-meeting aggregates of analysis results, used as cable input
+    MEETING_STATE_MAX_MEETINGS: int = int(os.getenv("MEETING_STATE_MAX_MEETINGS", "256"))
+    MEETING_STATE_IDLE_TTL_SECONDS: float = float(os.getenv("MEETING_STATE_IDLE_TTL_SECONDS", "21600"))
+    MEETING_STATE_TREND_POINTS: int = int(os.getenv("MEETING_STATE_TREND_POINTS", "60"))
+    MEETING_STATE_MAX_MOMENTS: int = int(os.getenv("MEETING_STATE_MAX_MOMENTS", "20"))
+    MEETING_STATE_MAX_EXCERPTS: int = int(os.getenv("MEETING_STATE_MAX_EXCERPTS", "5"))
+    MEETING_STATE_EXCERPT_CHARS: int = int(os.getenv("MEETING_STATE_EXCERPT_CHARS", "300"))
+    MEETING_STATE_MAX_LABELS: int = int(os.getenv("MEETING_STATE_MAX_LABELS", "50"))
+    MEETING_STATE_TOP_LABELS: int = int(os.getenv("MEETING_STATE_TOP_LABELS", "10"))
+    
+    # Incremental cable revisions: shifts that count as material, history kept, and full refresh cadence
+    CABLE_RISK_SHIFT: float = float(os.getenv("CABLE_RISK_SHIFT", "0.15"))
+    CABLE_EMOTION_SHIFT: float = float(os.getenv("CABLE_EMOTION_SHIFT", "0.2"))
+    CABLE_HISTORY_SIZE: int = int(os.getenv("CABLE_HISTORY_SIZE", "20"))
+    CABLE_FULL_REFRESH_EVERY: int = int(os.getenv("CABLE_FULL_REFRESH_EVERY", "10"))
+    
+    # WebSocket event replay for reconnecting dashboards
+    WS_REPLAY_BUFFER_SIZE: int = int(os.getenv("WS_REPLAY_BUFFER_SIZE", "500"))
+    WS_REPLAY_MAX_MEETINGS: int = int(os.getenv("WS_REPLAY_MAX_MEETINGS", "256"))
+    WS_MAX_COALESCE_MS: int = int(os.getenv("WS_MAX_COALESCE_MS", "5000"))
+    
+    # Structured logging: level per category (e.g. "openai=WARNING,frames=ERROR"), json or text output
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_MAX_FIELD_CHARS: int = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+    LOG_SAMPLE_PER_SECOND: float = float(os.getenv("LOG_SAMPLE_PER_SECOND", "1.0"))
+    LOG_SAMPLE_BURST: int = int(os.getenv("LOG_SAMPLE_BURST", "5"))
+    
+    # Tracing spans for pipeline stages: "stdout" (JSON lines), "otlp" (OTLP/HTTP JSON to a collector) or "none"
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_SAMPLE_RATIO: float = float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "diplosense-api")
+    TRACE_MAX_BUFFER: int = int(os.getenv("TRACE_MAX_BUFFER", "10000"))
+    TRACE_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "2.0"))
+    
+    # On-demand profiling through the admin API; PROFILE_REQUESTS_ENABLED allows the per-request X-Profile header
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+    PROFILE_HISTORY: int = int(os.getenv("PROFILE_HISTORY", "20"))
+    PROFILE_REQUESTS_ENABLED: bool = os.getenv("PROFILE_REQUESTS_ENABLED", "false").lower() == "true"
+    
+    # Load OpenCV, the OpenAI SDK and the cultural matrix in the background at startup instead of on first use
+    WARM_UP_ON_STARTUP: bool = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+    
+    # Worker resources: blocking-call threads, OpenAI connection pool, shutdown drain and health check limits
+    BLOCKING_POOL_THREADS: int = int(os.getenv("BLOCKING_POOL_THREADS", "32"))
+    OPENAI_POOL_CONNECTIONS: int = int(os.getenv("OPENAI_POOL_CONNECTIONS", "32"))
+    SHUTDOWN_DRAIN_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "30"))
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+    HEALTH_CHECK_CACHE_SECONDS: float = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "5"))
+    
+    # Video decode and JPEG encode pool: "thread" or "process", and concurrent decode jobs (0 = one per CPU)
+    FRAME_POOL_MODE: str = os.getenv("FRAME_POOL_MODE", "thread")
+    FRAME_POOL_WORKERS: int = int(os.getenv("FRAME_POOL_WORKERS", "0"))
+    
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     
@@ -0,0 +1,215 @@
+"""Local stand-in for the OpenAI endpoints used by OpenAIService.
+
+Serves chat completions (text and vision), Whisper transcriptions and
+translations with configurable latency distributions, injected errors and
+canned JSON, so the API can be load-tested without spending real money.
+
+    cd api && python -m loadtest.fake_openai --port 8100
+    OPENAI_BASE_URL=http://localhost:8100/v1 python main.py
+
+The active configuration can be inspected with GET /_config and changed at
+runtime with POST /_config (the posted keys are merged into it).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Dict, Any, List
+from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, PlainTextResponse
+import uvicorn
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "fake_openai_config.json")
+
+# Substrings of the system prompts in OpenAIService, used to pick a canned response
+PROMPT_KINDS = [
+    ("behavioral analysis", "vision"),
+    ("list of independent texts", "text_sentiment_packed"),
+    ("emotional tone, stress level", "audio_emotion"),
+    ("cross-cultural analysis", "text_sentiment"),
+    ("diplomatic intelligence analyst", "news"),
+    ("risk assessor", "cable_risk"),
+    ("cultural affairs expert", "cable_cultural"),
+    ("senior diplomatic analyst", "cable_summary"),
+]
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+app = FastAPI(title="Fake OpenAI", description="Local OpenAI stub for load and fault-injection testing")
+config: Dict[str, Any] = load_config(os.getenv("FAKE_OPENAI_CONFIG", DEFAULT_CONFIG_PATH))
+counters: Dict[str, int] = {"requests": 0, "errors": 0}
+
+
+def merge(base: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def sample_latency_seconds(endpoint: str) -> float:
+    spec = config["latency"].get(endpoint, {"distribution": "fixed", "ms": 0})
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "lognormal":
+        ms = random.lognormvariate(0, spec.get("sigma", 0.5)) * spec["median_ms"]
+    elif distribution == "uniform":
+        ms = random.uniform(spec["min_ms"], spec["max_ms"])
+    elif distribution == "exponential":
+        ms = random.expovariate(1 / spec["mean_ms"])
+    else:
+        ms = spec.get("ms", 0)
+    return ms / 1000
+
+
+async def simulate(endpoint: str):
+    """Sleep for a sampled latency and return an error response if one is injected"""
+    counters["requests"] += 1
+    counters[endpoint] = counters.get(endpoint, 0) + 1
+    await asyncio.sleep(sample_latency_seconds(endpoint))
+
+    errors = config["errors"]
+    if random.random() < errors.get("rate", 0.0):
+        counters["errors"] += 1
+        status = random.choice(errors.get("statuses", [500]))
+        headers = {}
+        if status == 429:
+            headers["retry-after"] = str(errors.get("retry_after_seconds", 1))
+        return JSONResponse(
+            status_code=status,
+            headers=headers,
+            content={"error": {"message": f"Injected fake error {status}", "type": "fake_error", "code": None}}
+        )
+    return None
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    tokens = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += len(content) // 4
+        elif isinstance(content, list):
+            for part in content:
+                tokens += len(part.get("text", "")) // 4 if part.get("type") == "text" else 765
+    return tokens
+
+
+def response_kind(messages: List[Dict[str, Any]]) -> str:
+    system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    for marker, kind in PROMPT_KINDS:
+        if isinstance(system_prompt, str) and marker in system_prompt:
+            return kind
+    return "default"
+
+
+def packed_response(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Answer a packed sentiment request with the canned sentiment result for every id"""
+    user_prompt = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    texts = json.loads(user_prompt[user_prompt.index("["):])
+    canned = config["responses"].get("text_sentiment", {})
+    return {"results": [{"id": text["id"], **canned} for text in texts]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    is_vision = any(
+        isinstance(m.get("content"), list) and any(p.get("type") == "image_url" for p in m["content"])
+        for m in messages
+    )
+    error = await simulate("vision" if is_vision else "chat")
+    if error:
+        return error
+
+    kind = response_kind(messages)
+    if kind == "text_sentiment_packed":
+        content = json.dumps(packed_response(messages))
+    else:
+        canned = config["responses"].get(kind, config["responses"]["default"])
+        content = canned if isinstance(canned, str) else json.dumps(canned)
+    prompt_tokens = estimate_tokens(messages)
+    completion_tokens = len(content) // 4
+
+    return JSONResponse(content={
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content}
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    })
+
+
+async def audio_response(endpoint: str, response_format: str, translate: bool):
+    error = await simulate(endpoint)
+    if error:
+        return error
+    transcription = config["transcription"]
+    if response_format == "text":
+        return PlainTextResponse(transcription["text"])
+    body = {"text": transcription["text"]}
+    if not translate:
+        body["language"] = transcription.get("language", "english")
+    return JSONResponse(content=body)
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(file: UploadFile = File(...), model: str = Form(...), response_format: str = Form("json")):
+    await file.read()
+    return await audio_response("transcriptions", response_format, translate=False)
+
+
+@app.post("/v1/audio/translations")
+async def translations(file: UploadFile = File(...), model: str = Form(...), response_format: str = Form("json")):
+    await file.read()
+    return await audio_response("translations", response_format, translate=True)
+
+
+@app.get("/_config")
+async def get_config():
+    return JSONResponse(content={"config": config, "counters": counters})
+
+
+@app.post("/_config")
+async def update_config(request: Request):
+    merge(config, await request.json())
+    return JSONResponse(content={"config": config})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake OpenAI server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--config", default=os.getenv("FAKE_OPENAI_CONFIG", DEFAULT_CONFIG_PATH))
+    parser.add_argument("--error-rate", type=float, default=None, help="Override errors.rate from the config")
+    args = parser.parse_args()
+
+    if args.config != DEFAULT_CONFIG_PATH:
+        config.clear()
+        config.update(load_config(args.config))
+    if args.error_rate is not None:
+        config["errors"]["rate"] = args.error_rate
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Asyncio load-test harness for the DiploSense API.
+
+Drives /analyze/video, /analyze/live-camera, /analyze/audio, /generate/cable
+and the WebSocket endpoint concurrently, then reports throughput and latency
+percentiles per endpoint. Run the API against the fake OpenAI server so no
+real model calls are made:
+
+    cd api && python -m loadtest.fake_openai --port 8100 &
+    OPENAI_BASE_URL=http://localhost:8100/v1 uvicorn main:app --port 8000 &
+    python -m loadtest.run_load --base-url http://localhost:8000 --duration 60 --concurrency 8
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import time
+import wave
+from collections import defaultdict
+from typing import Dict, Any, List, Callable, Awaitable
+import httpx
+
+API_PREFIX = "/api/v1"
+ENDPOINTS = ["video", "live-camera", "audio", "cable", "websocket"]
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_codes: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.ws_messages = 0
+
+    def record(self, endpoint: str, latency_ms: float, status_code: int):
+        self.latencies[endpoint].append(latency_ms)
+        self.status_codes[endpoint][status_code] += 1
+        if status_code >= 400:
+            self.errors[endpoint] += 1
+
+    def record_error(self, endpoint: str):
+        self.errors[endpoint] += 1
+        self.status_codes[endpoint][0] += 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def make_jpeg() -> bytes:
+    import cv2
+    import numpy as np
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return buffer.tobytes()
+
+
+def make_video(seconds: int = 2, fps: int = 10) -> bytes:
+    import cv2
+    import numpy as np
+    with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video:
+        path = temp_video.name
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (320, 240))
+    for _ in range(seconds * fps):
+        writer.write(np.random.randint(0, 255, (240, 320, 3), dtype=np.uint8))
+    writer.release()
+    with open(path, 'rb') as f:
+        data = f.read()
+    os.unlink(path)
+    return data
+
+
+def make_wav(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(int(seconds * rate) * 2))
+    return buffer.getvalue()
+
+
+def build_requests(client: httpx.AsyncClient) -> Dict[str, Callable[[str], Awaitable[httpx.Response]]]:
+    """Request senders per endpoint, each taking the meeting_id to send for"""
+    jpeg = make_jpeg()
+    video = make_video()
+    audio = make_wav()
+    analysis_data = json.dumps({
+        "facial": [{"emotion": "focused", "confidence": 0.8}],
+        "transcript": "We call upon the international community to support these peace efforts.",
+        "cultures": ["american", "japanese"]
+    })
+
+    return {
+        "video": lambda meeting_id: client.post(
+            f"{API_PREFIX}/analyze/video",
+            files={"video_file": ("load.mp4", video, "video/mp4")},
+            data={"meeting_id": meeting_id}
+        ),
+        "live-camera": lambda meeting_id: client.post(
+            f"{API_PREFIX}/analyze/live-camera",
+            json={"meeting_id": meeting_id, "image_data": list(jpeg)}
+        ),
+        "audio": lambda meeting_id: client.post(
+            f"{API_PREFIX}/analyze/audio",
+            files={"audio_file": ("load.wav", audio, "audio/wav")},
+            data={"meeting_id": meeting_id}
+        ),
+        "cable": lambda meeting_id: client.post(
+            f"{API_PREFIX}/generate/cable",
+            data={"meeting_id": meeting_id, "analysis_data": analysis_data}
+        ),
+    }
+
+
+async def http_worker(name: str, send: Callable[[str], Awaitable[httpx.Response]], meeting_id: str,
+                      stats: LoadStats, deadline: float, start_delay: float = 0.0):
+    await asyncio.sleep(start_delay)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await send(meeting_id)
+            stats.record(name, (time.perf_counter() - start) * 1000, response.status_code)
+        except httpx.HTTPError:
+            stats.record_error(name)
+
+
+async def websocket_worker(ws_url: str, stats: LoadStats, deadline: float, start_delay: float = 0.0):
+    import websockets
+    await asyncio.sleep(start_delay)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            async with websockets.connect(ws_url) as socket:
+                stats.record("websocket", (time.perf_counter() - start) * 1000, 101)
+                while time.monotonic() < deadline:
+                    try:
+                        await asyncio.wait_for(socket.recv(), timeout=max(0.1, deadline - time.monotonic()))
+                        stats.ws_messages += 1
+                    except asyncio.TimeoutError:
+                        break
+        except Exception:
+            stats.record_error("websocket")
+            await asyncio.sleep(1)
+
+
+def report(stats: LoadStats, elapsed: float) -> Dict[str, Any]:
+    rows = {}
+    for endpoint in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = stats.latencies[endpoint]
+        rows[endpoint] = {
+            "requests": len(latencies) + (stats.status_codes[endpoint].get(0, 0)),
+            "errors": stats.errors[endpoint],
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1) if latencies else 0.0,
+            "status_codes": dict(stats.status_codes[endpoint])
+        }
+    return {"elapsed_seconds": round(elapsed, 1), "websocket_messages": stats.ws_messages, "endpoints": rows}
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"\nLoad test finished in {result['elapsed_seconds']}s, "
+          f"{result['websocket_messages']} WebSocket messages received")
+    print(f"{'endpoint':<14}{'requests':>10}{'errors':>8}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, row in result["endpoints"].items():
+        print(f"{endpoint:<14}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>8}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+async def run(args) -> Dict[str, Any]:
+    endpoints = args.endpoints.split(",") if args.endpoints else ENDPOINTS
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=args.concurrency * len(endpoints) + 10)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        requests = build_requests(client)
+        start = time.monotonic()
+        deadline = start + args.duration
+        tasks = []
+        for endpoint in endpoints:
+            for worker in range(args.concurrency):
+                # One meeting per worker slot, so the per-meeting rate governor limits each meeting rather than
+                # the whole run; the WebSocket worker in the same slot receives that meeting's broadcasts
+                meeting_id = f"{args.meeting_id}-{worker}"
+                # Stagger worker start so the first second is not a synchronized burst
+                start_delay = random.uniform(0, args.ramp_up)
+                if endpoint == "websocket":
+                    ws_url = args.base_url.replace("http", "ws", 1) + f"{API_PREFIX}/ws/{meeting_id}"
+                    tasks.append(websocket_worker(ws_url, stats, deadline, start_delay))
+                else:
+                    tasks.append(http_worker(endpoint, requests[endpoint], meeting_id, stats, deadline, start_delay))
+        await asyncio.gather(*tasks)
+        return report(stats, time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the DiploSense API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent workers per endpoint")
+    parser.add_argument("--endpoints", default="", help=f"Comma-separated subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--meeting-id", default="loadtest", help="Prefix of the meeting ids, one per worker slot")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Start each worker after a random delay of up to this many seconds")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json-output", default="", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json_output:
+        with open(args.json_output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,30 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 import uvicorn
 from routes.analysis import router as analysis_router
 from routes.simple_usage import router as usage_router
 from routes.admin import router as admin_router
+from services.resources import DrainMiddleware, resources
+from services.serialization import ORJSONResponse
+from services.tracing import tracer
+from services.metrics import MetricsMiddleware, render_metrics
+from services.profiling import RequestProfilingMiddleware, profile_manager
 from config import settings
 
-app = FastAPI(title="DiploSense API", description="Diplomatic Intelligence Platform")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients, pools and background workers live exactly as long as the worker serves requests
+    await resources.start()
+    app.state.resources = resources
+    try:
+        yield
+    finally:
+        await resources.stop()
+
+# orjson-rendered responses everywhere, including routes that just return a dict
+app = FastAPI(title="DiploSense API", description="Diplomatic Intelligence Platform", default_response_class=ORJSONResponse,
+              lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +34,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(DrainMiddleware, resources=resources)
+
+if settings.PROFILE_REQUESTS_ENABLED:
+    app.add_middleware(RequestProfilingMiddleware, manager=profile_manager)
+
+if tracer.enabled:
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        # Root span of each request; a caller's traceparent header continues its trace
+        with tracer.span("http.request", traceparent=request.headers.get("traceparent"),
+                         method=request.method, path=request.url.path) as span:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            span.set_attributes(route=getattr(route, "path", None), status_code=response.status_code)
+            if response.status_code >= 500:
+                span.set_error(f"HTTP {response.status_code}")
+            return response
+
 # Include routers
 app.include_router(analysis_router, prefix="/api/v1", tags=["analysis"])
 app.include_router(usage_router, prefix="/api/v1", tags=["usage"])
@@ -26,9 +62,16 @@ app.include_router(admin_router, prefix="/api/v1", tags=["admin"])
 async def root():
     return {"message": "DiploSense API is running"}
 
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "diplosense-api"}
+    health = await resources.health()
+    # A degraded dependency still serves what it can; only a worker that is not ready leaves the load balancer
+    return ORJSONResponse(content=health, status_code=200 if health["status"] in ("healthy", "degraded") else 503)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
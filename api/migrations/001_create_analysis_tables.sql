@@ -0,0 +1,43 @@
+-- Tables written by SupabaseService and the write-behind persistence queue.
+-- Apply with `make db-migrate` (local supabase-db) or the Supabase SQL editor.
+
+create table if not exists analyses (
+    id bigserial primary key,
+    meeting_id text not null,
+    analysis_type text not null,
+    data jsonb not null,
+    timestamp timestamptz not null default now()
+);
+
+create index if not exists analyses_meeting_id_idx on analyses (meeting_id);
+
+create table if not exists diplomatic_cables (
+    id bigserial primary key,
+    meeting_id text not null,
+    cable_data jsonb not null,
+    timestamp timestamptz not null default now()
+);
+
+create index if not exists diplomatic_cables_meeting_id_idx on diplomatic_cables (meeting_id);
+
+create table if not exists cultural_rules (
+    culture text primary key,
+    rules jsonb not null,
+    updated_at timestamptz not null default now()
+);
+
+-- PostgREST serves requests as the anon role (PGRST_DB_ANON_ROLE in docker-compose.yml)
+do $$
+begin
+    if not exists (select 1 from pg_roles where rolname = 'anon') then
+        create role anon nologin;
+    end if;
+end
+$$;
+
+grant usage on schema public to anon;
+grant select, insert on analyses, diplomatic_cables to anon;
+grant select, insert, update on cultural_rules to anon;
+grant usage, select on sequence analyses_id_seq, diplomatic_cables_id_seq to anon;
+
+notify pgrst, 'reload schema';
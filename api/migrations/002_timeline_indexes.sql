@@ -0,0 +1,17 @@
+-- Composite indexes for the meeting timeline API, which filters by meeting and
+-- time range and pages with keyset conditions on (timestamp, id).
+-- Built concurrently so they can be added to a live database; run outside a transaction.
+
+create index concurrently if not exists analyses_meeting_timeline_idx
+    on analyses (meeting_id, timestamp, id);
+
+-- Serves timelines filtered to a few analysis types without scanning the others
+create index concurrently if not exists analyses_meeting_type_timeline_idx
+    on analyses (meeting_id, analysis_type, timestamp, id);
+
+create index concurrently if not exists diplomatic_cables_meeting_timeline_idx
+    on diplomatic_cables (meeting_id, timestamp, id);
+
+-- Both are prefixes of the composite indexes above
+drop index concurrently if exists analyses_meeting_id_idx;
+drop index concurrently if exists diplomatic_cables_meeting_id_idx;
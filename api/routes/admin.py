@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from services.serialization import ORJSONResponse
+from services.admin_auth import require_admin
+from services.profiling import ProfilerBusy, collapsed, profile_manager
+from services.resources import resources
 from pydantic import BaseModel
 from config import settings
 
@@ -12,7 +16,7 @@ class AdminLoginRequest(BaseModel):
 async def admin_login(request: AdminLoginRequest):
     """Authenticate admin user"""
     if request.password == settings.ADMIN_PASSWORD:
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "message": "Authentication successful"
         })
@@ -25,7 +29,54 @@ async def admin_login(request: AdminLoginRequest):
 @router.get("/admin/check")
 async def admin_check():
     """Health check for admin endpoints"""
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "status": "ready",
         "admin_configured": bool(settings.ADMIN_PASSWORD)
-    })
\ No newline at end of file
+    })
+
+def profile_response(profile: dict, format: str):
+    """Folded stacks for flamegraph tools, or the whole profile as JSON"""
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(profile["stacks"]))
+    return ORJSONResponse(content=profile)
+
+@router.post("/admin/profile/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu(seconds: float = 10, interval_ms: float = 0, format: str = "collapsed"):
+    """Sample this worker's CPU for N seconds and return the stacks"""
+    try:
+        profile = await profile_manager.profile_cpu(seconds, interval_ms or None)
+        profile_manager.store(profile)
+        return profile_response(profile, format)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/admin/profile/memory", dependencies=[Depends(require_admin)])
+async def profile_memory(seconds: float = 10, frames: int = 25, format: str = "json"):
+    """Trace this worker's allocations for N seconds and return what is still held, by stack and by line"""
+    try:
+        profile = await profile_manager.profile_memory(seconds, max(1, min(frames, 100)))
+        profile_manager.store(profile)
+        return profile_response(profile, format)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recent profiles on this worker, including per-request ones"""
+    return ORJSONResponse(content={"profiles": profile_manager.list()})
+
+@router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format: str = "collapsed"):
+    profile = profile_manager.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found on this worker")
+    return profile_response(profile, format)
+
+@router.post("/admin/drain", dependencies=[Depends(require_admin)])
+async def drain(timeout: float = 0):
+    """Take this worker out of rotation: refuse new analyses, wait for running ones and close WebSocket clients"""
+    return ORJSONResponse(content=await resources.drain(timeout or None))
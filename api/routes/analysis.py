@@ -1,40 +1,28 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
-from services.openai_service import OpenAIService
-from models.schemas import AnalysisRequest, AnalysisResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from services.batch_analyzer import parse_batch_items, parse_ndjson
+from services.meeting_state import meeting_state_store
+from services.persistence import write_behind_queue
+from services.event_stream import EventEncoder, connection_manager
+from services.supabase_service import get_supabase_service
+from services.resources import resources
+from services.serialization import Encoded, ORJSONResponse, dumps
+from services.structured_logging import get_logger
+from services.tracing import tracer
+from services.metrics import child, frame_queue_depth
+from config import settings
 import json
+import logging
 import asyncio
 from datetime import datetime
-from typing import List, Optional
-import cv2
-import numpy as np
-import tempfile
+from typing import Optional
 import os
 
 router = APIRouter()
-openai_service = OpenAIService()
-
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-manager = ConnectionManager()
-
+logger = get_logger("analysis")
+# Per-frame messages are sampled so long videos do not flood the log
+frame_logger = get_logger("frames")
+manager = connection_manager
 
 @router.post("/analyze/video")
 async def analyze_video(
@@ -43,61 +31,50 @@ async def analyze_video(
 ):
     """Analyze video for facial expressions and microexpressions"""
     try:
-        video_data = await video_file.read()
-        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as temp_video:
-            temp_video.write(video_data)
-            temp_video_path = temp_video.name
-
-        cap = None
-        try:
-            cap = cv2.VideoCapture(temp_video_path)
-            if not cap.isOpened():
+        with resources.temporary_path('.mp4') as temp_video_path:
+            with tracer.span("video.upload", meeting_id=meeting_id) as span:
+                video_data = await video_file.read()
+                with open(temp_video_path, 'wb') as temp_video:
+                    temp_video.write(video_data)
+                span.set_attribute("bytes", len(video_data))
+
+            # Decoding and encoding run on the frame pool, leaving the event loop free for other requests
+            try:
+                _, frames = await resources.frames.sample_video(temp_video_path)
+            except ValueError:
                 raise HTTPException(status_code=400, detail="Could not open video file")
 
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            frame_interval = max(1, total_frames // 10)  # Analyze up to 10 frames
-
-            results = []
-            for i in range(0, total_frames, frame_interval):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                if not ret:
-                    continue
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-                analysis = await openai_service.analyze_facial_expressions(buffer.tobytes())
+        results = []
+        for i, jpeg_bytes in frames:
+            with tracer.span("frame.analyze", meeting_id=meeting_id, frame=i), child(frame_queue_depth, "upload").track_inprogress():
+                analysis = await resources.openai.analyze_facial_expressions(jpeg_bytes, meeting_id)
                 results.append({"frame": i, "analysis": analysis})
+                meeting_state_store.fold(meeting_id, "facial", analysis)
                 # Send partial result via WebSocket
-                await manager.broadcast(json.dumps({
+                await manager.broadcast({
                     "type": "facial_analysis_update",
                     "meeting_id": meeting_id,
                     "data": analysis,
                     "frame": i,
                     "timestamp": datetime.now().isoformat()
-                }))
-                await asyncio.sleep(0.1)  # Small delay to avoid flooding
-
-            # Send final summary
-            await manager.broadcast(json.dumps({
-                "type": "facial_analysis_complete",
-                "meeting_id": meeting_id,
-                "data": results,
-                "timestamp": datetime.now().isoformat()
-            }))
-
-            cap.release()
-            os.unlink(temp_video_path)
-
-            return JSONResponse(content={
-                "meeting_id": meeting_id,
-                "analysis": results,
-                "timestamp": datetime.now().isoformat()
-            })
-
-        finally:
-            if cap:
-                cap.release()
-            if os.path.exists(temp_video_path):
-                os.unlink(temp_video_path)
+                })
+            await asyncio.sleep(0.1)  # Small delay to avoid flooding
+
+        write_behind_queue.enqueue_analysis(meeting_id, "video", {"frames": results})
+
+        # Send final summary
+        await manager.broadcast({
+            "type": "facial_analysis_complete",
+            "meeting_id": meeting_id,
+            "data": results,
+            "timestamp": datetime.now().isoformat()
+        }, compact_data={"frames": [result["frame"] for result in results]})
+
+        return ORJSONResponse(content={
+            "meeting_id": meeting_id,
+            "analysis": results,
+            "timestamp": datetime.now().isoformat()
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -106,24 +83,29 @@ async def analyze_video(
 async def analyze_text(
     text: str = Form(...),
     meeting_id: str = Form(...),
-    cultures: str = Form("[]")
+    cultures: str = Form("[]"),
+    force_model: bool = Form(False)
 ):
     """Analyze text for sentiment and cultural context"""
     try:
         culture_list = json.loads(cultures) if cultures else []
-        analysis = await openai_service.analyze_text_sentiment(text, culture_list)
+        analysis = await resources.openai.analyze_text_sentiment(text, culture_list, meeting_id, force_model)
+        meeting_state_store.fold(meeting_id, "text", analysis)
+        write_behind_queue.enqueue_analysis(meeting_id, "text", analysis)
+        # Encoded once for both the broadcast and the response
+        payload = Encoded(analysis)
 
         # Broadcast to WebSocket clients
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "text_analysis",
             "meeting_id": meeting_id,
-            "data": analysis,
+            "data": payload,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
-            "analysis": analysis,
+            "analysis": payload,
             "timestamp": datetime.now().isoformat()
         })
 
@@ -133,30 +115,108 @@ async def analyze_text(
 @router.post("/generate/cable")
 async def generate_cable(
     meeting_id: str = Form(...),
-    analysis_data: str = Form(...)
+    analysis_data: str = Form(None),
+    force_full: bool = Form(False)
 ):
-    """Generate diplomatic cable from analysis data"""
+    """Generate diplomatic cable from the meeting's server-side state, plus any posted analysis data"""
     try:
-        data = json.loads(analysis_data)
-        cable = await openai_service.generate_diplomatic_cable(data)
+        data = json.loads(analysis_data) if analysis_data else {}
+        meeting_summary = meeting_state_store.summary(meeting_id)
+        if meeting_summary is None and not data:
+            raise HTTPException(status_code=400, detail="No analysis data posted and no analyses recorded for this meeting")
+        if meeting_summary is not None:
+            # The compact running summary replaces re-sending every raw result, and only
+            # sections whose inputs changed materially since the last revision are regenerated
+            cable = await resources.cable_reviser.revise(meeting_id, meeting_summary, data, force_full)
+        else:
+            cable = await resources.openai.generate_diplomatic_cable(data, meeting_id)
+        if "error" not in cable and not cable.get("revision", {}).get("unchanged"):
+            write_behind_queue.enqueue_cable(meeting_id, cable)
+        payload = Encoded(cable)
 
         # Broadcast to WebSocket clients
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "diplomatic_cable",
             "meeting_id": meeting_id,
-            "data": cable,
+            "data": payload,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
-            "cable": cable,
+            "cable": payload,
             "timestamp": datetime.now().isoformat()
         })
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/meetings/{meeting_id}/state")
+async def get_meeting_state(meeting_id: str):
+    """Get the running aggregates recorded for a meeting"""
+    summary = meeting_state_store.summary(meeting_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No analyses recorded for this meeting")
+    return ORJSONResponse(content=summary)
+
+@router.delete("/meetings/{meeting_id}/state")
+async def clear_meeting_state(meeting_id: str):
+    """Forget the running aggregates recorded for a meeting"""
+    if not meeting_state_store.clear(meeting_id):
+        raise HTTPException(status_code=404, detail="No analyses recorded for this meeting")
+    return ORJSONResponse(content={"meeting_id": meeting_id, "cleared": True})
+
+@router.get("/meetings/{meeting_id}/timeline")
+async def get_meeting_timeline(meeting_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                               types: Optional[str] = None, fields: Optional[str] = None,
+                               cursor: Optional[str] = None, limit: Optional[int] = None, order: str = "asc"):
+    """Page through a meeting's stored analyses, optionally filtered by time range and type"""
+    if not (settings.SUPABASE_URL or settings.SUPABASE_REST_URL):
+        raise HTTPException(status_code=503, detail="Analysis persistence is not configured")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    limit = limit or settings.TIMELINE_DEFAULT_LIMIT
+    if not 1 <= limit <= settings.TIMELINE_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {settings.TIMELINE_MAX_LIMIT}")
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if field_list and len(field_list) > settings.TIMELINE_MAX_FIELDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.TIMELINE_MAX_FIELDS} fields can be projected")
+
+    try:
+        for bound in (start, end):
+            if bound:
+                datetime.fromisoformat(bound)
+        page = await get_supabase_service().get_meeting_timeline(
+            meeting_id,
+            start=start,
+            end=end,
+            analysis_types=[t.strip() for t in types.split(",") if t.strip()] if types else None,
+            fields=field_list,
+            cursor=cursor,
+            limit=limit,
+            descending=order == "desc"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if "error" in page:
+        raise HTTPException(status_code=502, detail=f"Timeline query failed: {page['error']}")
+    return ORJSONResponse(content={"meeting_id": meeting_id, **page})
+
+@router.get("/meetings/{meeting_id}/cable/revisions")
+async def list_cable_revisions(meeting_id: str):
+    """List the cable revisions kept for a meeting"""
+    return ORJSONResponse(content={"meeting_id": meeting_id, "revisions": resources.cable_reviser.list_revisions(meeting_id)})
+
+@router.get("/meetings/{meeting_id}/cable/revisions/{version}")
+async def get_cable_revision(meeting_id: str, version: int):
+    """Get one cable revision of a meeting"""
+    cable = resources.cable_reviser.get_revision(meeting_id, version)
+    if cable is None:
+        raise HTTPException(status_code=404, detail="Cable revision not found")
+    return ORJSONResponse(content={"meeting_id": meeting_id, "cable": cable})
+
 @router.post("/analyze/video-url")
 async def analyze_video_url(request: dict):
     """Analyze video from URL (YouTube, Vimeo, direct video files)"""
@@ -167,7 +227,7 @@ async def analyze_video_url(request: dict):
         if not video_url:
             raise HTTPException(status_code=400, detail="video_url is required")
         
-        print(f"[URL ANALYSIS] Starting analysis for URL: {video_url}")
+        logger.info("Starting video URL analysis", meeting_id=meeting_id, video_url=video_url)
         
         # Import yt-dlp for video downloading
         try:
@@ -176,137 +236,137 @@ async def analyze_video_url(request: dict):
             raise HTTPException(status_code=500, detail="yt-dlp not installed. Please install yt-dlp for URL video analysis.")
         
         # Create temporary directory for video download
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with resources.temporary_directory() as temp_dir:
             temp_video_path = None
             
             try:
                 # Check if this is a direct video file URL
                 is_direct_video = any(video_url.lower().endswith(ext) for ext in ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v'])
                 
-                if is_direct_video:
-                    print(f"[URL ANALYSIS] Direct video URL detected, downloading directly...")
-                    # Use requests to download direct video files
-                    import requests
+                # Download stage: fetching the file (or resolving and fetching it with yt-dlp)
+                with tracer.span("video.download", meeting_id=meeting_id, method="direct" if is_direct_video else "yt-dlp") as download_span:
+                    if is_direct_video:
+                        logger.info("Downloading direct video URL", meeting_id=meeting_id)
+                        # Use requests to download direct video files
+                        import requests
                     
-                    try:
-                        response = requests.get(video_url, stream=True, verify=False, timeout=30)
-                        response.raise_for_status()
+                        try:
+                            response = requests.get(video_url, stream=True, verify=False, timeout=30)
+                            response.raise_for_status()
                         
-                        # Determine file extension from URL
-                        file_ext = video_url.split('.')[-1].lower()
-                        temp_video_path = os.path.join(temp_dir, f'video.{file_ext}')
+                            # Determine file extension from URL
+                            file_ext = video_url.split('.')[-1].lower()
+                            temp_video_path = os.path.join(temp_dir, f'video.{file_ext}')
                         
-                        with open(temp_video_path, 'wb') as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                f.write(chunk)
+                            with open(temp_video_path, 'wb') as f:
+                                for chunk in response.iter_content(chunk_size=8192):
+                                    f.write(chunk)
                         
-                        print(f"[URL ANALYSIS] Direct video downloaded successfully")
-                        video_title = video_url.split('/')[-1]
+                            logger.info("Direct video downloaded", meeting_id=meeting_id)
+                            video_title = video_url.split('/')[-1]
                         
-                    except Exception as e:
-                        print(f"[URL ANALYSIS] Direct download failed: {str(e)}")
-                        raise HTTPException(status_code=400, detail=f"Failed to download video file directly: {str(e)}")
-                else:
-                    # Configure yt-dlp options with better compatibility
-                    ydl_opts = {
-                        'outtmpl': os.path.join(temp_dir, 'video.%(ext)s'),
-                        'format': 'best[height<=720]/best',  # Limit to 720p for faster processing
-                        'quiet': True,  # Reduce noise in logs
-                        'no_warnings': True,
-                        'extractaudio': False,
-                        'writesubtitles': False,
-                        'writeautomaticsub': False,
-                        'ignoreerrors': True,
-                        # Add user agent and other headers to avoid 403 errors
-                        'http_headers': {
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                        },
-                        # SSL and certificate options
-                        'nocheckcertificate': True,
-                        'prefer_insecure': True,  # Try insecure connections first
-                        'youtube_include_dash_manifest': False,
-                        # Additional retry options
-                        'retries': 3,
-                        'fragment_retries': 3,
-                    }
-                    
-                    # First, try to extract info without downloading to validate URL
-                    print(f"[URL ANALYSIS] Extracting video info...")
-                    with yt_dlp.YoutubeDL({'quiet': True, 'nocheckcertificate': True}) as ydl:
-                        try:
-                            info_check = ydl.extract_info(video_url, download=False)
-                            if info_check is None:
-                                raise HTTPException(status_code=400, detail="Unable to extract video information. The URL may be invalid, private, or not supported.")
-                            print(f"[URL ANALYSIS] Video info extracted successfully: {info_check.get('title', 'Unknown')}")
                         except Exception as e:
-                            print(f"[URL ANALYSIS] Info extraction failed: {str(e)}")
-                            raise HTTPException(status_code=400, detail=f"Unable to access video. Error: {str(e)}")
+                            logger.warning("Direct video download failed", meeting_id=meeting_id, error=str(e))
+                            raise HTTPException(status_code=400, detail=f"Failed to download video file directly: {str(e)}")
+                    else:
+                        # Configure yt-dlp options with better compatibility
+                        ydl_opts = {
+                            'outtmpl': os.path.join(temp_dir, 'video.%(ext)s'),
+                            'format': 'best[height<=720]/best',  # Limit to 720p for faster processing
+                            'quiet': True,  # Reduce noise in logs
+                            'no_warnings': True,
+                            'extractaudio': False,
+                            'writesubtitles': False,
+                            'writeautomaticsub': False,
+                            'ignoreerrors': True,
+                            # Add user agent and other headers to avoid 403 errors
+                            'http_headers': {
+                                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                            },
+                            # SSL and certificate options
+                            'nocheckcertificate': True,
+                            'prefer_insecure': True,  # Try insecure connections first
+                            'youtube_include_dash_manifest': False,
+                            # Additional retry options
+                            'retries': 3,
+                            'fragment_retries': 3,
+                        }
+                    
+                        # First, try to extract info without downloading to validate URL
+                        with yt_dlp.YoutubeDL({'quiet': True, 'nocheckcertificate': True}) as ydl:
+                            try:
+                                info_check = ydl.extract_info(video_url, download=False)
+                                if info_check is None:
+                                    raise HTTPException(status_code=400, detail="Unable to extract video information. The URL may be invalid, private, or not supported.")
+                                logger.info("Video info extracted", meeting_id=meeting_id, title=info_check.get("title", "Unknown"))
+                            except Exception as e:
+                                logger.warning("Video info extraction failed", meeting_id=meeting_id, error=str(e))
+                                raise HTTPException(status_code=400, detail=f"Unable to access video. Error: {str(e)}")
                     
-                    # Download video
-                    print(f"[URL ANALYSIS] Starting video download...")
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(video_url, download=True)
+                        # Download video
+                        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                            info = ydl.extract_info(video_url, download=True)
                         
-                        # Check if info extraction was successful
-                        if info is None:
-                            raise HTTPException(status_code=400, detail="Failed to extract video information during download.")
+                            # Check if info extraction was successful
+                            if info is None:
+                                raise HTTPException(status_code=400, detail="Failed to extract video information during download.")
                         
-                        video_title = info.get('title', 'Unknown Video') if isinstance(info, dict) else 'Unknown Video'
-                        print(f"[URL ANALYSIS] Video downloaded: {video_title}")
+                            video_title = info.get('title', 'Unknown Video') if isinstance(info, dict) else 'Unknown Video'
+                            logger.info("Video downloaded", meeting_id=meeting_id, title=video_title)
                         
-                        # Find the downloaded file
-                        for file in os.listdir(temp_dir):
-                            if file.startswith('video.'):
-                                temp_video_path = os.path.join(temp_dir, file)
-                                break
+                            # Find the downloaded file
+                            for file in os.listdir(temp_dir):
+                                if file.startswith('video.'):
+                                    temp_video_path = os.path.join(temp_dir, file)
+                                    break
+                
+                    if temp_video_path and os.path.exists(temp_video_path):
+                        download_span.set_attribute("bytes", os.path.getsize(temp_video_path))
                 
                 if not temp_video_path or not os.path.exists(temp_video_path):
                     # Check what files were actually created
                     created_files = os.listdir(temp_dir) if os.path.exists(temp_dir) else []
-                    print(f"[URL ANALYSIS] No video file found. Created files: {created_files}")
+                    logger.error("No video file found after download", meeting_id=meeting_id, created_files=created_files)
                     raise HTTPException(status_code=400, detail=f"Failed to download video from URL. No video file was created. This may be due to: 1) Invalid URL, 2) Video access restrictions, 3) Unsupported format.")
                 
-                # Analyze the downloaded video
-                cap = cv2.VideoCapture(temp_video_path)
-                if not cap.isOpened():
+                # Analyze the downloaded video; decoding and encoding run on the frame pool
+                try:
+                    info, frames = await resources.frames.sample_video(temp_video_path)
+                except ValueError:
                     raise HTTPException(status_code=400, detail="Could not open downloaded video file")
-                
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                frame_interval = max(1, total_frames // 10)  # Analyze up to 10 frames
+                total_frames, fps = info["total_frames"], info["fps"]
                 
                 results = []
-                for i in range(0, total_frames, frame_interval):
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                    ret, frame = cap.read()
-                    if not ret:
-                        continue
-                    
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-                    analysis = await openai_service.analyze_facial_expressions(buffer.tobytes())
-                    
-                    frame_result = {
-                        "frame": i, 
-                        "analysis": analysis,
-                        "timestamp": i / cap.get(cv2.CAP_PROP_FPS) if cap.get(cv2.CAP_PROP_FPS) > 0 else i
-                    }
-                    results.append(frame_result)
-                    
-                    # Send partial result via WebSocket
-                    await manager.broadcast(json.dumps({
-                        "type": "facial_analysis_update",
-                        "meeting_id": meeting_id,
-                        "data": analysis,
-                        "frame": i,
-                        "video_url": video_url,
-                        "video_title": video_title,
-                        "timestamp": datetime.now().isoformat()
-                    }))
+                for i, jpeg_bytes in frames:
+                    with tracer.span("frame.analyze", meeting_id=meeting_id, frame=i), child(frame_queue_depth, "video_url").track_inprogress():
+                        analysis = await resources.openai.analyze_facial_expressions(jpeg_bytes, meeting_id)
+                        
+                        frame_result = {
+                            "frame": i, 
+                            "analysis": analysis,
+                            "timestamp": i / fps if fps > 0 else i
+                        }
+                        results.append(frame_result)
+                        meeting_state_store.fold(meeting_id, "facial", analysis)
+                        
+                        # Send partial result via WebSocket
+                        await manager.broadcast({
+                            "type": "facial_analysis_update",
+                            "meeting_id": meeting_id,
+                            "data": analysis,
+                            "frame": i,
+                            "video_url": video_url,
+                            "video_title": video_title,
+                            "timestamp": datetime.now().isoformat()
+                        })
                     await asyncio.sleep(0.1)  # Small delay to avoid flooding
                 
-                cap.release()
+                write_behind_queue.enqueue_analysis(meeting_id, "video_url", {
+                    "video_url": video_url, "video_title": video_title, "frames": results
+                })
                 
                 # Send final summary
-                await manager.broadcast(json.dumps({
+                await manager.broadcast({
                     "type": "video_url_analysis_complete",
                     "meeting_id": meeting_id,
                     "data": {
@@ -316,9 +376,14 @@ async def analyze_video_url(request: dict):
                         "total_frames": total_frames
                     },
                     "timestamp": datetime.now().isoformat()
-                }))
+                }, compact_data={
+                    "frames": [result["frame"] for result in results],
+                    "video_url": video_url,
+                    "video_title": video_title,
+                    "total_frames": total_frames
+                })
                 
-                return JSONResponse(content={
+                return ORJSONResponse(content={
                     "meeting_id": meeting_id,
                     "video_url": video_url,
                     "video_title": video_title,
@@ -358,10 +423,10 @@ async def analyze_news(request: dict):
         if len(text.strip()) < 50:
             raise HTTPException(status_code=400, detail="Text must be at least 50 characters long for meaningful analysis")
         
-        print(f"[NEWS ANALYSIS] Starting analysis for {len(text)} characters of text")
+        logger.info("Starting news analysis", characters=len(text), analysis_type=analysis_type)
         
         # Use OpenAI to analyze the text for diplomatic intelligence
-        analysis = await openai_service.analyze_news_text(text, analysis_type)
+        analysis = await resources.openai.analyze_news_text(text, analysis_type)
         
         # Structure the response
         result = {
@@ -370,17 +435,73 @@ async def analyze_news(request: dict):
             "analysis": analysis,
             "timestamp": datetime.now().isoformat()
         }
+        write_behind_queue.enqueue_analysis(request.get("meeting_id") or "news_analysis", "news", result)
         
-        print(f"[NEWS ANALYSIS] Analysis completed successfully")
         
-        return JSONResponse(content=result)
+        return ORJSONResponse(content=result)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[NEWS ANALYSIS] Error: {str(e)}")
+        logger.error("News analysis failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/analyze/batch")
+async def analyze_batch(request: Request):
+    """Analyze many texts at once and stream one NDJSON result line per item.
+
+    Accepts a JSON array of items, a JSON object {"items": [...], "meeting_id",
+    "cultures", "kind"}, an NDJSON body, or a multipart upload with an NDJSON
+    `batch_file`. Each item is a string or {"id", "text", "kind", "cultures"};
+    kind is "text" (sentiment) or "news". Confident trivial texts are answered
+    by the local tier unless force_model is true.
+    """
+    content_type = request.headers.get("content-type", "")
+    options = dict(request.query_params)
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            batch_file = form.get("batch_file")
+            if batch_file is None:
+                raise HTTPException(status_code=400, detail="batch_file is required")
+            records = parse_ndjson(await batch_file.read())
+            options.update({key: value for key, value in form.items() if key != "batch_file"})
+        elif "ndjson" in content_type:
+            records = parse_ndjson(await request.body())
+        else:
+            body = await request.json()
+            if isinstance(body, dict):
+                options.update({key: value for key, value in body.items() if key != "items"})
+                body = body.get("items", [])
+            if not isinstance(body, list):
+                raise HTTPException(status_code=400, detail="items must be a JSON array")
+            records = body
+
+        default_cultures = options.get("cultures", [])
+        if isinstance(default_cultures, str):
+            default_cultures = json.loads(default_cultures)
+        items = parse_batch_items(records, options.get("kind", "text"), default_cultures)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError too
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch contains no items")
+
+    meeting_id = options.get("meeting_id") or "batch_analysis"
+    force_model = str(options.get("force_model", "false")).lower() == "true"
+    logger.info("Analyzing batch", meeting_id=meeting_id, items=len(items))
+
+    async def stream_results():
+        async for result in resources.batch_analyzer.run(items, meeting_id, force_model):
+            if result["type"] == "item":
+                write_behind_queue.enqueue_analysis(meeting_id, f"batch_{result['kind']}", result)
+            yield dumps(result) + b"\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @router.post("/analyze/audio")
 async def analyze_audio(
     audio_file: UploadFile = File(...),
@@ -391,12 +512,12 @@ async def analyze_audio(
         audio_data = await audio_file.read()
         
         # Transcribe audio using OpenAI Whisper with language detection and translation
-        transcription_result = await openai_service.transcribe_audio(audio_data, meeting_id)
+        transcription_result = await resources.openai.transcribe_audio(audio_data, meeting_id)
         
         # Analyze emotion from transcript if available
         emotion_analysis = None
         if transcription_result.get("english_translation"):
-            emotion_analysis = await openai_service.analyze_audio_emotion(audio_data)
+            emotion_analysis = await resources.openai.analyze_audio_emotion(audio_data, meeting_id)
         
         result = {
             "transcript": transcription_result.get("english_translation", ""),
@@ -406,18 +527,21 @@ async def analyze_audio(
             "emotion_analysis": emotion_analysis,
             "timestamp": datetime.now().isoformat()
         }
+        meeting_state_store.fold(meeting_id, "audio", result)
+        write_behind_queue.enqueue_analysis(meeting_id, "audio", result)
+        payload = Encoded(result)
 
         # Broadcast to WebSocket clients
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "audio_analysis",
             "meeting_id": meeting_id,
-            "data": result,
+            "data": payload,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
-            "analysis": result,
+            "analysis": payload,
             "transcript": result["transcript"],
             "timestamp": datetime.now().isoformat()
         })
@@ -435,87 +559,51 @@ async def extract_and_analyze_frame(video_source: str, frame_progress: float):
         else:
             video_path = video_source
             
-        # Open video file
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise Exception(f"Could not open video file: {video_path}")
+        # Seeking, decoding and encoding run on the frame pool
+        info, (target_frame, jpeg_bytes) = await resources.frames.extract_frame(video_path, frame_progress)
+        total_frames, fps = info["total_frames"], info["fps"]
+        current_time = target_frame / fps if fps > 0 else 0
+        
+        frame_logger.sampled("Extracted demo frame", frame=target_frame, total_frames=total_frames, progress=round(frame_progress, 3))
+        
+        # Analyze visual content with OpenAI
+        with child(frame_queue_depth, "demo_video").track_inprogress():
+            analysis = await resources.openai.analyze_facial_expressions(jpeg_bytes, "demo_video")
+        
+        # Extract and transcribe audio segment (always attempt this)
+        audio_transcript = await extract_and_transcribe_audio(video_path, current_time, fps)
+        if audio_transcript:
+            analysis["transcript"] = audio_transcript
+            frame_logger.sampled("Audio transcript extracted", level=logging.DEBUG, frame=target_frame, transcript=audio_transcript)
+        else:
+            frame_logger.sampled("No audio transcript extracted", time_seconds=round(current_time, 1))
+            # Add sample transcript for demo purposes to show transcript functionality
+            sample_transcripts = [
+                "Ladies and gentlemen, we gather today to discuss matters of international importance.",
+                "The current situation requires careful diplomatic consideration and mutual respect.",
+                "We must work together to find peaceful solutions to our shared challenges.",
+                "The international community has a responsibility to maintain stability and peace.",
+                "These negotiations are critical for the future of our bilateral relations.",
+                "We strongly urge all parties to exercise restraint and engage in constructive dialogue.",
+                "The Security Council must take immediate action to address this crisis.",
+                "We reject any attempts to undermine the sovereignty of nation states.",
+                "This agreement represents a significant step forward in our cooperation.",
+                "We call upon the international community to support these peace efforts."
+            ]
+            # Use transcript based on time progression through the video
+            transcript_index = int((current_time / 8) % len(sample_transcripts))  # Change every 8 seconds
+            analysis["transcript"] = sample_transcripts[transcript_index]
+        
+        
+        # Add frame metadata
+        analysis["frame_time"] = current_time
+        analysis["frame_number"] = target_frame
+        analysis["total_frames"] = total_frames
+        
+        return analysis
         
-        try:
-            # Calculate frame position based on progress
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            target_frame = int(total_frames * frame_progress)
-            current_time = target_frame / fps
-            
-            # Ensure we don't exceed video bounds
-            if target_frame >= total_frames:
-                target_frame = total_frames - 1
-                current_time = target_frame / fps if fps > 0 else 0
-                print(f"[VIDEO ANALYSIS] Adjusted target frame to {target_frame} (video end)")
-            
-            # Set frame position
-            cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
-            ret, frame = cap.read()
-            
-            if not ret:
-                # Try to get the last available frame
-                cap.set(cv2.CAP_PROP_POS_FRAMES, total_frames - 10)  # Go back 10 frames
-                ret, frame = cap.read()
-                if not ret:
-                    raise Exception(f"Could not read any frame near position {target_frame}")
-                target_frame = total_frames - 10
-                current_time = target_frame / fps if fps > 0 else 0
-            
-            # Encode frame as JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-            
-            print(f"[VIDEO ANALYSIS] Extracted frame {target_frame}/{total_frames} from {video_path}")
-            print(f"[VIDEO ANALYSIS] Frame at {frame_progress*100:.1f}% progress, calling OpenAI...")
-            
-            # Analyze visual content with OpenAI
-            analysis = await openai_service.analyze_facial_expressions(buffer.tobytes(), "demo_video")
-            
-            # Extract and transcribe audio segment (always attempt this)
-            print(f"[VIDEO ANALYSIS] Attempting audio extraction at time {current_time:.1f}s")
-            audio_transcript = await extract_and_transcribe_audio(video_path, current_time, fps)
-            if audio_transcript:
-                analysis["transcript"] = audio_transcript
-                print(f"[VIDEO ANALYSIS] Audio transcript extracted: {audio_transcript[:100]}...")
-            else:
-                print(f"[VIDEO ANALYSIS] No audio transcript extracted for time {current_time:.1f}s")
-                # Add sample transcript for demo purposes to show transcript functionality
-                sample_transcripts = [
-                    "Ladies and gentlemen, we gather today to discuss matters of international importance.",
-                    "The current situation requires careful diplomatic consideration and mutual respect.",
-                    "We must work together to find peaceful solutions to our shared challenges.",
-                    "The international community has a responsibility to maintain stability and peace.",
-                    "These negotiations are critical for the future of our bilateral relations.",
-                    "We strongly urge all parties to exercise restraint and engage in constructive dialogue.",
-                    "The Security Council must take immediate action to address this crisis.",
-                    "We reject any attempts to undermine the sovereignty of nation states.",
-                    "This agreement represents a significant step forward in our cooperation.",
-                    "We call upon the international community to support these peace efforts."
-                ]
-                # Use transcript based on time progression through the video
-                transcript_index = int((current_time / 8) % len(sample_transcripts))  # Change every 8 seconds
-                analysis["transcript"] = sample_transcripts[transcript_index]
-                print(f"[VIDEO ANALYSIS] Using sample transcript for demo: {analysis['transcript'][:50]}...")
-            
-            print(f"[VIDEO ANALYSIS] OpenAI analysis completed for frame {target_frame}")
-            
-            # Add frame metadata
-            analysis["frame_time"] = current_time
-            analysis["frame_number"] = target_frame
-            analysis["total_frames"] = total_frames
-            
-            cap.release()
-            return analysis
-            
-        finally:
-            cap.release()
-            
     except Exception as e:
-        print(f"Error extracting and analyzing frame: {e}")
+        logger.error("Extracting and analyzing demo frame failed", video_source=video_source, error=str(e))
         # Return fallback analysis
         return {
             "frame_time": frame_progress * 30,
@@ -531,47 +619,41 @@ async def extract_and_analyze_frame(video_source: str, frame_progress: float):
 async def extract_and_transcribe_audio(video_path: str, current_time: float, fps: float):
     """Extract audio segment from video and transcribe with Whisper"""
     try:
-        import tempfile
         import subprocess
         
-        # Create temporary audio file for this segment
         # Extract 2-second audio clip around current time
         start_time = max(0, current_time - 1)  # 1 second before
         duration = 2  # 2 seconds total
         
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            temp_audio_path = temp_audio.name
-        
-        # Use ffmpeg to extract audio segment
-        ffmpeg_cmd = [
-            'ffmpeg', '-i', video_path,
-            '-ss', str(start_time),
-            '-t', str(duration),
-            '-acodec', 'pcm_s16le',
-            '-ar', '16000',
-            '-ac', '1',
-            '-y',  # Overwrite output file
-            temp_audio_path
-        ]
-        
-        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"[AUDIO] FFmpeg error: {result.stderr}")
-            return None
-        
-        # Check if audio file has content
-        if os.path.getsize(temp_audio_path) < 1000:  # Less than 1KB, probably silent
-            os.unlink(temp_audio_path)
-            return None
-        
-        print(f"[AUDIO] Extracted {duration}s audio segment at {current_time:.1f}s, transcribing...")
-        
-        # Transcribe with OpenAI Whisper
-        with open(temp_audio_path, 'rb') as audio_file:
-            transcription_result = await openai_service.transcribe_audio(audio_file.read(), "demo_video")
-        
-        # Clean up temp file
-        os.unlink(temp_audio_path)
+        # Temporary audio file for this segment, removed on every path out
+        with resources.temporary_path('.wav') as temp_audio_path:
+            # Use ffmpeg to extract audio segment
+            ffmpeg_cmd = [
+                'ffmpeg', '-i', video_path,
+                '-ss', str(start_time),
+                '-t', str(duration),
+                '-acodec', 'pcm_s16le',
+                '-ar', '16000',
+                '-ac', '1',
+                '-y',  # Overwrite output file
+                temp_audio_path
+            ]
+            
+            # ffmpeg does the decoding in its own process; waiting for it happens off the event loop
+            with tracer.span("audio.extract", time_seconds=round(current_time, 1)):
+                result = await asyncio.to_thread(subprocess.run, ffmpeg_cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                logger.warning("FFmpeg audio extraction failed", stderr=result.stderr)
+                return None
+            
+            # Check if audio file has content
+            if os.path.getsize(temp_audio_path) < 1000:  # Less than 1KB, probably silent
+                return None
+            
+            # Transcribe with OpenAI Whisper
+            with open(temp_audio_path, 'rb') as audio_file:
+                audio_data = audio_file.read()
+        transcription_result = await resources.openai.transcribe_audio(audio_data, "demo_video")
         
         # Use English translation for consistency
         transcript = transcription_result.get("english_translation", "")
@@ -579,16 +661,14 @@ async def extract_and_transcribe_audio(video_path: str, current_time: float, fps
             detected_language = transcription_result.get("detected_language", "unknown")
             is_translated = transcription_result.get("is_translated", False)
             
-            if is_translated:
-                print(f"[AUDIO] Transcription (translated from {detected_language}): {transcript}")
-            else:
-                print(f"[AUDIO] Transcription: {transcript}")
+            frame_logger.sampled("Audio segment transcribed", level=logging.DEBUG, time_seconds=round(current_time, 1),
+                                 language=detected_language, translated=is_translated, transcript=transcript)
             return transcript.strip()
         
         return None
         
     except Exception as e:
-        print(f"Error in audio transcription: {e}")
+        logger.error("Audio segment transcription failed", error=str(e))
         return None
 
 @router.post("/analyze/demo-video")
@@ -600,7 +680,7 @@ async def analyze_demo_video(request: dict):
         frame_progress = request.get("frame_progress", 0)
         
         # Send video analysis update
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "video_analysis_progress",
             "meeting_id": meeting_id,
             "data": {
@@ -609,21 +689,23 @@ async def analyze_demo_video(request: dict):
                 "status": "analyzing"
             },
             "timestamp": datetime.now().isoformat()
-        }))
+        })
         
         # Extract and analyze actual video frame
         frame_analysis = await extract_and_analyze_frame(video_source, frame_progress)
+        meeting_state_store.fold(meeting_id, "facial", frame_analysis)
+        write_behind_queue.enqueue_analysis(meeting_id, "demo_video_frame", frame_analysis)
         
         # Send facial analysis update
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "facial_analysis_update",
             "meeting_id": meeting_id,
             "data": frame_analysis,
             "frame_progress": frame_progress,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
             "analysis": frame_analysis,
             "progress": frame_progress,
@@ -631,7 +713,7 @@ async def analyze_demo_video(request: dict):
         })
         
     except Exception as e:
-        print(f"Error in demo video analysis: {e}")
+        logger.error("Demo video analysis failed", meeting_id=meeting_id, error=str(e))
         # Fall back to mock data if real analysis fails
         frame_analysis = {
             "frame_time": frame_progress * 30,
@@ -645,15 +727,15 @@ async def analyze_demo_video(request: dict):
             "error": f"Fallback to mock data: {str(e)}"
         }
         
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "facial_analysis_update",
             "meeting_id": meeting_id,
             "data": frame_analysis,
             "frame_progress": frame_progress,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
             "analysis": frame_analysis,
             "progress": frame_progress,
@@ -674,33 +756,36 @@ async def analyze_live_camera(request: dict):
         # Convert image data back to bytes
         image_bytes = bytes(image_data)
         
-        print(f"[LIVE CAMERA] Received frame for analysis, size: {len(image_bytes)} bytes")
         
         # Analyze with OpenAI
-        analysis = await openai_service.analyze_facial_expressions(image_bytes, meeting_id)
+        with child(frame_queue_depth, "live_camera").track_inprogress():
+            analysis = await resources.openai.analyze_facial_expressions(image_bytes, meeting_id, latency_critical=True)
+        meeting_state_store.fold(meeting_id, "facial", analysis)
         
         # Add live metadata
         analysis["source"] = "live_camera"
         analysis["timestamp"] = timestamp
+        write_behind_queue.enqueue_analysis(meeting_id, "live_camera", analysis)
+        payload = Encoded(analysis)
         
         # Send facial analysis update via WebSocket
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "facial_analysis_update",
             "meeting_id": meeting_id,
-            "data": analysis,
+            "data": payload,
             "timestamp": timestamp
-        }))
+        })
         
-        print(f"[LIVE CAMERA] Analysis completed and broadcasted")
+        frame_logger.sampled("Live camera frame analyzed", meeting_id=meeting_id, image_bytes=len(image_bytes))
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
-            "analysis": analysis,
+            "analysis": payload,
             "timestamp": timestamp
         })
         
     except Exception as e:
-        print(f"Error in live camera analysis: {e}")
+        logger.error("Live camera analysis failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/demo/videos")
@@ -738,20 +823,18 @@ async def get_demo_videos():
         # Sort videos by name for consistent ordering
         videos.sort(key=lambda x: x['name'])
         
-        print(f"[DEMO VIDEOS] Found {len(videos)} demo videos")
-        for video in videos:
-            print(f"[DEMO VIDEOS] - {video['name']} ({video['filename']})")
+        logger.debug("Found demo videos", videos=[video["filename"] for video in videos])
         
-        return JSONResponse(content={"videos": videos})
+        return ORJSONResponse(content={"videos": videos})
         
     except Exception as e:
-        print(f"[DEMO VIDEOS] Error fetching demo videos: {str(e)}")
+        logger.error("Fetching demo videos failed", error=str(e))
         # Return fallback videos if there's an error
         fallback_videos = [
             {"id": "sample1", "name": "Sample Video 1", "url": "/demo-data/video/sample1.mp4", "filename": "sample1.mp4"},
             {"id": "sample2", "name": "Sample Video 2", "url": "/demo-data/video/sample2.mp4", "filename": "sample2.mp4"}
         ]
-        return JSONResponse(content={"videos": fallback_videos})
+        return ORJSONResponse(content={"videos": fallback_videos})
 
 @router.post("/demo/analyze")
 async def demo_analyze(request: dict):
@@ -812,17 +895,19 @@ async def demo_analyze(request: dict):
             }
         }
 
+        payload = Encoded(demo_analysis)
+
         # Broadcast to WebSocket clients
-        await manager.broadcast(json.dumps({
+        await manager.broadcast({
             "type": "demo_analysis",
             "meeting_id": meeting_id,
-            "data": demo_analysis,
+            "data": payload,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "meeting_id": meeting_id,
-            "analysis": demo_analysis,
+            "analysis": payload,
             "timestamp": datetime.now().isoformat(),
             "demo": True
         })
@@ -831,13 +916,28 @@ async def demo_analyze(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.websocket("/ws/{meeting_id}")
-async def websocket_endpoint(websocket: WebSocket, meeting_id: str):
-    """WebSocket endpoint for real-time updates"""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, meeting_id: str, last_seq: Optional[int] = None,
+                             encoding: str = "json", delta: bool = False, coalesce_ms: int = 0):
+    """WebSocket endpoint for real-time updates; pass last_seq to replay events missed while disconnected.
+
+    encoding (json or msgpack), delta and coalesce_ms select a more compact stream.
+    """
+    encoder = EventEncoder(encoding, delta, max(0, min(coalesce_ms, settings.WS_MAX_COALESCE_MS)))
+    # Clients that asked for anything non-default learn what they actually got, e.g. JSON when msgpack is unavailable
+    negotiated = encoding != "json" or delta or coalesce_ms > 0
+    connection = await manager.connect(websocket, meeting_id, last_seq, encoder, announce=negotiated)
     try:
         while True:
             data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+            except ValueError:
+                message = None
+            # Clients can also resume after connecting with {"type": "resume", "last_seq": N}
+            if isinstance(message, dict) and message.get("type") == "resume" and isinstance(message.get("last_seq"), int):
+                await manager.resume(connection, message["last_seq"])
+                continue
             # Echo back the message (you can add more logic here)
-            await manager.send_personal_message(f"Message received for meeting {meeting_id}: {data}", websocket)
+            await manager.send_personal_message(f"Message received for meeting {meeting_id}: {data}", connection)
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
\ No newline at end of file
+        manager.disconnect(connection)
\ No newline at end of file
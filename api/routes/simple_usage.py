@@ -1,6 +1,16 @@
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
 from services.simple_usage_tracker import simple_usage_tracker
+from services.accounting import usage_accountant
+from services.rate_governor import rate_governor
+from services.resilience import resilient_caller
+from services.document_chunker import news_chunk_cache
+from services.local_classifier import local_classifier
+from services.persistence import write_behind_queue
+from services.event_stream import connection_manager
+from services.serialization import ORJSONResponse, get_serialization_stats
+from services.structured_logging import logging_system
+from services.tracing import tracer
+from services.resources import resources
 
 router = APIRouter()
 
@@ -9,9 +19,20 @@ async def get_usage_stats():
     """Get API usage statistics"""
     try:
         stats = simple_usage_tracker.get_stats(limit=100)
-        return JSONResponse(content=stats)
+        stats["pricing_version"] = usage_accountant.pricing.version
+        stats["meeting_budget_usd"] = usage_accountant.meeting_budget_usd
+        stats["meeting_spend"] = usage_accountant.get_meeting_spend()
+        stats["news_chunk_cache"] = news_chunk_cache.get_stats()
+        stats["local_tier"] = local_classifier.get_stats()
+        stats["persistence"] = write_behind_queue.get_stats()
+        stats["websocket"] = connection_manager.get_stats()
+        stats["serialization"] = get_serialization_stats()
+        stats["logging"] = logging_system.get_stats()
+        stats["tracing"] = tracer.get_stats()
+        stats["resources"] = resources.get_stats()
+        return ORJSONResponse(content=stats)
     except Exception as e:
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "total_requests": 0,
             "total_cost_usd": 0.0,
             "total_tokens": 0,
@@ -36,9 +57,9 @@ async def get_usage_summary():
             "recent_errors_count": len(stats["recent_errors"])
         }
         
-        return JSONResponse(content=summary)
+        return ORJSONResponse(content=summary)
     except Exception as e:
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "total_requests": 0,
             "total_cost_usd": 0.0,
             "total_tokens": 0,
@@ -65,6 +86,17 @@ async def export_usage_data():
             "detailed_requests": stats["recent_requests"]
         }
         
-        return JSONResponse(content=export_data)
+        return ORJSONResponse(content=export_data)
     except Exception as e:
-        return JSONResponse(content={"error": str(e)})
\ No newline at end of file
+        return ORJSONResponse(content={"error": str(e)})
+
+@router.get("/usage/governor")
+async def get_governor_state():
+    """Get current rate governor buckets per meeting and per model"""
+    return ORJSONResponse(content=rate_governor.get_state())
+
+
+@router.get("/usage/upstream")
+async def get_upstream_health():
+    """Get retry/hedge counters and circuit breaker state per model"""
+    return ORJSONResponse(content=resilient_caller.get_state())
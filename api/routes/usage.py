@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
 from services.usage_tracker import usage_tracker
+from services.serialization import ORJSONResponse
 from typing import Optional
 
 router = APIRouter()
@@ -10,7 +10,7 @@ async def get_usage_stats(limit: Optional[int] = 100):
     """Get API usage statistics"""
     try:
         stats = usage_tracker.get_usage_stats(limit=limit)
-        return JSONResponse(content=stats)
+        return ORJSONResponse(content=stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -30,7 +30,7 @@ async def get_usage_summary():
             "recent_errors_count": len(stats["recent_errors"])
         }
         
-        return JSONResponse(content=summary)
+        return ORJSONResponse(content=summary)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -52,6 +52,6 @@ async def export_usage_data(limit: Optional[int] = 1000):
             "detailed_requests": stats["recent_requests"]
         }
         
-        return JSONResponse(content=export_data)
+        return ORJSONResponse(content=export_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
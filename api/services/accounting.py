@@ -0,0 +1,468 @@
+import io
+import json
+import math
+import struct
+import wave
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from collections import defaultdict
+from config import settings
+from .simple_usage_tracker import simple_usage_tracker
+from .structured_logging import get_logger
+
+logger = get_logger("accounting")
+
+# Rough characters-per-token ratio used to estimate prompt size before a request is sent
+CHARS_PER_TOKEN = 4
+# Completion size assumed when estimating the cost of a request up front
+EXPECTED_COMPLETION_TOKENS = 500
+# Bitrate (kbps) assumed for audio whose duration cannot be read from its container; low, so the estimate
+# errs towards a higher cost and the budget cap stays conservative
+FALLBACK_AUDIO_BITRATE_KBPS = 32
+
+
+class BudgetExceededError(Exception):
+    """Raised when a request would push a meeting over its budget cap"""
+    pass
+
+
+class PricingTable:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path) as f:
+            table = json.load(f)
+        self.version: str = table["version"]
+        self.models: Dict[str, Dict[str, Any]] = table["models"]
+
+    def rates(self, model: str) -> Dict[str, Any]:
+        return self.models.get(model, self.models["gpt-4o"])
+
+    def chat_cost(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+        """Cost of a chat completion from its token counts"""
+        rates = self.rates(model)
+        uncached = max(0, prompt_tokens - cached_tokens)
+        cached_rate = rates.get("cached_input_per_1m", rates.get("input_per_1m", 0.0))
+        return (
+            uncached * rates.get("input_per_1m", 0.0)
+            + cached_tokens * cached_rate
+            + completion_tokens * rates.get("output_per_1m", 0.0)
+        ) / 1_000_000
+
+    def audio_cost(self, model: str, seconds: float) -> float:
+        """Cost of a Whisper request billed by audio duration"""
+        return (seconds / 60) * self.rates(model).get("audio_per_minute", 0.0)
+
+    def image_tokens(self, model: str, width: Optional[int], height: Optional[int], detail: str = "auto") -> int:
+        """Tokens charged for one image input, following the tiling rules of the vision models"""
+        image_rates = self.rates(model).get("image", {"base_tokens": 85, "tile_tokens": 170})
+        if detail == "low":
+            return image_rates["base_tokens"]
+        if not width or not height:
+            width, height = 1024, 1024
+
+        # Fit within 2048x2048, then scale so the shortest side is at most 768
+        scale = min(1.0, 2048 / max(width, height))
+        width, height = width * scale, height * scale
+        scale = min(1.0, 768 / min(width, height))
+        width, height = width * scale, height * scale
+
+        tiles = math.ceil(width / 512) * math.ceil(height / 512)
+        return image_rates["base_tokens"] + tiles * image_rates["tile_tokens"]
+
+    def downgrade_target(self, model: str) -> Optional[str]:
+        return self.rates(model).get("downgrade_to")
+
+
+def image_dimensions(image_data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Read width and height from a JPEG or PNG header without decoding the image"""
+    if image_data[:8] == b"\x89PNG\r\n\x1a\n" and len(image_data) >= 24:
+        width, height = struct.unpack(">II", image_data[16:24])
+        return width, height
+
+    if image_data[:2] != b"\xff\xd8":
+        return None, None
+
+    # Walk JPEG segments until a start-of-frame marker
+    i = 2
+    while i + 9 < len(image_data):
+        if image_data[i] != 0xFF:
+            i += 1
+            continue
+        marker = image_data[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        segment_length = struct.unpack(">H", image_data[i + 2:i + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", image_data[i + 5:i + 9])
+            return width, height
+        i += 2 + segment_length
+    return None, None
+
+
+# MPEG audio frame header tables, indexed by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5) and layer bits
+MPEG_BITRATES_KBPS = {
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MPEG_BITRATES_KBPS[(2, 1)] = MPEG_BITRATES_KBPS[(2, 2)]
+for _layer in (1, 2, 3):
+    MPEG_BITRATES_KBPS[(0, _layer)] = MPEG_BITRATES_KBPS[(2, _layer)]
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def mp3_duration_seconds(data: bytes) -> Optional[float]:
+    """Sum the samples of every MPEG audio frame, which is exact for both CBR and VBR files"""
+    i = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        # ID3v2 tag size is a 28-bit syncsafe integer
+        i = 10 + ((data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F))
+    seconds, frames = 0.0, 0
+    while i + 4 <= len(data):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            i += 1
+            continue
+        version, layer = (data[i + 1] >> 3) & 0x03, (data[i + 1] >> 1) & 0x03
+        bitrate_index, rate_index = data[i + 2] >> 4, (data[i + 2] >> 2) & 0x03
+        padding = (data[i + 2] >> 1) & 0x01
+        if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            i += 1
+            continue
+        bitrate = MPEG_BITRATES_KBPS[(version, layer)][bitrate_index] * 1000
+        sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+        if layer == 3:
+            samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+        else:
+            samples = 1152 if layer == 2 or version == 3 else 576
+            length = samples // 8 * bitrate // sample_rate + padding
+        seconds += samples / sample_rate
+        frames += 1
+        i += length
+    return seconds if frames else None
+
+
+def ogg_duration_seconds(data: bytes) -> Optional[float]:
+    """Granule position of the last page over the stream's sample rate (Opus is always 48 kHz)"""
+    if data[28:36] == b"OpusHead":
+        sample_rate, pre_skip = 48000, struct.unpack("<H", data[38:40])[0]
+    elif data[28:35] == b"\x01vorbis":
+        sample_rate, pre_skip = struct.unpack("<I", data[40:44])[0], 0
+    else:
+        return None
+    last_page = data.rfind(b"OggS")
+    if not sample_rate or last_page < 0 or last_page + 14 > len(data):
+        return None
+    granule = struct.unpack("<q", data[last_page + 6:last_page + 14])[0]
+    return max(0, granule - pre_skip) / sample_rate if granule >= 0 else None
+
+
+def _ebml_vint(data: bytes, i: int, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """Read an EBML variable-length integer; returns (value, length), value None for an unknown size"""
+    first = data[i]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or i + length > len(data):
+        raise ValueError("Invalid EBML integer")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[i + 1:i + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+
+# Segment, Info, Cluster and BlockGroup are read into; every other element is skipped
+WEBM_MASTER_IDS = {0x18538067, 0x1549A966, 0x1F43B675, 0xA0}
+
+
+def webm_duration_seconds(data: bytes) -> Optional[float]:
+    """Segment Duration if the muxer wrote one, otherwise the timestamp of the last block (MediaRecorder output)"""
+    timecode_scale, duration, cluster_time, last_block = 1_000_000, None, 0, None
+    i = 0
+    try:
+        while i < len(data):
+            element_id, id_length = _ebml_vint(data, i, keep_marker=True)
+            size, size_length = _ebml_vint(data, i + id_length, keep_marker=False)
+            i += id_length + size_length
+            if element_id in WEBM_MASTER_IDS:
+                continue
+            if size is None:
+                return None
+            payload = data[i:i + size]
+            if element_id == 0x2AD7B1:
+                timecode_scale = int.from_bytes(payload, "big")
+            elif element_id == 0x4489:
+                duration = struct.unpack(">f" if size == 4 else ">d", payload)[0]
+            elif element_id == 0xE7:
+                cluster_time = int.from_bytes(payload, "big")
+            elif element_id in (0xA3, 0xA1) and len(payload) >= 3:
+                _, track_length = _ebml_vint(payload, 0, keep_marker=False)
+                relative = struct.unpack(">h", payload[track_length:track_length + 2])[0]
+                last_block = max(last_block or 0, cluster_time + relative)
+            i += size
+    except (ValueError, IndexError, struct.error):
+        pass
+    ticks = duration if duration else last_block
+    return ticks * timecode_scale / 1e9 if ticks else None
+
+
+def mp4_duration_seconds(data: bytes) -> Optional[float]:
+    """Duration and timescale from the moov/mvhd box"""
+    i, end = 0, len(data)
+    while i + 8 <= end:
+        size, box = struct.unpack(">I4s", data[i:i + 8])
+        header = 8
+        if size == 1 and i + 16 <= end:
+            size, header = struct.unpack(">Q", data[i + 8:i + 16])[0], 16
+        elif size == 0:
+            size = end - i
+        if size < header:
+            return None
+        if box == b"moov":
+            # Descend into moov; mvhd is one of its first children
+            i, end = i + header, min(end, i + size)
+            continue
+        if box == b"mvhd":
+            body = data[i + header:i + size]
+            if body[:1] == b"\x01" and len(body) >= 32:
+                timescale, duration = struct.unpack(">IQ", body[20:32])
+            elif len(body) >= 20:
+                timescale, duration = struct.unpack(">II", body[12:20])
+            else:
+                return None
+            return duration / timescale if timescale else None
+        i += size
+    return None
+
+
+def audio_duration_seconds(audio_data: bytes) -> Optional[float]:
+    """Compute audio duration from the actual bytes; None if the container cannot be parsed"""
+    if not audio_data:
+        return 0.0
+
+    if audio_data[:4] == b"RIFF" and audio_data[8:12] == b"WAVE":
+        try:
+            with wave.open(io.BytesIO(audio_data)) as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except (wave.Error, EOFError, ZeroDivisionError):
+            return None
+    if audio_data[:3] == b"ID3" or (audio_data[0] == 0xFF and (audio_data[1] & 0xE0) == 0xE0):
+        return mp3_duration_seconds(audio_data)
+    if audio_data[:4] == b"\x1a\x45\xdf\xa3":
+        return webm_duration_seconds(audio_data)
+    if audio_data[:4] == b"OggS":
+        return ogg_duration_seconds(audio_data)
+    if audio_data[4:8] == b"ftyp":
+        return mp4_duration_seconds(audio_data)
+    return None
+
+
+def estimate_audio_seconds(audio_data: bytes) -> float:
+    """Upper-bound guess for audio that cannot be parsed, from its size at a low speech bitrate"""
+    return len(audio_data) * 8 / (FALLBACK_AUDIO_BITRATE_KBPS * 1000)
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimate text tokens of a chat prompt (images are counted separately)"""
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    chars += len(part.get("text", ""))
+    return chars // CHARS_PER_TOKEN + 4 * len(messages)
+
+
+@dataclass
+class BudgetDecision:
+    action: str  # 'allow', 'downgrade' or 'reject'
+    model: str
+    estimated_cost: float
+    estimated_tokens: int = 0
+    image_tokens: int = 0
+    reason: Optional[str] = None
+    # Cheaper alternative that can be used instead, if the model has one
+    fallback: Optional["BudgetDecision"] = None
+
+
+class UsageAccountant:
+    """Records token- and duration-accurate usage and enforces per-meeting budget caps"""
+
+    def __init__(self, pricing: PricingTable, meeting_budget_usd: float = 0.0, downgrade_ratio: float = 0.8):
+        self.pricing = pricing
+        self.meeting_budget_usd = meeting_budget_usd
+        self.downgrade_ratio = downgrade_ratio
+        self.meeting_spend: Dict[str, float] = defaultdict(float)
+
+    def _meeting_key(self, meeting_id: Optional[str]) -> str:
+        return meeting_id or "default"
+
+    def check_budget(self, meeting_id: Optional[str], decision: BudgetDecision) -> BudgetDecision:
+        """Decide whether a request may be sent, should be downgraded, or must be rejected"""
+        if self.meeting_budget_usd <= 0:
+            return decision
+
+        spent = self.meeting_spend[self._meeting_key(meeting_id)]
+        fallback = decision.fallback
+
+        if spent + decision.estimated_cost <= self.meeting_budget_usd * self.downgrade_ratio:
+            return decision
+
+        if fallback and spent + fallback.estimated_cost <= self.meeting_budget_usd:
+            fallback.reason = f"Meeting spend ${spent:.4f} near budget ${self.meeting_budget_usd:.2f}"
+            return fallback
+
+        if spent + decision.estimated_cost <= self.meeting_budget_usd:
+            return decision
+
+        return BudgetDecision(
+            "reject", decision.model, decision.estimated_cost,
+            reason=f"Meeting budget of ${self.meeting_budget_usd:.2f} exceeded (spent ${spent:.4f})"
+        )
+
+    def has_headroom(self, meeting_id: Optional[str], cost: float) -> bool:
+        """Whether `cost` fits under the meeting's downgrade threshold, for optional spend such as hedges"""
+        if self.meeting_budget_usd <= 0:
+            return True
+        spent = self.meeting_spend[self._meeting_key(meeting_id)]
+        return spent + cost <= self.meeting_budget_usd * self.downgrade_ratio
+
+    def preflight_chat(self, meeting_id: Optional[str], request_data: Dict[str, Any],
+                       images: List[bytes] = ()) -> Tuple[Dict[str, Any], BudgetDecision]:
+        """Estimate a chat request, apply the budget decision and return the request to send"""
+        model = request_data["model"]
+        prompt_tokens = estimate_prompt_tokens(request_data["messages"])
+        dimensions = [image_dimensions(image) for image in images]
+
+        def estimate(action: str, for_model: str, detail: str) -> BudgetDecision:
+            image_tokens = sum(self.pricing.image_tokens(for_model, w, h, detail) for w, h in dimensions)
+            tokens = prompt_tokens + image_tokens + EXPECTED_COMPLETION_TOKENS
+            cost = self.pricing.chat_cost(for_model, prompt_tokens + image_tokens, EXPECTED_COMPLETION_TOKENS)
+            return BudgetDecision(action, for_model, cost, tokens, image_tokens)
+
+        decision = estimate("allow", model, "auto")
+        target = self.pricing.downgrade_target(model)
+        if target:
+            decision.fallback = estimate("downgrade", target, "low")
+
+        decision = self.check_budget(meeting_id, decision)
+        if decision.action == "reject":
+            raise BudgetExceededError(decision.reason)
+
+        if decision.action == "downgrade":
+            logger.warning("Downgrading model", model=model, downgraded_to=decision.model, meeting_id=meeting_id, reason=decision.reason)
+            request_data = self.downgrade_request(request_data, decision.model)
+
+        return request_data, decision
+
+    def preflight_audio(self, meeting_id: Optional[str], model: str, audio_data: bytes) -> Tuple[float, bool, BudgetDecision]:
+        """Compute audio duration and reject the request if it would exceed the meeting budget.
+
+        Returns (seconds, estimated, decision); `estimated` is True when the container
+        could not be parsed and the duration was guessed from the size.
+        """
+        seconds = audio_duration_seconds(audio_data)
+        estimated = seconds is None
+        if estimated:
+            seconds = estimate_audio_seconds(audio_data)
+            logger.warning("Audio duration estimated from size", meeting_id=meeting_id, audio_bytes=len(audio_data), audio_seconds=round(seconds, 1))
+        decision = self.check_budget(
+            meeting_id, BudgetDecision("allow", model, self.pricing.audio_cost(model, seconds))
+        )
+        if decision.action == "reject":
+            raise BudgetExceededError(decision.reason)
+        return seconds, estimated, decision
+
+    def downgrade_request(self, request_data: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """Switch a chat request to a cheaper model and low-detail image inputs"""
+        request_data = {**request_data, "model": model}
+        request_data["messages"] = [self._low_detail(message) for message in request_data["messages"]]
+        return request_data
+
+    def _low_detail(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        content = message.get("content")
+        if not isinstance(content, list):
+            return message
+        parts = []
+        for part in content:
+            if part.get("type") == "image_url":
+                part = {**part, "image_url": {**part["image_url"], "detail": "low"}}
+            parts.append(part)
+        return {**message, "content": parts}
+
+    def record_chat(self, service: str, model: str, usage: Any, response_time_ms: float,
+                    meeting_id: Optional[str] = None, image_tokens: int = 0) -> float:
+        """Record a chat completion from its response.usage fields"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+        cost = self.pricing.chat_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+        self.meeting_spend[self._meeting_key(meeting_id)] += cost
+
+        simple_usage_tracker.log_request(
+            service=service,
+            model=model,
+            tokens=prompt_tokens + completion_tokens,
+            cost=cost,
+            response_time_ms=response_time_ms,
+            meeting_id=meeting_id,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            image_tokens=image_tokens,
+            pricing_version=self.pricing.version
+        )
+        return cost
+
+    def record_audio(self, service: str, model: str, audio_seconds: float, response_time_ms: float,
+                     meeting_id: Optional[str] = None, duration_estimated: bool = False) -> float:
+        """Record a Whisper request billed by audio duration"""
+        cost = self.pricing.audio_cost(model, audio_seconds)
+        self.meeting_spend[self._meeting_key(meeting_id)] += cost
+
+        simple_usage_tracker.log_request(
+            service=service,
+            model=model,
+            tokens=0,
+            cost=cost,
+            response_time_ms=response_time_ms,
+            meeting_id=meeting_id,
+            audio_seconds=audio_seconds,
+            audio_duration_estimated=duration_estimated,
+            pricing_version=self.pricing.version
+        )
+        return cost
+
+    def record_error(self, service: str, model: str, response_time_ms: float,
+                     meeting_id: Optional[str], error: str):
+        """Record a failed or rejected request at zero cost"""
+        simple_usage_tracker.log_request(
+            service=service,
+            model=model,
+            tokens=0,
+            cost=0.0,
+            response_time_ms=response_time_ms,
+            meeting_id=meeting_id,
+            error=error,
+            pricing_version=self.pricing.version
+        )
+
+    def get_meeting_spend(self) -> Dict[str, float]:
+        return dict(self.meeting_spend)
+
+
+# Global instance
+pricing_table = PricingTable(settings.PRICING_TABLE_PATH)
+usage_accountant = UsageAccountant(
+    pricing_table,
+    meeting_budget_usd=settings.MEETING_BUDGET_USD,
+    downgrade_ratio=settings.BUDGET_DOWNGRADE_RATIO
+)
@@ -0,0 +1,14 @@
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException
+from config import settings
+
+
+def is_admin_password(password: Optional[str]) -> bool:
+    return bool(settings.ADMIN_PASSWORD and password) and hmac.compare_digest(password, settings.ADMIN_PASSWORD)
+
+
+async def require_admin(x_admin_password: Optional[str] = Header(None)):
+    """Dependency for admin-only routes: the admin password in the X-Admin-Password header"""
+    if not is_admin_password(x_admin_password):
+        raise HTTPException(status_code=401, detail="Invalid admin password")
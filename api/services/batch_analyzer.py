@@ -0,0 +1,243 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from config import settings
+from .cultural_engine import cultural_engine
+from .structured_logging import get_logger
+
+logger = get_logger("batch")
+
+BATCH_KINDS = ("text", "news")
+
+
+@dataclass
+class BatchItem:
+    """One text in a bulk analysis request"""
+    index: int
+    id: str
+    text: str
+    kind: str = "text"
+    cultures: List[str] = field(default_factory=list)
+
+
+def parse_batch_items(
+    records: List[Any],
+    default_kind: str = "text",
+    default_cultures: Optional[List[str]] = None,
+    max_items: int = None
+) -> List[BatchItem]:
+    """Validate raw records (strings or {"id", "text", "kind", "cultures"} objects) into batch items"""
+    max_items = max_items or settings.BATCH_MAX_ITEMS
+    if len(records) > max_items:
+        raise ValueError(f"Batch has {len(records)} items; the limit is {max_items}")
+
+    items = []
+    for index, record in enumerate(records):
+        if isinstance(record, str):
+            record = {"text": record}
+        if not isinstance(record, dict):
+            raise ValueError(f"Item {index} must be a string or an object")
+        text = record.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"Item {index} has no text")
+        kind = record.get("kind", default_kind)
+        if kind not in BATCH_KINDS:
+            raise ValueError(f"Item {index} has unknown kind '{kind}'; expected one of {', '.join(BATCH_KINDS)}")
+        cultures = record.get("cultures", default_cultures or [])
+        if not isinstance(cultures, list) or not all(isinstance(culture, str) for culture in cultures):
+            raise ValueError(f"Item {index} cultures must be a list of strings")
+        items.append(BatchItem(index, str(record.get("id", index)), text, kind, cultures))
+    return items
+
+
+def parse_ndjson(body: bytes) -> List[Any]:
+    """Parse newline-delimited JSON, skipping blank lines"""
+    records = []
+    for line_number, line in enumerate(body.decode("utf-8").splitlines(), start=1):
+        if line.strip():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+    return records
+
+
+class BatchTextAnalyzer:
+    """Runs many text and news analyses: local checks in one pass, short texts packed, the rest concurrently"""
+
+    def __init__(self, service, concurrency: int = None, pack_max_chars: int = None, pack_max_items: int = None):
+        self.service = service
+        self.concurrency = concurrency or settings.BATCH_CONCURRENCY
+        self.pack_max_chars = pack_max_chars or settings.BATCH_PACK_MAX_CHARS
+        self.pack_max_items = pack_max_items or settings.BATCH_PACK_MAX_ITEMS
+        self.stats: Dict[str, int] = {"batches": 0, "items": 0, "packed_calls": 0, "packed_items": 0, "single_calls": 0, "unpacked_retries": 0, "local_items": 0}
+
+    def plan(self, items: List[BatchItem]) -> Tuple[List[List[BatchItem]], List[BatchItem]]:
+        """Split items into packs for shared model calls and items that need their own call.
+
+        Only short sentiment texts with identical cultures are packed, since the
+        culture list is part of the system prompt; news analyses return long
+        structured reports and always get their own call.
+        """
+        groups: Dict[tuple, List[BatchItem]] = {}
+        singles = []
+        for item in items:
+            if item.kind == "text" and len(item.text) <= self.pack_max_chars:
+                groups.setdefault(tuple(item.cultures), []).append(item)
+            else:
+                singles.append(item)
+
+        packs = []
+        for group in groups.values():
+            for start in range(0, len(group), self.pack_max_items):
+                pack = group[start:start + self.pack_max_items]
+                if len(pack) > 1:
+                    packs.append(pack)
+                else:
+                    singles.extend(pack)
+        return packs, singles
+
+    def local_checks(self, items: List[BatchItem], batch_size: int) -> List[Dict[str, Any]]:
+        """Cultural engine checks for every sentiment item, with one lexicon pass over the whole batch"""
+        text_items = [item for item in items if item.kind == "text"]
+        flags = cultural_engine.flag_cultural_issues_batch(
+            [item.text for item in text_items], [item.cultures for item in text_items]
+        )
+        context_cache: Dict[tuple, Dict[str, Any]] = {}
+        local: List[Dict[str, Any]] = [{} for _ in range(batch_size)]
+        for item, item_flags in zip(text_items, flags):
+            key = tuple(item.cultures)
+            if key not in context_cache:
+                context_cache[key] = cultural_engine.analyze_cultural_context(item.cultures)
+            local[item.index] = {"cultural_analysis": context_cache[key], "cultural_flags_detailed": item_flags}
+        return local
+
+    def _result(self, item: BatchItem, analysis: Dict[str, Any], local: Dict[str, Any], packed: bool, started: float) -> Dict[str, Any]:
+        if item.kind == "text" and "error" not in analysis and "analysis_tier" not in analysis:
+            analysis = {**analysis, **local, "analysis_tier": "model"}
+        return {
+            "type": "item",
+            "index": item.index,
+            "id": item.id,
+            "kind": item.kind,
+            "status": "error" if "error" in analysis else "ok",
+            "packed": packed,
+            "analysis": analysis,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    async def _analyze_single(self, item: BatchItem, meeting_id: str) -> Dict[str, Any]:
+        self.stats["single_calls"] += 1
+        if item.kind == "news":
+            return await self.service.analyze_news_text(item.text)
+        try:
+            return await self.service.analyze_text_sentiment_model(item.text, item.cultures, meeting_id)
+        except Exception as e:
+            logger.warning("Batch item failed", item_id=item.id, error=str(e))
+            return {"error": str(e)}
+
+    async def _run_pack(self, pack: List[BatchItem], meeting_id: str, local, semaphore, results: asyncio.Queue):
+        started = time.perf_counter()
+        async with semaphore:
+            self.stats["packed_calls"] += 1
+            try:
+                # Keyed by batch position, since caller-supplied ids need not be unique
+                analyses = await self.service.analyze_text_sentiment_packed(
+                    {str(item.index): item.text for item in pack}, pack[0].cultures, meeting_id
+                )
+            except Exception as e:
+                logger.warning("Packed call failed, running items individually", items=len(pack), error=str(e))
+                analyses = {}
+        self.stats["packed_items"] += len(analyses)
+
+        missing = []
+        for item in pack:
+            if str(item.index) in analyses:
+                await results.put(self._result(item, analyses[str(item.index)], local[item.index], True, started))
+            else:
+                missing.append(item)
+        # Anything the packed answer skipped or garbled is retried on its own
+        if missing:
+            self.stats["unpacked_retries"] += len(missing)
+            await asyncio.gather(*(self._run_single(item, meeting_id, local, semaphore, results) for item in missing))
+
+    async def _run_single(self, item: BatchItem, meeting_id: str, local, semaphore, results: asyncio.Queue):
+        started = time.perf_counter()
+        async with semaphore:
+            analysis = await self._analyze_single(item, meeting_id)
+        await results.put(self._result(item, analysis, local[item.index], False, started))
+
+    async def _guarded(self, run, batch_items: List[BatchItem], results: asyncio.Queue, started: float):
+        """Await a pack or single task, reporting an error for each of its items if it dies unexpectedly"""
+        try:
+            await run
+        except Exception as e:
+            logger.error("Batch task failed", items=len(batch_items), error=str(e))
+            # Items that already have a result are skipped by run(), which keeps the first one
+            for item in batch_items:
+                await results.put(self._result(item, {"error": f"Internal error: {e}"}, {}, False, started))
+
+    def local_tier(self, items: List[BatchItem]) -> Dict[int, Dict[str, Any]]:
+        """Local-only results for sentiment items the pre-classification tier is confident about"""
+        answered = {}
+        for item in items:
+            if item.kind == "text":
+                decision = self.service.classify_text_locally(item.text, item.cultures)
+                if not decision.escalate:
+                    answered[item.index] = decision.result
+        return answered
+
+    async def run(self, items: List[BatchItem], meeting_id: str = None, force_model: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one result per item as soon as it is ready, then a summary"""
+        started = time.perf_counter()
+        self.stats["batches"] += 1
+        self.stats["items"] += len(items)
+
+        answered = {} if force_model else await asyncio.to_thread(self.local_tier, items)
+        self.stats["local_items"] += len(answered)
+        remaining = [item for item in items if item.index not in answered]
+        local = await asyncio.to_thread(self.local_checks, remaining, len(items))
+        packs, singles = self.plan(remaining)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            if item.index in answered:
+                results.put_nowait(self._result(item, answered[item.index], {}, False, started))
+        tasks = [
+            asyncio.create_task(self._guarded(self._run_pack(pack, meeting_id, local, semaphore, results), pack, results, started))
+            for pack in packs
+        ]
+        tasks += [
+            asyncio.create_task(self._guarded(self._run_single(item, meeting_id, local, semaphore, results), [item], results, started))
+            for item in singles
+        ]
+
+        errors = 0
+        reported = set()
+        try:
+            while len(reported) < len(items):
+                result = await results.get()
+                if result["index"] in reported:
+                    continue
+                reported.add(result["index"])
+                errors += result["status"] == "error"
+                yield result
+        finally:
+            # The client may disconnect mid-stream; do not keep spending on its behalf
+            for task in tasks:
+                task.cancel()
+
+        yield {
+            "type": "summary",
+            "items": len(items),
+            "errors": errors,
+            "local_items": len(answered),
+            "planned_model_calls": len(packs) + len(singles),
+            "packed_calls": len(packs),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+from config import settings
+from .meeting_state import RISK_ORDER
+from .structured_logging import get_logger
+
+logger = get_logger("cable")
+
+CABLE_SECTION_ORDER = ("summary", "risk", "cultural")
+CABLE_SECTION_KEYS = {"summary": "executive_summary", "risk": "risk_assessment", "cultural": "cultural_analysis"}
+# Sections fed by client_context keys containing these fragments; other keys feed the summary
+CLIENT_CONTEXT_SECTIONS = (
+    ("cultural", ("cultur", "language", "participant")),
+    ("risk", ("audio", "transcript", "risk", "stress", "tone")),
+)
+
+
+def distribution_shift(old: Dict[str, Any], new: Dict[str, Any]) -> float:
+    """Total variation distance between two label histograms (0 = same shape, 1 = disjoint)"""
+    def normalize(histogram: Dict[str, Any]) -> Dict[str, float]:
+        counts = {label: value["count"] if isinstance(value, dict) else value for label, value in histogram.items()}
+        total = sum(counts.values())
+        return {label: count / total for label, count in counts.items()} if total else {}
+
+    old_dist, new_dist = normalize(old or {}), normalize(new or {})
+    if not old_dist and not new_dist:
+        return 0.0
+    if not old_dist or not new_dist:
+        return 1.0
+    return 0.5 * sum(abs(old_dist.get(label, 0.0) - new_dist.get(label, 0.0)) for label in set(old_dist) | set(new_dist))
+
+
+def context_section(key: str) -> str:
+    """The cable section a client_context key feeds"""
+    key = key.lower()
+    for section, fragments in CLIENT_CONTEXT_SECTIONS:
+        if any(fragment in key for fragment in fragments):
+            return section
+    return "summary"
+
+
+def is_failed_section(output: Any) -> bool:
+    """A section agent's placeholder for unparseable output, which must not seed a later delta"""
+    return isinstance(output, dict) and "error" in output
+
+
+def diff_summaries(old: Any, new: Any) -> Any:
+    """What changed between two meeting summaries, keeping only new entries of append-only windows"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            if key not in old:
+                changes[key] = value
+            elif old[key] != value:
+                changes[key] = diff_summaries(old[key], value)
+        return changes
+    if isinstance(old, list) and isinstance(new, list):
+        # Windows such as flagged moments mostly gain entries; send just the new ones
+        added = [item for item in new if item not in old]
+        if added and len(added) < len(new):
+            return {"added": added}
+    return new
+
+
+class CableReviser:
+    """Keeps each meeting's cable and revises only the sections whose inputs changed materially.
+
+    The first cable and every CABLE_FULL_REFRESH_EVERY-th revision are
+    generated in full. Otherwise each agent whose section is affected, by the
+    meeting state or by the client context posted with the request, gets its
+    previous output plus the diff since the last revision, and unaffected
+    sections are carried over unchanged. A section whose last output was an
+    error placeholder is regenerated from scratch.
+    """
+
+    def __init__(self, service, risk_shift: float = None, emotion_shift: float = None,
+                 history_size: int = None, full_refresh_every: int = None, max_meetings: int = None):
+        self.service = service
+        self.risk_shift = risk_shift if risk_shift is not None else settings.CABLE_RISK_SHIFT
+        self.emotion_shift = emotion_shift if emotion_shift is not None else settings.CABLE_EMOTION_SHIFT
+        self.history_size = history_size or settings.CABLE_HISTORY_SIZE
+        self.full_refresh_every = full_refresh_every or settings.CABLE_FULL_REFRESH_EVERY
+        self.max_meetings = max_meetings or settings.MEETING_STATE_MAX_MEETINGS
+        self.histories: "OrderedDict[str, deque]" = OrderedDict()
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.stats: Dict[str, int] = {"revisions": 0, "full": 0, "delta": 0, "unchanged": 0, "sections_regenerated": 0, "sections_reused": 0}
+
+    def changed_sections(self, previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, str]:
+        """Sections whose inputs changed materially, with the reason for each"""
+        reasons: Dict[str, str] = {}
+        old_audio, new_audio = previous.get("audio", {}), current.get("audio", {})
+        old_text, new_text = previous.get("text", {}), current.get("text", {})
+
+        old_risk = RISK_ORDER.get(old_audio.get("highest_risk_level"), -1)
+        new_risk = RISK_ORDER.get(new_audio.get("highest_risk_level"), -1)
+        stress_delta = abs(new_audio.get("stress", {}).get("mean", 0.0) - old_audio.get("stress", {}).get("mean", 0.0))
+        old_moments = previous.get("flagged_moments", [])
+        new_moments = [moment for moment in current.get("flagged_moments", []) if moment not in old_moments]
+        if new_risk != old_risk:
+            reasons["risk"] = "risk_level_changed"
+        elif stress_delta >= self.risk_shift:
+            reasons["risk"] = f"stress_shift_{stress_delta:.2f}"
+        elif distribution_shift(old_audio.get("risk_levels"), new_audio.get("risk_levels")) >= self.risk_shift:
+            reasons["risk"] = "risk_distribution_shift"
+        elif new_moments:
+            reasons["risk"] = "new_flagged_moments"
+
+        if set(old_text.get("cultures", [])) != set(new_text.get("cultures", [])):
+            reasons["cultural"] = "participants_changed"
+        elif set(old_text.get("cultural_flags", {})) != set(new_text.get("cultural_flags", {})):
+            reasons["cultural"] = "new_cultural_flag_types"
+        elif set(old_audio.get("languages", {})) != set(new_audio.get("languages", {})):
+            reasons["cultural"] = "languages_changed"
+
+        emotion_shift = max(
+            distribution_shift(previous.get("facial", {}).get("emotion_histogram"), current.get("facial", {}).get("emotion_histogram")),
+            distribution_shift(old_audio.get("tones"), new_audio.get("tones")),
+            distribution_shift(old_text.get("sentiments"), new_text.get("sentiments"))
+        )
+        if reasons:
+            reasons["summary"] = "dependent_sections_changed"
+        elif emotion_shift >= self.emotion_shift:
+            reasons["summary"] = f"emotion_shift_{emotion_shift:.2f}"
+        return reasons
+
+    def changed_context_sections(self, previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, str]:
+        """Sections fed by client_context keys that were added, removed or changed"""
+        reasons: Dict[str, str] = {}
+        for key in set(previous) | set(current):
+            if previous.get(key) != current.get(key):
+                reasons.setdefault(context_section(key), "client_context_changed")
+        return reasons
+
+    def _history(self, meeting_id: str) -> deque:
+        if meeting_id not in self.histories:
+            self.histories[meeting_id] = deque(maxlen=self.history_size)
+        self.histories.move_to_end(meeting_id)
+        while len(self.histories) > self.max_meetings:
+            evicted, _ = self.histories.popitem(last=False)
+            self.locks.pop(evicted, None)
+        return self.histories[meeting_id]
+
+    def _cable(self, revision: Dict[str, Any]) -> Dict[str, Any]:
+        cable = dict(revision["sections"])
+        cable["raw_analysis"] = {"meeting_state": revision["input"], **({"client_context": revision["client_context"]} if revision["client_context"] else {})}
+        cable["revision"] = {key: revision[key] for key in ("version", "created_at", "mode", "regenerated", "reasons")}
+        return cable
+
+    async def revise(self, meeting_id: str, summary: Dict[str, Any], client_context: Optional[Dict[str, Any]] = None,
+                     force_full: bool = False) -> Dict[str, Any]:
+        """Return the meeting's cable, regenerating only what the new state requires"""
+        lock = self.locks.setdefault(meeting_id, asyncio.Lock())
+        # Concurrent refreshes of one meeting would otherwise race to build the same revision
+        async with lock:
+            try:
+                return await self._revise(meeting_id, summary, client_context or {}, force_full)
+            except Exception as e:
+                logger.error("Diplomatic cable revision failed", meeting_id=meeting_id, error=str(e))
+                return {"error": str(e)}
+
+    async def _revise(self, meeting_id: str, summary: Dict[str, Any], client_context: Dict[str, Any], force_full: bool) -> Dict[str, Any]:
+        history = self._history(meeting_id)
+        previous = history[-1] if history else None
+        analysis_json = json.dumps({"meeting_state": summary, **({"client_context": client_context} if client_context else {})}, separators=(",", ":"))
+
+        if previous is None or force_full or previous["deltas_since_full"] + 1 >= self.full_refresh_every:
+            mode = "full"
+            reason = "first_cable" if previous is None else "forced" if force_full else "periodic_full_refresh"
+            reasons = {section: reason for section in CABLE_SECTION_ORDER}
+            outputs = await asyncio.gather(
+                *(self.service.generate_cable_section(section, analysis_json, meeting_id) for section in CABLE_SECTION_ORDER)
+            )
+        else:
+            reasons = self.changed_sections(previous["input"], summary)
+            for section, reason in self.changed_context_sections(previous["client_context"], client_context).items():
+                reasons.setdefault(section, reason)
+            for section in previous["failed"]:
+                reasons.setdefault(section, "previous_section_failed")
+            if reasons:
+                reasons.setdefault("summary", "dependent_sections_changed")
+            if not reasons:
+                self.stats["unchanged"] += 1
+                self.stats["sections_reused"] += len(CABLE_SECTION_ORDER)
+                cable = self._cable(previous)
+                cable["revision"].update(regenerated=[], reasons={}, unchanged=True)
+                return cable
+            mode = "delta"
+            changes = diff_summaries(previous["input"], summary)
+            if client_context != previous["client_context"]:
+                changes = {**changes, "client_context": diff_summaries(previous["client_context"], client_context)}
+            changes_json = json.dumps(changes, separators=(",", ":"))
+            regenerate = [section for section in CABLE_SECTION_ORDER if section in reasons]
+            regenerated = await asyncio.gather(*(
+                # A failed section has no usable previous version, so its agent starts from the full input
+                self.service.generate_cable_section(section, analysis_json, meeting_id)
+                if section in previous["failed"] else
+                self.service.generate_cable_section(
+                    section, analysis_json, meeting_id, previous["sections"][CABLE_SECTION_KEYS[section]], changes_json
+                )
+                for section in regenerate
+            ))
+            new_outputs = dict(zip(regenerate, regenerated))
+            outputs = [new_outputs.get(section, previous["sections"][CABLE_SECTION_KEYS[section]]) for section in CABLE_SECTION_ORDER]
+
+        revision = {
+            "version": previous["version"] + 1 if previous else 1,
+            "created_at": time.time(),
+            "mode": mode,
+            "regenerated": list(reasons),
+            "reasons": reasons,
+            "sections": {CABLE_SECTION_KEYS[section]: output for section, output in zip(CABLE_SECTION_ORDER, outputs)},
+            "input": summary,
+            "client_context": client_context,
+            "failed": [section for section, output in zip(CABLE_SECTION_ORDER, outputs) if is_failed_section(output)],
+            "deltas_since_full": 0 if mode == "full" else previous["deltas_since_full"] + 1
+        }
+        history.append(revision)
+        self.stats["revisions"] += 1
+        self.stats[mode] += 1
+        self.stats["sections_regenerated"] += len(reasons)
+        self.stats["sections_reused"] += len(CABLE_SECTION_ORDER) - len(reasons)
+        logger.info("Cable revised", meeting_id=meeting_id, version=revision["version"], mode=mode, regenerated=list(reasons))
+        return self._cable(revision)
+
+    def list_revisions(self, meeting_id: str) -> List[Dict[str, Any]]:
+        return [
+            {key: revision[key] for key in ("version", "created_at", "mode", "regenerated", "reasons")}
+            for revision in self.histories.get(meeting_id, ())
+        ]
+
+    def get_revision(self, meeting_id: str, version: int) -> Optional[Dict[str, Any]]:
+        for revision in self.histories.get(meeting_id, ()):
+            if revision["version"] == version:
+                return self._cable(revision)
+        return None
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
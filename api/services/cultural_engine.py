@@ -1,54 +1,275 @@
-from typing import Dict, List, Any
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+from config import settings
+from .lexicon_matcher import LexiconMatcher
+from .structured_logging import get_logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = get_logger("cultural_engine")
+
+# Directness gap above which two cultures are flagged, and above which the gap is high severity
+DIRECTNESS_MISMATCH_THRESHOLD = 0.4
+DIRECTNESS_HIGH_SEVERITY_THRESHOLD = 0.6
+REQUIRED_RULE_FIELDS = ("communication_style", "directness_score", "formality_level")
+
+
+class CulturalRuleMatrix:
+    """Culture-by-culture matrices precomputed from a rule set.
+
+    Pairwise directness gaps, formality mismatches and the resulting mismatch
+    entries and recommendations are computed once, so multi-party queries are
+    answered by index lookup and vectorized reductions.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]]):
+        import numpy as np
+        self.cultures: List[str] = list(rules)
+        self.index: Dict[str, int] = {culture: i for i, culture in enumerate(self.cultures)}
+        self.profiles: List[Dict[str, Any]] = [{"culture": culture, **rules[culture]} for culture in self.cultures]
+
+        self.directness = np.array([rules[c]["directness_score"] for c in self.cultures], dtype=np.float64)
+        self.formality_levels: List[str] = sorted({rules[c]["formality_level"] for c in self.cultures})
+        level_codes = {level: i for i, level in enumerate(self.formality_levels)}
+        self.formality = np.array([level_codes[rules[c]["formality_level"]] for c in self.cultures], dtype=np.int32)
+
+        self.directness_gap = np.abs(self.directness[:, None] - self.directness[None, :])
+        self.formality_mismatch = self.formality[:, None] != self.formality[None, :]
+        self.mismatch = (self.directness_gap > DIRECTNESS_MISMATCH_THRESHOLD) | self.formality_mismatch
+
+        # Mismatch entries and recommendations for every ordered pair that mismatches
+        self.pair_mismatches: Dict[tuple, List[Dict[str, str]]] = {}
+        self.pair_recommendations: Dict[tuple, List[str]] = {}
+        for i, j in zip(*np.nonzero(self.mismatch)):
+            entries = self._pair_entries(int(i), int(j))
+            self.pair_mismatches[(int(i), int(j))] = entries
+            self.pair_recommendations[(int(i), int(j))] = self._pair_recommendations(entries)
+
+    def _pair_entries(self, i: int, j: int) -> List[Dict[str, str]]:
+        profile1, profile2 = self.profiles[i], self.profiles[j]
+        entries = []
+        gap = self.directness_gap[i, j]
+        if gap > DIRECTNESS_MISMATCH_THRESHOLD:
+            entries.append({
+                "type": "communication_style",
+                "cultures": f"{profile1['culture']} vs {profile2['culture']}",
+                "issue": f"Significant directness gap: {profile1['communication_style']} vs {profile2['communication_style']}",
+                "severity": "high" if gap > DIRECTNESS_HIGH_SEVERITY_THRESHOLD else "medium"
+            })
+        if self.formality_mismatch[i, j]:
+            entries.append({
+                "type": "formality",
+                "cultures": f"{profile1['culture']} vs {profile2['culture']}",
+                "issue": f"Formality mismatch: {profile1['formality_level']} vs {profile2['formality_level']}",
+                "severity": "medium"
+            })
+        return entries
+
+    def _pair_recommendations(self, entries: List[Dict[str, str]]) -> List[str]:
+        recommendations = []
+        for mismatch in entries:
+            if mismatch["type"] == "communication_style":
+                if "direct" in mismatch["issue"] and "indirect" in mismatch["issue"]:
+                    recommendations.append("Bridge communication styles: Use clear statements followed by diplomatic softening")
+                    recommendations.append("Allow extra time for indirect communicators to process and respond")
+            elif mismatch["type"] == "formality":
+                recommendations.append("Adapt formality level: Err on the side of more formal communication")
+                recommendations.append("Use titles and respectful address until informality is explicitly established")
+        return recommendations
+
+    def lookup(self, cultures: List[str]) -> "np.ndarray":
+        """Indices of the known cultures in query order"""
+        import numpy as np
+        return np.array([self.index[c] for c in cultures if c in self.index], dtype=np.intp)
+
+
+# Built-in rules used until the rule store or the on-disk cache has been loaded
+DEFAULT_CULTURAL_RULES = {
+    "american": {
+        "communication_style": "direct",
+        "directness_score": 0.8,
+        "formality_level": "informal",
+        "characteristics": ["direct communication", "time-conscious", "individual-focused"],
+        "negotiation_patterns": ["quick decision-making", "explicit agreements", "focus on facts"]
+    },
+    "japanese": {
+        "communication_style": "indirect",
+        "directness_score": 0.2,
+        "formality_level": "formal",
+        "characteristics": ["consensus-building", "non-verbal communication", "relationship-focused"],
+        "negotiation_patterns": ["long-term perspective", "implicit understanding", "harmony preservation"]
+    },
+    "german": {
+        "communication_style": "direct",
+        "directness_score": 0.9,
+        "formality_level": "formal",
+        "characteristics": ["precise communication", "fact-based", "structured approach"],
+        "negotiation_patterns": ["thorough preparation", "detailed discussions", "systematic approach"]
+    },
+    "chinese": {
+        "communication_style": "indirect",
+        "directness_score": 0.3,
+        "formality_level": "formal",
+        "characteristics": ["face-saving", "hierarchical respect", "relationship building"],
+        "negotiation_patterns": ["patience", "reciprocity", "long-term relationships"]
+    },
+    "british": {
+        "communication_style": "polite-indirect",
+        "directness_score": 0.4,
+        "formality_level": "formal",
+        "characteristics": ["understatement", "politeness", "diplomatic language"],
+        "negotiation_patterns": ["diplomatic approach", "compromise seeking", "procedural focus"]
+    },
+    "french": {
+        "communication_style": "eloquent",
+        "directness_score": 0.6,
+        "formality_level": "formal",
+        "characteristics": ["intellectual discourse", "logical arguments", "cultural pride"],
+        "negotiation_patterns": ["philosophical approach", "principled positions", "formal protocols"]
+    }
+}
+
+
+class RuleSnapshot:
+    """Immutable, versioned view of the rule set and its precomputed matrix"""
+
+    def __init__(self, version: str, rules: Dict[str, Dict[str, Any]], source: str):
+        self.version = version
+        self.rules = rules
+        self.source = source
+        self._matrix: Optional[CulturalRuleMatrix] = None
+        self.loaded_at = time.time()
+
+    @property
+    def matrix(self) -> CulturalRuleMatrix:
+        # Built on first use (or by warm_up), so importing the engine does not load NumPy
+        if self._matrix is None:
+            self._matrix = CulturalRuleMatrix(self.rules)
+        return self._matrix
+
+
+def build_snapshot(version: str, rules: Dict[str, Dict[str, Any]], source: str) -> RuleSnapshot:
+    """A snapshot with its matrix already computed"""
+    snapshot = RuleSnapshot(version, rules, source)
+    snapshot.matrix
+    return snapshot
+
+
+def validate_rules(rules: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Drop rules that are missing the fields the matrix needs"""
+    valid = {}
+    for culture, rule in rules.items():
+        if isinstance(rule, dict) and all(field in rule for field in REQUIRED_RULE_FIELDS):
+            valid[culture.lower().strip()] = rule
+        else:
+            logger.warning("Skipping invalid rule", culture=culture)
+    return valid
+
 
 class CulturalEngine:
-    def __init__(self):
-        self.cultural_rules = {
-            "american": {
-                "communication_style": "direct",
-                "directness_score": 0.8,
-                "formality_level": "informal",
-                "characteristics": ["direct communication", "time-conscious", "individual-focused"],
-                "negotiation_patterns": ["quick decision-making", "explicit agreements", "focus on facts"]
-            },
-            "japanese": {
-                "communication_style": "indirect",
-                "directness_score": 0.2,
-                "formality_level": "formal",
-                "characteristics": ["consensus-building", "non-verbal communication", "relationship-focused"],
-                "negotiation_patterns": ["long-term perspective", "implicit understanding", "harmony preservation"]
-            },
-            "german": {
-                "communication_style": "direct",
-                "directness_score": 0.9,
-                "formality_level": "formal",
-                "characteristics": ["precise communication", "fact-based", "structured approach"],
-                "negotiation_patterns": ["thorough preparation", "detailed discussions", "systematic approach"]
-            },
-            "chinese": {
-                "communication_style": "indirect",
-                "directness_score": 0.3,
-                "formality_level": "formal",
-                "characteristics": ["face-saving", "hierarchical respect", "relationship building"],
-                "negotiation_patterns": ["patience", "reciprocity", "long-term relationships"]
-            },
-            "british": {
-                "communication_style": "polite-indirect",
-                "directness_score": 0.4,
-                "formality_level": "formal",
-                "characteristics": ["understatement", "politeness", "diplomatic language"],
-                "negotiation_patterns": ["diplomatic approach", "compromise seeking", "procedural focus"]
-            },
-            "french": {
-                "communication_style": "eloquent",
-                "directness_score": 0.6,
-                "formality_level": "formal",
-                "characteristics": ["intellectual discourse", "logical arguments", "cultural pride"],
-                "negotiation_patterns": ["philosophical approach", "principled positions", "formal protocols"]
-            }
-        }
+    def __init__(self, cache_path: Optional[str] = None):
+        # Lexicons for text flagging are data-driven; add categories in the JSON file
+        self.lexicon_matcher = LexiconMatcher.from_file(settings.CULTURAL_LEXICONS_PATH)
+        self.cache_path = cache_path or settings.CULTURAL_RULES_CACHE_PATH
+        self.rule_store = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Readers take one reference to the current snapshot; refreshes swap it atomically
+        self.snapshot = self._load_cached_snapshot() or RuleSnapshot("builtin", DEFAULT_CULTURAL_RULES, "builtin")
+
+    @property
+    def cultural_rules(self) -> Dict[str, Dict[str, Any]]:
+        return self.snapshot.rules
+
+    @property
+    def matrix(self) -> CulturalRuleMatrix:
+        return self.snapshot.matrix
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    def warm_up(self):
+        """Load NumPy and build the current matrix ahead of the first query"""
+        self.matrix
+
+    def _load_cached_snapshot(self) -> Optional[RuleSnapshot]:
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            snapshot = RuleSnapshot(cached["version"], validate_rules(cached["rules"]), "disk_cache")
+            logger.info("Loaded rules from cache", cultures=len(snapshot.rules), version=snapshot.version)
+            return snapshot
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable rule cache", error=str(e))
+            return None
+
+    def _write_cache(self, snapshot: RuleSnapshot):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump({"version": snapshot.version, "rules": snapshot.rules}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not write rule cache", error=str(e))
+
+    def _get_rule_store(self):
+        if self.rule_store is None:
+            from .supabase_service import get_supabase_service
+            self.rule_store = get_supabase_service()
+        return self.rule_store
+
+    async def refresh(self) -> bool:
+        """Reload rules from the store if its version changed; returns True if a new snapshot was swapped in"""
+        try:
+            store = self._get_rule_store()
+            version = await store.get_cultural_rules_version()
+        except Exception as e:
+            logger.warning("Rule store unavailable, keeping current rules", version=self.snapshot.version, error=str(e))
+            return False
+
+        if not version or version == self.snapshot.version:
+            return False
+
+        stored_rules = validate_rules(await store.get_cultural_rules())
+        if not stored_rules:
+            return False
+
+        # Precomputing the matrix is CPU work, so build the snapshot off the event loop
+        snapshot = await asyncio.to_thread(build_snapshot, version, {**DEFAULT_CULTURAL_RULES, **stored_rules}, "store")
+        self.snapshot = snapshot
+        self._write_cache(snapshot)
+        logger.info("Swapped in rule version", version=version, cultures=len(snapshot.rules))
+        return True
+
+    async def _refresh_loop(self, interval_seconds: float):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval_seconds)
+
+    def start_background_refresh(self, interval_seconds: float = None):
+        if self._refresh_task is None or self._refresh_task.done():
+            interval = interval_seconds or settings.CULTURAL_RULES_REFRESH_SECONDS
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval))
+
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
 
     def analyze_cultural_context(self, cultures: List[str], text_content: str = None) -> Dict[str, Any]:
         """Analyze cultural context and potential friction points"""
+        import numpy as np
         if not cultures:
             return {
                 "analysis": "No cultural backgrounds specified",
@@ -56,15 +277,9 @@ class CulturalEngine:
                 "recommendations": []
             }
 
-        normalized_cultures = [culture.lower().strip() for culture in cultures]
-        cultural_profiles = []
-        
-        for culture in normalized_cultures:
-            if culture in self.cultural_rules:
-                cultural_profiles.append({
-                    "culture": culture,
-                    **self.cultural_rules[culture]
-                })
+        matrix = self.matrix
+        indices = matrix.lookup([culture.lower().strip() for culture in cultures])
+        cultural_profiles = [dict(matrix.profiles[i]) for i in indices]
 
         if len(cultural_profiles) < 2:
             return {
@@ -74,64 +289,42 @@ class CulturalEngine:
             }
 
         # Identify potential mismatches
-        mismatches = self._identify_mismatches(cultural_profiles)
-        recommendations = self._generate_recommendations(cultural_profiles, mismatches)
+        pairs = self._mismatched_pairs(matrix, indices)
+        mismatches = [entry for pair in pairs for entry in matrix.pair_mismatches[pair]]
+        recommendations = self._generate_recommendations(matrix, indices, pairs)
+
+        directness = matrix.directness[indices]
+        levels_present = [matrix.formality_levels[code] for code in np.unique(matrix.formality[indices])]
 
         return {
             "cultural_profiles": cultural_profiles,
             "potential_mismatches": mismatches,
             "recommendations": recommendations,
-            "directness_gap": self._calculate_directness_gap(cultural_profiles),
-            "formality_alignment": self._check_formality_alignment(cultural_profiles)
+            "directness_gap": float(directness.max() - directness.min()),
+            "formality_alignment": {
+                "aligned": len(levels_present) == 1,
+                "levels_present": levels_present,
+                "recommendation": "formal" if "formal" in levels_present else "informal"
+            }
         }
 
-    def _identify_mismatches(self, profiles: List[Dict]) -> List[Dict[str, str]]:
-        """Identify potential cultural mismatches"""
-        mismatches = []
-        
-        for i, profile1 in enumerate(profiles):
-            for profile2 in profiles[i+1:]:
-                # Directness mismatch
-                directness_diff = abs(profile1["directness_score"] - profile2["directness_score"])
-                if directness_diff > 0.4:
-                    mismatches.append({
-                        "type": "communication_style",
-                        "cultures": f"{profile1['culture']} vs {profile2['culture']}",
-                        "issue": f"Significant directness gap: {profile1['communication_style']} vs {profile2['communication_style']}",
-                        "severity": "high" if directness_diff > 0.6 else "medium"
-                    })
-
-                # Formality mismatch
-                if profile1["formality_level"] != profile2["formality_level"]:
-                    mismatches.append({
-                        "type": "formality",
-                        "cultures": f"{profile1['culture']} vs {profile2['culture']}",
-                        "issue": f"Formality mismatch: {profile1['formality_level']} vs {profile2['formality_level']}",
-                        "severity": "medium"
-                    })
-
-        return mismatches
-
-    def _generate_recommendations(self, profiles: List[Dict], mismatches: List[Dict]) -> List[str]:
+    def _mismatched_pairs(self, matrix: CulturalRuleMatrix, indices: "np.ndarray") -> List[tuple]:
+        """Ordered (i, j) culture pairs that mismatch, in query order"""
+        import numpy as np
+        rows, cols = np.triu_indices(len(indices), k=1)
+        left, right = indices[rows], indices[cols]
+        selected = matrix.mismatch[left, right]
+        return list(zip(left[selected].tolist(), right[selected].tolist()))
+
+    def _generate_recommendations(self, matrix: CulturalRuleMatrix, indices: "np.ndarray", pairs: List[tuple]) -> List[str]:
         """Generate cultural adaptation recommendations"""
-        recommendations = []
-        
-        if not mismatches:
-            recommendations.append("Cultural alignment appears good - maintain current communication approach")
-            return recommendations
+        if not pairs:
+            return ["Cultural alignment appears good - maintain current communication approach"]
 
-        for mismatch in mismatches:
-            if mismatch["type"] == "communication_style":
-                if "direct" in mismatch["issue"] and "indirect" in mismatch["issue"]:
-                    recommendations.append("Bridge communication styles: Use clear statements followed by diplomatic softening")
-                    recommendations.append("Allow extra time for indirect communicators to process and respond")
-                    
-            elif mismatch["type"] == "formality":
-                recommendations.append("Adapt formality level: Err on the side of more formal communication")
-                recommendations.append("Use titles and respectful address until informality is explicitly established")
+        recommendations = [rec for pair in pairs for rec in matrix.pair_recommendations[pair]]
 
         # Add general recommendations based on specific cultures present
-        cultures = [p["culture"] for p in profiles]
+        cultures = {matrix.cultures[i] for i in indices}
         
         if "japanese" in cultures or "chinese" in cultures:
             recommendations.append("Allow for face-saving opportunities and avoid direct confrontation")
@@ -144,50 +337,72 @@ class CulturalEngine:
 
         return recommendations
 
-    def _calculate_directness_gap(self, profiles: List[Dict]) -> float:
-        """Calculate the gap in directness scores"""
-        if len(profiles) < 2:
-            return 0.0
-        
-        scores = [p["directness_score"] for p in profiles]
-        return max(scores) - min(scores)
+    def flag_cultural_issues_in_text(self, text: str, cultures: List[str]) -> List[Dict[str, Any]]:
+        """Flag potential cultural issues in text content.
 
-    def _check_formality_alignment(self, profiles: List[Dict]) -> Dict[str, Any]:
-        """Check alignment in formality levels"""
-        formality_levels = [p["formality_level"] for p in profiles]
-        unique_levels = set(formality_levels)
-        
+        Returns one flag per lexicon category that is sensitive for the given
+        cultures, with every matching term and its character offsets.
+        """
+        relevant = self._relevant_categories(cultures)
+        if not relevant:
+            return []
+        return self._build_flags(self.lexicon_matcher.find_all(text), relevant)
+
+    def flag_cultural_issues_batch(self, texts: List[str], cultures_list: List[List[str]]) -> List[List[Dict[str, Any]]]:
+        """Flag cultural issues across many texts with a single matcher pass.
+
+        The texts are joined with NUL separators (never part of a term or of
+        the whitespace between words, so no match can span two texts), scanned
+        once, and the hits are assigned back to their texts by offset.
+        """
+        import numpy as np
+        if not texts:
+            return []
+        separator = "\0"
+        starts = np.cumsum([0] + [len(text) + len(separator) for text in texts[:-1]])
+        hits_by_text: List[List[Dict[str, Any]]] = [[] for _ in texts]
+        for hit in self.lexicon_matcher.find_all(separator.join(texts)):
+            position = int(np.searchsorted(starts, hit["start"], side="right")) - 1
+            offset = int(starts[position])
+            hits_by_text[position].append({**hit, "start": hit["start"] - offset, "end": hit["end"] - offset})
+
+        relevant_cache: Dict[tuple, set] = {}
+        results = []
+        for hits, cultures in zip(hits_by_text, cultures_list):
+            key = tuple(sorted(cultures))
+            if key not in relevant_cache:
+                relevant_cache[key] = self._relevant_categories(cultures)
+            results.append(self._build_flags(hits, relevant_cache[key]) if relevant_cache[key] else [])
+        return results
+
+    def _relevant_categories(self, cultures: List[str]) -> set:
+        """Lexicon categories that are sensitive for any of the given cultures"""
+        normalized_cultures = {culture.lower() for culture in cultures}
         return {
-            "aligned": len(unique_levels) == 1,
-            "levels_present": list(unique_levels),
-            "recommendation": "formal" if "formal" in unique_levels else "informal"
+            category for category, spec in self.lexicon_matcher.categories.items()
+            if normalized_cultures.intersection(spec.get("sensitive_cultures", []))
         }
 
-    def flag_cultural_issues_in_text(self, text: str, cultures: List[str]) -> List[Dict[str, str]]:
-        """Flag potential cultural issues in text content"""
-        flags = []
-        text_lower = text.lower()
-        
-        # Direct criticism flags
-        direct_criticism_words = ["wrong", "mistake", "error", "bad idea", "disagree", "no"]
-        if any(word in text_lower for word in direct_criticism_words):
-            asian_cultures = ["japanese", "chinese", "korean"]
-            if any(culture.lower() in asian_cultures for culture in cultures):
-                flags.append({
-                    "type": "direct_criticism",
-                    "issue": "Direct criticism detected - may cause face-loss for Asian participants",
-                    "suggestion": "Consider softer language like 'perhaps we could explore alternatives'"
+    def _build_flags(self, hits: List[Dict[str, Any]], relevant: set) -> List[Dict[str, Any]]:
+        categories = self.lexicon_matcher.categories
+        matches: Dict[str, List[Dict[str, Any]]] = {}
+        for hit in hits:
+            if hit["category"] in relevant:
+                matches.setdefault(hit["category"], []).append({
+                    "term": hit["term"],
+                    "start": hit["start"],
+                    "end": hit["end"]
                 })
 
-        # Time pressure flags
-        urgency_words = ["immediately", "asap", "urgent", "deadline", "hurry"]
-        if any(word in text_lower for word in urgency_words):
-            relationship_cultures = ["japanese", "chinese", "arab"]
-            if any(culture.lower() in relationship_cultures for culture in cultures):
-                flags.append({
-                    "type": "time_pressure",
-                    "issue": "Time pressure language may conflict with relationship-building cultures",
-                    "suggestion": "Emphasize the importance while allowing for relationship considerations"
-                })
+        flags = []
+        for category, category_matches in matches.items():
+            flags.append({
+                "type": category,
+                "issue": categories[category]["issue"],
+                "suggestion": categories[category]["suggestion"],
+                "matches": category_matches
+            })
+        return flags
 
-        return flags
\ No newline at end of file
+# Global instance
+cultural_engine = CulturalEngine()
@@ -0,0 +1,169 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from config import settings
+from .accounting import CHARS_PER_TOKEN
+from .metrics import record_cache
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+PARAGRAPH_SEPARATOR = "\n\n"
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+RISK_LEVELS = ["low", "medium", "high", "critical"]
+
+
+def estimate_text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Split one paragraph on sentence boundaries, hard-splitting sentences that alone exceed the budget"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for sentence in SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            # Prefer to cut at the last space inside the budget
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """Split text into chunks within a token budget, on paragraph then sentence boundaries.
+
+    Paragraphs are packed greedily, so an edit to one section only changes the
+    chunk that contains it (and at most shifts the boundary of its neighbour).
+    """
+    units = []
+    for paragraph in PARAGRAPH_BREAK.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_text_tokens(paragraph) > max_tokens:
+            units.extend(_split_oversized(paragraph, max_tokens))
+        else:
+            units.append(paragraph)
+
+    chunks = []
+    current: List[str] = []
+    current_chars = 0
+    for unit in units:
+        # Measured on the joined text, separators included, so many small units cannot overrun the budget
+        joined_chars = current_chars + len(PARAGRAPH_SEPARATOR) + len(unit) if current else len(unit)
+        if current and joined_chars // CHARS_PER_TOKEN > max_tokens:
+            chunks.append(PARAGRAPH_SEPARATOR.join(current))
+            current, joined_chars = [], len(unit)
+        current.append(unit)
+        current_chars = joined_chars
+    if current:
+        chunks.append(PARAGRAPH_SEPARATOR.join(current))
+    return chunks
+
+
+class ChunkCache:
+    """Bounded LRU cache of chunk-level analyses keyed by a hash of the chunk and prompt"""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None or time.time() - entry[0] > self.ttl_seconds:
+            self.stats["misses"] += 1
+            record_cache("news_chunks", False)
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        record_cache("news_chunks", True)
+        return entry[1]
+
+    def put(self, key: str, value: Dict[str, Any]):
+        self.entries[key] = (time.time(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "entries": len(self.entries)}
+
+
+def _as_list(value: Any) -> List[Any]:
+    """A list field of a chunk analysis; models sometimes answer a single item as a bare string"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _dedupe(values: List[Any]) -> List[Any]:
+    """Keep the first occurrence of each value, comparing strings case-insensitively"""
+    seen = set()
+    result = []
+    for value in values:
+        marker = value.strip().lower() if isinstance(value, str) else repr(value)
+        if marker not in seen:
+            seen.add(marker)
+            result.append(value)
+    return result
+
+
+def merge_news_analyses(analyses: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """Reduce chunk-level news analyses into one report.
+
+    Risk takes the highest chunk level; entities are ranked by how many chunks
+    mention them; implications and recommendations are de-duplicated in
+    document order; sentiment is the length-weighted majority.
+    """
+    if len(analyses) == 1:
+        return dict(analyses[0])
+
+    risk_ranks = [RISK_LEVELS.index(str(a.get("risk_level", "")).lower()) for a in analyses
+                  if str(a.get("risk_level", "")).lower() in RISK_LEVELS]
+
+    entity_counts: Dict[str, int] = {}
+    entity_names: Dict[str, str] = {}
+    for analysis in analyses:
+        for entity in _dedupe([e for e in _as_list(analysis.get("key_entities")) if isinstance(e, str)]):
+            marker = entity.strip().lower()
+            entity_counts[marker] = entity_counts.get(marker, 0) + 1
+            entity_names.setdefault(marker, entity)
+    # Stable sort keeps first-mention order among equally frequent entities
+    key_entities = [entity_names[m] for m in sorted(entity_counts, key=lambda m: -entity_counts[m])]
+
+    sentiment_weights: Dict[str, float] = {}
+    confidence_total = 0.0
+    for analysis, weight in zip(analyses, weights):
+        sentiment = analysis.get("sentiment_analysis") or {}
+        label = sentiment.get("overall_sentiment")
+        if label:
+            sentiment_weights[label] = sentiment_weights.get(label, 0.0) + weight
+        confidence_total += float(sentiment.get("confidence", 0) or 0) * weight
+
+    overviews = [a.get("diplomatic_overview") for a in analyses if a.get("diplomatic_overview")]
+
+    return {
+        "diplomatic_overview": " ".join(overviews),
+        "risk_level": RISK_LEVELS[max(risk_ranks)] if risk_ranks else "unknown",
+        "strategic_recommendations": _dedupe([r for a in analyses for r in _as_list(a.get("strategic_recommendations"))]),
+        "key_entities": key_entities,
+        "sentiment_analysis": {
+            "overall_sentiment": max(sentiment_weights, key=sentiment_weights.get) if sentiment_weights else "neutral",
+            "confidence": round(confidence_total / sum(weights), 2) if sum(weights) else 0
+        },
+        "geopolitical_implications": _dedupe([i for a in analyses for i in _as_list(a.get("geopolitical_implications"))])
+    }
+
+
+# Global instance
+news_chunk_cache = ChunkCache(max_entries=settings.NEWS_CHUNK_CACHE_SIZE)
@@ -0,0 +1,335 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Set, Union
+from fastapi import WebSocket
+from config import settings
+from .serialization import dumps_str, unwrap
+from .tracing import tracer
+from .metrics import record_broadcast, set_websocket_connections
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Progress-style events where a client only needs the latest state within its coalescing window
+COALESCABLE_EVENTS = {"facial_analysis_update", "video_analysis_progress"}
+
+
+def merge_patch(old: Any, new: Any) -> Any:
+    """JSON merge patch (RFC 7396) that turns old into new: changed keys only, removed keys as null"""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new
+    patch = {}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif old[key] != value:
+            patch[key] = merge_patch(old[key], value)
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+class EventEncoder:
+    """Wire format a client negotiated at connect: JSON or MessagePack, with optional deltas and coalescing.
+
+    With delta on, the data of an event is sent as a merge patch against the
+    data of the previous event of the same type sent to this client, the
+    meeting_id implied by the socket is dropped, and completion events carry
+    their compact form instead of repeating every frame already sent.
+    """
+
+    def __init__(self, encoding: str = "json", delta: bool = False, coalesce_ms: int = 0):
+        self.encoding = "msgpack" if encoding == "msgpack" and msgpack is not None else "json"
+        self.delta = delta
+        self.coalesce_ms = coalesce_ms
+        self.last_data: Dict[str, Any] = {}
+
+    @property
+    def is_default(self) -> bool:
+        return self.encoding == "json" and not self.delta and not self.coalesce_ms
+
+    def config(self) -> Dict[str, Any]:
+        return {"encoding": self.encoding, "delta": self.delta, "coalesce_ms": self.coalesce_ms}
+
+    def encode(self, event: Dict[str, Any], compact_data: Any = None) -> Union[str, bytes]:
+        # Deltas and MessagePack need the values themselves, not payloads pre-encoded as JSON
+        event = {key: unwrap(value) for key, value in event.items()}
+        if self.delta:
+            event.pop("meeting_id", None)
+            if compact_data is not None:
+                event["data"] = compact_data
+            if "data" in event:
+                data = event.pop("data")
+                previous = self.last_data.get(event["type"])
+                if isinstance(previous, dict) and isinstance(data, dict):
+                    event["patch"] = merge_patch(previous, data)
+                else:
+                    event["data"] = data
+                self.last_data[event["type"]] = data
+        if self.encoding == "msgpack":
+            return msgpack.packb(event, default=str)
+        return dumps_str(event)
+
+
+class MeetingEventLog:
+    """Per-meeting sequence numbers and a ring buffer of the most recent events"""
+
+    def __init__(self, buffer_size: int):
+        self.next_seq = 1
+        # (seq, event, default JSON message, compact data) tuples; the oldest fall off once the buffer is full
+        self.events: deque = deque(maxlen=buffer_size)
+        self.updated_at = time.time()
+
+    def append(self, event: Dict[str, Any], compact_data: Any = None) -> tuple:
+        event["seq"] = self.next_seq
+        self.next_seq += 1
+        # Serialized once for every client on the default encoding, reusing pre-encoded payloads
+        entry = (event["seq"], event, dumps_str(event), compact_data)
+        self.events.append(entry)
+        self.updated_at = time.time()
+        return entry
+
+    @property
+    def last_seq(self) -> int:
+        return self.next_seq - 1
+
+    @property
+    def oldest_seq(self) -> Optional[int]:
+        return self.events[0][0] if self.events else None
+
+    def since(self, last_seq: int) -> List[tuple]:
+        return [entry for entry in self.events if entry[0] > last_seq]
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, meeting_id: str, encoder: Optional[EventEncoder] = None):
+        self.websocket = websocket
+        self.meeting_id = meeting_id
+        self.encoder = encoder or EventEncoder()
+        # Serializes sends so a replay and live broadcasts cannot interleave out of order
+        self.lock = asyncio.Lock()
+        # Latest held-back coalescable event and when the last one went out
+        self.pending: Optional[tuple] = None
+        self.last_sent: Dict[str, float] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class ConnectionManager:
+    """WebSocket fan-out per meeting, with sequence-numbered events that reconnecting clients can replay.
+
+    Every broadcast event gets the next sequence number of its meeting and is
+    kept in that meeting's ring buffer. A client that reconnects with the last
+    sequence number it saw receives just the events it missed, or a
+    replay_incomplete notice when the gap is older than the buffer and it has
+    to reload state (e.g. from /meetings/{id}/state) instead.
+    """
+
+    def __init__(self, buffer_size: int = 500, max_meetings: int = 256):
+        self.buffer_size = buffer_size
+        self.max_meetings = max_meetings
+        self.connections: Dict[str, Set[Connection]] = {}
+        self.logs: "OrderedDict[str, MeetingEventLog]" = OrderedDict()
+        self.stats: Dict[str, int] = {"events": 0, "replays": 0, "replayed_events": 0, "incomplete_replays": 0,
+                                      "dropped_connections": 0, "coalesced": 0, "bytes_sent": 0}
+
+    def _log(self, meeting_id: str) -> MeetingEventLog:
+        log = self.logs.get(meeting_id)
+        if log is None:
+            log = self.logs[meeting_id] = MeetingEventLog(self.buffer_size)
+        self.logs.move_to_end(meeting_id)
+        # Only forget meetings nobody is watching; their clients would lose the sequence
+        for candidate in list(self.logs):
+            if len(self.logs) <= self.max_meetings:
+                break
+            if candidate != meeting_id and not self.connections.get(candidate):
+                del self.logs[candidate]
+        return log
+
+    async def _send(self, connection: Connection, message: Union[str, bytes]) -> bool:
+        try:
+            if isinstance(message, bytes):
+                await connection.websocket.send_bytes(message)
+            else:
+                await connection.websocket.send_text(message)
+            self.stats["bytes_sent"] += len(message)
+            return True
+        except Exception:
+            return False
+
+    async def _send_control(self, connection: Connection, event: Dict[str, Any]) -> bool:
+        # Control messages go out in the client's encoding but are never diffed
+        if connection.encoder.encoding == "msgpack":
+            return await self._send(connection, msgpack.packb(event, default=str))
+        return await self._send(connection, dumps_str(event))
+
+    async def _deliver(self, connection: Connection, entry: tuple, coalesce: bool = True) -> bool:
+        """Send one logged event in the connection's encoding; call with the connection lock held"""
+        _, event, message, compact_data = entry
+        encoder = connection.encoder
+        if encoder.is_default:
+            return await self._send(connection, message)
+        if coalesce and encoder.coalesce_ms and event["type"] in COALESCABLE_EVENTS:
+            window = encoder.coalesce_ms / 1000
+            if connection.pending is not None and connection.pending[1]["type"] != event["type"]:
+                if not await self._flush_pending(connection):
+                    return False
+            if connection.pending is None and time.monotonic() - connection.last_sent.get(event["type"], 0.0) >= window:
+                connection.last_sent[event["type"]] = time.monotonic()
+                return await self._send(connection, encoder.encode(event, compact_data))
+            # Within the window: hold only the latest and send it when the window closes
+            if connection.pending is not None:
+                self.stats["coalesced"] += 1
+            connection.pending = entry
+            if connection.flush_task is None or connection.flush_task.done():
+                delay = connection.last_sent.get(event["type"], 0.0) + window - time.monotonic()
+                connection.flush_task = asyncio.create_task(self._flush_later(connection, max(delay, 0.0)))
+            return True
+        # Anything else goes out in order, after the update it may depend on
+        if not await self._flush_pending(connection):
+            return False
+        return await self._send(connection, encoder.encode(event, compact_data))
+
+    async def _flush_pending(self, connection: Connection) -> bool:
+        if connection.pending is None:
+            return True
+        _, event, _, compact_data = connection.pending
+        connection.pending = None
+        connection.last_sent[event["type"]] = time.monotonic()
+        return await self._send(connection, connection.encoder.encode(event, compact_data))
+
+    async def _flush_later(self, connection: Connection, delay: float):
+        await asyncio.sleep(delay)
+        async with connection.lock:
+            sent = await self._flush_pending(connection)
+        if not sent:
+            self._drop(connection)
+
+    def _drop(self, connection: Connection):
+        # A dead socket must not break the analysis that is broadcasting
+        self.stats["dropped_connections"] += 1
+        self.disconnect(connection)
+
+    async def connect(self, websocket: WebSocket, meeting_id: str, last_seq: Optional[int] = None,
+                      encoder: Optional[EventEncoder] = None, announce: bool = False) -> Connection:
+        """Accept a client; announce sends the negotiated stream config first, before any replay"""
+        await websocket.accept()
+        connection = Connection(websocket, meeting_id, encoder)
+        async with connection.lock:
+            # Registering and taking the replay snapshot happen without an await in between,
+            # so every event is either in the replay or delivered live after it
+            self.connections.setdefault(meeting_id, set()).add(connection)
+            set_websocket_connections(meeting_id, len(self.connections[meeting_id]))
+            if announce:
+                await self._send_control(connection, {"type": "stream_config", "meeting_id": meeting_id, **connection.encoder.config()})
+            if last_seq is not None:
+                await self._replay(connection, last_seq)
+        return connection
+
+    def disconnect(self, connection: Connection):
+        if connection.flush_task is not None:
+            connection.flush_task.cancel()
+        connections = self.connections.get(connection.meeting_id)
+        if connections is not None:
+            connections.discard(connection)
+            set_websocket_connections(connection.meeting_id, len(connections))
+            if not connections:
+                del self.connections[connection.meeting_id]
+
+    async def _replay(self, connection: Connection, last_seq: int):
+        log = self._log(connection.meeting_id)
+        missed = log.since(last_seq)
+        self.stats["replays"] += 1
+        self.stats["replayed_events"] += len(missed)
+        # A gap older than the buffer, or a sequence from before a server restart, cannot be filled
+        oldest = log.oldest_seq
+        if last_seq > log.last_seq or (oldest is not None and last_seq < oldest - 1):
+            self.stats["incomplete_replays"] += 1
+            await self._send_control(connection, {
+                "type": "replay_incomplete",
+                "meeting_id": connection.meeting_id,
+                "requested_from": last_seq + 1,
+                "oldest_seq": oldest,
+                "last_seq": log.last_seq
+            })
+        for entry in missed:
+            # Replays are not coalesced: the client asked for exactly what it missed
+            if not await self._deliver(connection, entry, coalesce=False):
+                return
+        await self._send_control(connection, {
+            "type": "replay_complete",
+            "meeting_id": connection.meeting_id,
+            "replayed": len(missed),
+            "last_seq": log.last_seq
+        })
+
+    async def resume(self, connection: Connection, last_seq: int):
+        """Replay what a connected client missed, e.g. when it sends its last sequence number after connecting"""
+        async with connection.lock:
+            await self._replay(connection, last_seq)
+
+    async def send_personal_message(self, message: str, connection: Connection):
+        async with connection.lock:
+            await self._send(connection, message)
+
+    async def broadcast(self, event: Dict[str, Any], compact_data: Any = None) -> int:
+        """Number the event in its meeting's sequence, keep it for replay and send it to the meeting's clients.
+
+        compact_data, if given, replaces the event's data for clients that
+        negotiated deltas, e.g. frame numbers instead of every frame result
+        they already received. Returns the event's sequence number.
+        """
+        start = time.perf_counter()
+        connections = list(self.connections.get(event["meeting_id"], ()))
+        with tracer.span("ws.broadcast", meeting_id=event["meeting_id"], event=event.get("type"),
+                         frame=event.get("frame"), recipients=len(connections)) as span:
+            entry = self._log(event["meeting_id"]).append(event, compact_data)
+            self.stats["events"] += 1
+            span.set_attribute("seq", entry[0])
+            for connection in connections:
+                async with connection.lock:
+                    sent = await self._deliver(connection, entry)
+                if not sent:
+                    self._drop(connection)
+        record_broadcast(event.get("type", "unknown"), time.perf_counter() - start)
+        return entry[0]
+
+    async def close_all(self, code: int = 1012) -> int:
+        """Send coalesced events still pending, then close every socket; 1012 tells clients to reconnect and resume"""
+        connections = [connection for connections in self.connections.values() for connection in connections]
+        for connection in connections:
+            async with connection.lock:
+                await self._flush_pending(connection)
+            try:
+                await connection.websocket.close(code=code)
+            except Exception:
+                pass
+            self.disconnect(connection)
+        return len(connections)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "connections": sum(len(connections) for connections in self.connections.values()),
+            "meetings": len(self.logs),
+            "buffer_size": self.buffer_size,
+            "encodings": self._encodings()
+        }
+
+    def _encodings(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for connections in self.connections.values():
+            for connection in connections:
+                mode = connection.encoder.encoding + ("+delta" if connection.encoder.delta else "")
+                counts[mode] = counts.get(mode, 0) + 1
+        return counts
+
+
+# Global instance
+connection_manager = ConnectionManager(
+    buffer_size=settings.WS_REPLAY_BUFFER_SIZE,
+    max_meetings=settings.WS_REPLAY_MAX_MEETINGS
+)
@@ -0,0 +1,123 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+from . import video_frames
+from .video_frames import JPEG_QUALITY, MAX_SAMPLED_FRAMES, Frame
+from .structured_logging import get_logger
+from .tracing import tracer
+
+logger = get_logger("frames")
+
+
+def _unlink_abandoned(job: Future):
+    """Unlink the shared memory block of a process-mode job whose caller stopped waiting for it"""
+    if job.cancelled() or job.exception() is not None:
+        return
+    _, block, _ = job.result()
+    video_frames.unlink_shared_memory(block)
+
+
+class FramePool:
+    """Runs video decoding and JPEG encoding off the event loop, on a pool of its own.
+
+    OpenCV releases the GIL while it decodes, seeks and encodes, so "thread"
+    mode already uses several cores; "process" mode sidesteps the GIL for
+    the Python parts too, at the cost of a worker process per slot. Process
+    workers hand frames back through one shared memory block per job rather
+    than pickling them. `workers` bounds the decode jobs running at once;
+    later jobs wait in the pool's queue, not on the event loop.
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 0, quality: int = JPEG_QUALITY):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown frame pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.quality = quality
+        self.executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.stats: Dict[str, float] = {"jobs": 0, "frames": 0, "failed": 0, "restarts": 0, "job_seconds": 0.0}
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(self.workers, thread_name_prefix="frames")
+        # Spawned, not forked: the API process has logging, tracing and client threads a fork would copy mid-flight
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        if self.executor is None:
+            self.executor = self._create_executor()
+            # Start the workers and load OpenCV in each before the first video arrives
+            for _ in range(self.workers):
+                self.executor.submit(video_frames.warm_up)
+
+    def stop(self):
+        """Cancel queued jobs and wait for running ones; blocking, so call it off the event loop"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def _run(self, name: str, fn, shared_fn, *args) -> Tuple[Dict[str, Any], List[Frame]]:
+        if self.executor is None:
+            self.start()
+        # The pool this job runs on; a worker crash must only tear down this pool, not one started since
+        executor = self.executor
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        start = time.perf_counter()
+        with tracer.span("frame.decode", job=name, mode=self.mode) as span:
+            try:
+                if self.mode == "thread":
+                    info, frames = await loop.run_in_executor(executor, fn, *args)
+                else:
+                    job = executor.submit(shared_fn, *args)
+                    try:
+                        info, block, layout = await asyncio.wrap_future(job)
+                    except asyncio.CancelledError:
+                        # A job already running still writes its block, which no one will read now
+                        if not job.cancel():
+                            job.add_done_callback(_unlink_abandoned)
+                        raise
+                    frames = video_frames.from_shared_memory(block, layout)
+            except BrokenProcessPool:
+                # A worker died (e.g. OpenCV crashed on a corrupt file); every job on the pool fails, the next gets a fresh pool
+                self.stats["failed"] += 1
+                if self.executor is executor:
+                    self.stats["restarts"] += 1
+                    logger.error("Frame pool worker died, restarting the pool", job=name)
+                    self.executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+                raise ValueError("Video decoding failed")
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                # Submit to result, so it includes time queued behind other jobs
+                self.stats["job_seconds"] += time.perf_counter() - start
+            span.set_attributes(frames=len(frames), jpeg_bytes=sum(len(jpeg) for _, jpeg in frames))
+        self.stats["jobs"] += 1
+        self.stats["frames"] += len(frames)
+        return info, frames
+
+    async def sample_video(self, path: str, max_frames: int = MAX_SAMPLED_FRAMES) -> Tuple[Dict[str, Any], List[Frame]]:
+        """The video's frame count and fps, and up to `max_frames` evenly spaced frames as (index, jpeg) pairs"""
+        return await self._run("sample", video_frames.sample_video, video_frames.sample_video_shared, path, max_frames, self.quality)
+
+    async def extract_frame(self, path: str, progress: float) -> Tuple[Dict[str, Any], Frame]:
+        """The video's frame count and fps, and the (index, jpeg) frame at `progress` (0-1) through it"""
+        info, frames = await self._run("extract", video_frames.extract_frame, video_frames.extract_frame_shared, path, progress, self.quality)
+        return info, frames[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "job_seconds": round(self.stats["job_seconds"], 3),
+            "mode": self.mode,
+            "workers": self.workers,
+            "in_flight": self.in_flight
+        }
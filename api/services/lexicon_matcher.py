@@ -0,0 +1,62 @@
+import json
+import re
+from typing import Dict, Any, List
+
+
+def _trie_pattern(node: Dict[str, Any]) -> str:
+    """Turn a character trie into a regex so shared prefixes are matched once"""
+    end = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != ""]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not end:
+        return branches[0]
+    group = "(?:" + "|".join(branches) + ")"
+    return group + "?" if end else group
+
+
+def build_pattern(terms: List[str]) -> "re.Pattern":
+    """Compile terms into one case-insensitive, word-boundary-aware regex.
+
+    Whitespace inside multi-word terms matches any run of whitespace, and a
+    term never matches inside a longer word ("no" does not match "now").
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in " ".join(term.lower().split()):
+            node = node.setdefault(char, {})
+        node[""] = {}
+    body = _trie_pattern(trie).replace(re.escape(" "), r"\s+")
+    return re.compile(r"(?<!\w)" + body + r"(?!\w)", re.IGNORECASE)
+
+
+class LexiconMatcher:
+    """Single-pass matcher over every term of every lexicon category"""
+
+    def __init__(self, categories: Dict[str, Dict[str, Any]]):
+        self.categories = categories
+        self.term_categories: Dict[str, List[str]] = {}
+        for category, spec in categories.items():
+            for term in spec["terms"]:
+                self.term_categories.setdefault(" ".join(term.lower().split()), []).append(category)
+        self.pattern = build_pattern(list(self.term_categories))
+
+    @classmethod
+    def from_file(cls, path: str) -> "LexiconMatcher":
+        with open(path) as f:
+            return cls(json.load(f)["categories"])
+
+    def find_all(self, text: str) -> List[Dict[str, Any]]:
+        """Return every hit in the text with its category and character offsets"""
+        hits = []
+        for match in self.pattern.finditer(text):
+            term = " ".join(match.group(0).lower().split())
+            for category in self.term_categories.get(term, ()):
+                hits.append({
+                    "category": category,
+                    "term": term,
+                    "start": match.start(),
+                    "end": match.end()
+                })
+        return hits
@@ -0,0 +1,147 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from config import settings
+from .accounting import CHARS_PER_TOKEN, pricing_table
+from .cultural_engine import cultural_engine
+from .lexicon_matcher import LexiconMatcher
+from .simple_usage_tracker import simple_usage_tracker
+
+# Completion size assumed when estimating what a skipped sentiment call would have cost
+EXPECTED_COMPLETION_TOKENS = 150
+# Share of a text's words that courtesy formulas must cover for it to count as a confidently neutral pleasantry
+COURTESY_COVERAGE = 0.6
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class LocalDecision:
+    """Outcome of the local tier: a local-only result, or the reason the text needs the model"""
+    escalate: bool
+    reason: str
+    confidence: float
+    result: Dict[str, Any] = field(default_factory=dict)
+
+
+class LocalSentimentClassifier:
+    """CPU-only lexicon classifier that answers trivial, clearly neutral snippets without GPT-4o.
+
+    Anything long, carrying sentiment, negated, culturally flagged or containing
+    escalation language is sent to the model; only short courtesy formulas and
+    other neutral texts are answered locally, and those results are marked with
+    analysis_tier "local".
+    """
+
+    def __init__(self, lexicon_path: str, confidence_threshold: float = 0.8, max_tokens: int = 64, enabled: bool = True):
+        self.matcher = LexiconMatcher.from_file(lexicon_path)
+        self.confidence_threshold = confidence_threshold
+        self.max_tokens = max_tokens
+        self.enabled = enabled
+        self.stats: Dict[str, Any] = {
+            "classified": 0,
+            "local": 0,
+            "escalated": 0,
+            "escalation_reasons": {},
+            "local_latency_ms_total": 0.0,
+            "estimated_cost_saved_usd": 0.0
+        }
+
+    def _score(self, text: str) -> Dict[str, int]:
+        counts = {category: 0 for category in self.matcher.categories}
+        counts["courtesy_words"] = 0
+        for hit in self.matcher.find_all(text):
+            counts[hit["category"]] += 1
+            if hit["category"] == "courtesy":
+                counts["courtesy_words"] += len(WORD_PATTERN.findall(hit["term"]))
+        return counts
+
+    def classify(self, text: str, cultures: List[str] = []) -> LocalDecision:
+        """Classify one text locally and decide whether it must be escalated to the model"""
+        if not self.enabled:
+            return LocalDecision(True, "local_tier_disabled", 0.0)
+        if len(text) // CHARS_PER_TOKEN > self.max_tokens:
+            return LocalDecision(True, "too_long", 0.0)
+
+        counts = self._score(text)
+        positive, negative = counts["positive"], counts["negative"]
+        if counts["escalation"]:
+            return LocalDecision(True, "escalation_language", 0.0)
+        if counts["negation"] and (positive or negative):
+            # Negated sentiment ("we do not support") is beyond a lexicon
+            return LocalDecision(True, "negation", 0.0)
+
+        if positive or negative:
+            # Support, rejection and concern are where the model's cultural and friction analysis matters most
+            return LocalDecision(True, "sentiment_language", 0.0)
+
+        flags = cultural_engine.flag_cultural_issues_in_text(text, cultures)
+        if flags:
+            return LocalDecision(True, "cultural_flags", 0.0)
+
+        # A text that is mostly courtesy formulas is confidently neutral; a formula in front of
+        # substantive content ("Thank you, Mr. Chairman. We will ...") says little about it
+        words = len(WORD_PATTERN.findall(text))
+        pleasantry = words and counts["courtesy_words"] / words > COURTESY_COVERAGE
+        confidence = 0.9 if pleasantry else 0.7
+
+        if confidence < self.confidence_threshold:
+            return LocalDecision(True, "low_confidence", confidence)
+
+        return LocalDecision(False, "confident", confidence, {
+            "sentiment": "neutral",
+            "polarity": 0.0,
+            "cultural_flags": [],
+            "communication_style_analysis": "Classified locally from diplomatic lexicons; not reviewed by the model.",
+            "cultural_analysis": cultural_engine.analyze_cultural_context(cultures, text),
+            "cultural_flags_detailed": flags,
+            "analysis_tier": "local",
+            "local_confidence": round(confidence, 2)
+        })
+
+    def record(self, decision: LocalDecision, latency_ms: float, skipped_prompt_tokens: int = 0, model: str = "gpt-4o"):
+        """Count a decision; for local answers, add the estimated cost of the skipped model call"""
+        self.stats["classified"] += 1
+        if decision.escalate:
+            self.stats["escalated"] += 1
+            reasons = self.stats["escalation_reasons"]
+            reasons[decision.reason] = reasons.get(decision.reason, 0) + 1
+            return
+        self.stats["local"] += 1
+        self.stats["local_latency_ms_total"] += latency_ms
+        self.stats["estimated_cost_saved_usd"] += pricing_table.chat_cost(
+            model, skipped_prompt_tokens, EXPECTED_COMPLETION_TOKENS
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        classified = self.stats["classified"]
+        local = self.stats["local"]
+        # Latency saved is measured against the observed average of real sentiment calls
+        model_stats = simple_usage_tracker.service_stats.get("openai_text_sentiment")
+        model_latency_ms: Optional[float] = None
+        if model_stats and model_stats["request_count"]:
+            model_latency_ms = model_stats["total_response_time"] / model_stats["request_count"]
+        local_latency_ms = self.stats["local_latency_ms_total"] / local if local else 0.0
+
+        return {
+            "enabled": self.enabled,
+            "confidence_threshold": self.confidence_threshold,
+            "classified": classified,
+            "answered_locally": local,
+            "escalated": self.stats["escalated"],
+            "escalation_rate": round(self.stats["escalated"] / classified, 4) if classified else 0.0,
+            "escalation_reasons": dict(self.stats["escalation_reasons"]),
+            "avg_local_latency_ms": round(local_latency_ms, 3),
+            "avg_model_latency_ms": round(model_latency_ms, 1) if model_latency_ms is not None else None,
+            "estimated_latency_saved_ms": round(local * (model_latency_ms - local_latency_ms), 1) if model_latency_ms is not None else None,
+            "estimated_cost_saved_usd": round(self.stats["estimated_cost_saved_usd"], 6)
+        }
+
+
+# Global instance
+local_classifier = LocalSentimentClassifier(
+    settings.SENTIMENT_LEXICON_PATH,
+    confidence_threshold=settings.LOCAL_TIER_CONFIDENCE,
+    max_tokens=settings.LOCAL_TIER_MAX_TOKENS,
+    enabled=settings.LOCAL_TIER_ENABLED
+)
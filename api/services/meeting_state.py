@@ -0,0 +1,244 @@
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+from config import settings
+from .structured_logging import get_logger
+
+logger = get_logger("meeting_state")
+
+RISK_ORDER = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+# Stress or risk at or above these levels marks a moment worth citing in the cable
+FLAGGED_STRESS_LEVEL = 0.7
+FLAGGED_RISK_LEVELS = ("high", "critical")
+
+
+class RunningStat:
+    """Count, mean, min and max of a stream without storing it"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "mean": round(self.mean, 3), "min": round(self.min, 3), "max": round(self.max, 3)}
+
+
+class MeetingState:
+    """Running aggregates of every analysis result for one meeting, in bounded memory.
+
+    Histograms and running statistics grow with the number of distinct labels,
+    not the number of results; trends, flagged moments and transcript excerpts
+    are fixed-size windows of the most recent entries.
+    """
+
+    def __init__(self, meeting_id: str, trend_points: int, max_moments: int, max_excerpts: int, max_labels: int):
+        self.meeting_id = meeting_id
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.max_labels = max_labels
+        self.counts: Dict[str, int] = {}
+        self.emotions: Dict[str, Dict[str, float]] = {}
+        self.behaviors: Dict[str, int] = {}
+        self.tones: Dict[str, int] = {}
+        self.spoken_emotions: Dict[str, int] = {}
+        self.sentiments: Dict[str, int] = {}
+        self.risk_levels: Dict[str, int] = {}
+        self.cultural_flags: Dict[str, int] = {}
+        self.cultures: Dict[str, int] = {}
+        self.languages: Dict[str, int] = {}
+        self.facial_confidence = RunningStat()
+        self.stress = RunningStat()
+        self.emotion_score = RunningStat()
+        self.polarity = RunningStat()
+        self.stress_trend: deque = deque(maxlen=trend_points)
+        self.flagged_moments: deque = deque(maxlen=max_moments)
+        self.transcript_excerpts: deque = deque(maxlen=max_excerpts)
+
+    def _bump(self, histogram: Dict[str, Any], label: Any, amount: int = 1):
+        if not isinstance(label, str) or not label:
+            return
+        label = label.strip().lower()
+        # Free-form model labels are capped so a chatty model cannot grow the state without bound
+        if label in histogram or len(histogram) < self.max_labels:
+            histogram[label] = histogram.get(label, 0) + amount
+
+    def _flag(self, kind: str, reason: str, detail: Any):
+        self.flagged_moments.append({"timestamp": self.updated_at, "source": kind, "reason": reason, "detail": detail})
+
+    def fold(self, kind: str, result: Dict[str, Any]):
+        """Fold one facial, audio or text analysis result into the aggregates"""
+        if not isinstance(result, dict) or result.get("error"):
+            return
+        self.updated_at = time.time()
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == "facial":
+            self._fold_facial(result)
+        elif kind == "audio":
+            self._fold_audio(result)
+        elif kind == "text":
+            self._fold_text(result)
+
+    def _fold_facial(self, result: Dict[str, Any]):
+        for emotion in result.get("emotions", []):
+            if not isinstance(emotion, dict):
+                continue
+            label = emotion.get("emotion")
+            if isinstance(label, str) and (label.lower() in self.emotions or len(self.emotions) < self.max_labels):
+                entry = self.emotions.setdefault(label.lower(), {"count": 0, "confidence_sum": 0.0})
+                entry["count"] += 1
+                entry["confidence_sum"] += float(emotion.get("confidence", 0) or 0)
+        for behavior in result.get("observable_behaviors", []):
+            self._bump(self.behaviors, behavior)
+        if isinstance(result.get("overall_confidence_score"), (int, float)):
+            self.facial_confidence.add(float(result["overall_confidence_score"]))
+
+    def _fold_audio(self, result: Dict[str, Any]):
+        self._bump(self.languages, result.get("detected_language"))
+        if result.get("transcript"):
+            self.transcript_excerpts.append(result["transcript"][:settings.MEETING_STATE_EXCERPT_CHARS])
+        emotion = result.get("emotion_analysis") or {}
+        if not isinstance(emotion, dict) or emotion.get("error"):
+            return
+        self._bump(self.tones, emotion.get("tone"))
+        self._bump(self.risk_levels, emotion.get("diplomatic_risk_level"))
+        for label in emotion.get("detected_emotions", []):
+            self._bump(self.spoken_emotions, label)
+        if isinstance(emotion.get("emotion_score"), (int, float)):
+            self.emotion_score.add(float(emotion["emotion_score"]))
+        stress = emotion.get("stress_level")
+        if isinstance(stress, (int, float)):
+            self.stress.add(float(stress))
+            self.stress_trend.append((self.updated_at, float(stress)))
+            if stress >= FLAGGED_STRESS_LEVEL:
+                self._flag("audio", "high_stress", {"stress_level": stress, "tone": emotion.get("tone")})
+        if str(emotion.get("diplomatic_risk_level", "")).lower() in FLAGGED_RISK_LEVELS:
+            self._flag("audio", "high_risk", {
+                "risk_level": emotion["diplomatic_risk_level"],
+                "excerpt": (result.get("transcript") or "")[:settings.MEETING_STATE_EXCERPT_CHARS]
+            })
+
+    def _fold_text(self, result: Dict[str, Any]):
+        self._bump(self.sentiments, result.get("sentiment"))
+        if isinstance(result.get("polarity"), (int, float)):
+            self.polarity.add(float(result["polarity"]))
+        for profile in (result.get("cultural_analysis") or {}).get("cultural_profiles", []):
+            self._bump(self.cultures, profile.get("culture"))
+        for flag in result.get("cultural_flags_detailed", []):
+            self._bump(self.cultural_flags, flag.get("type"))
+            self._flag("text", "cultural_flag", {
+                "type": flag.get("type"),
+                "terms": [match["term"] for match in flag.get("matches", [])][:5]
+            })
+
+    @staticmethod
+    def _top(histogram: Dict[str, int]) -> Dict[str, int]:
+        return dict(sorted(histogram.items(), key=lambda item: -item[1])[:settings.MEETING_STATE_TOP_LABELS])
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact view of the meeting used as cable input"""
+        emotions = {
+            label: {"count": entry["count"], "avg_confidence": round(entry["confidence_sum"] / entry["count"], 3)}
+            for label, entry in sorted(self.emotions.items(), key=lambda item: -item[1]["count"])[:settings.MEETING_STATE_TOP_LABELS]
+        }
+        risk_seen = [level for level in self.risk_levels if level in RISK_ORDER]
+
+        return {
+            "meeting_id": self.meeting_id,
+            "analyses": dict(self.counts),
+            "duration_seconds": round(self.updated_at - self.created_at, 1),
+            "facial": {
+                "emotion_histogram": emotions,
+                "observable_behaviors": self._top(self.behaviors),
+                "confidence": self.facial_confidence.summary()
+            },
+            "audio": {
+                "tones": self._top(self.tones),
+                "spoken_emotions": self._top(self.spoken_emotions),
+                "languages": self._top(self.languages),
+                "emotion_score": self.emotion_score.summary(),
+                "stress": self.stress.summary(),
+                "stress_trend": [round(level, 2) for _, level in self.stress_trend],
+                "risk_levels": self._top(self.risk_levels),
+                "highest_risk_level": max(risk_seen, key=RISK_ORDER.get) if risk_seen else None,
+                "recent_transcript_excerpts": list(self.transcript_excerpts)
+            },
+            "text": {
+                "sentiments": self._top(self.sentiments),
+                "polarity": self.polarity.summary(),
+                "cultures": list(self._top(self.cultures)),
+                "cultural_flags": self._top(self.cultural_flags)
+            },
+            "flagged_moments": list(self.flagged_moments)
+        }
+
+
+class MeetingStateStore:
+    """Per-meeting running aggregates, with LRU eviction of idle meetings"""
+
+    def __init__(self, max_meetings: int = 256, idle_ttl_seconds: float = 6 * 3600):
+        self.max_meetings = max_meetings
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.meetings: "OrderedDict[str, MeetingState]" = OrderedDict()
+
+    def _new_state(self, meeting_id: str) -> MeetingState:
+        return MeetingState(
+            meeting_id,
+            trend_points=settings.MEETING_STATE_TREND_POINTS,
+            max_moments=settings.MEETING_STATE_MAX_MOMENTS,
+            max_excerpts=settings.MEETING_STATE_MAX_EXCERPTS,
+            max_labels=settings.MEETING_STATE_MAX_LABELS
+        )
+
+    def _evict(self):
+        now = time.time()
+        while self.meetings:
+            meeting_id, state = next(iter(self.meetings.items()))
+            if len(self.meetings) > self.max_meetings or now - state.updated_at > self.idle_ttl_seconds:
+                self.meetings.popitem(last=False)
+                logger.info("Evicted meeting state", meeting_id=meeting_id)
+            else:
+                break
+
+    def fold(self, meeting_id: str, kind: str, result: Dict[str, Any]):
+        """Fold one analysis result into the meeting's aggregates"""
+        if not meeting_id:
+            return
+        state = self.meetings.get(meeting_id)
+        if state is None:
+            state = self.meetings[meeting_id] = self._new_state(meeting_id)
+        self.meetings.move_to_end(meeting_id)
+        state.fold(kind, result)
+        self._evict()
+
+    def get(self, meeting_id: str) -> Optional[MeetingState]:
+        return self.meetings.get(meeting_id)
+
+    def summary(self, meeting_id: str) -> Optional[Dict[str, Any]]:
+        state = self.meetings.get(meeting_id)
+        return state.summary() if state else None
+
+    def clear(self, meeting_id: str) -> bool:
+        return self.meetings.pop(meeting_id, None) is not None
+
+    def list_meetings(self) -> List[Dict[str, Any]]:
+        return [
+            {"meeting_id": meeting_id, "analyses": dict(state.counts), "updated_at": state.updated_at}
+            for meeting_id, state in self.meetings.items()
+        ]
+
+
+# Global instance
+meeting_state_store = MeetingStateStore(
+    max_meetings=settings.MEETING_STATE_MAX_MEETINGS,
+    idle_ttl_seconds=settings.MEETING_STATE_IDLE_TTL_SECONDS
+)
@@ -0,0 +1,136 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Set by the process manager before the workers start; each worker then writes its samples to files there
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Latency buckets for HTTP routes and model calls, which range from a cached answer to a long vision request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+FANOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+http_request_duration = Histogram(
+    "diplosense_http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+model_call_duration = Histogram(
+    "diplosense_model_call_duration_seconds", "Upstream model call latency, including retries and rate-limit waits",
+    ["service", "model", "outcome"], buckets=LATENCY_BUCKETS
+)
+model_tokens = Counter(
+    "diplosense_model_tokens", "Tokens billed by upstream model calls", ["service", "model", "kind"]
+)
+model_cost = Counter(
+    "diplosense_model_cost_usd", "Estimated cost of upstream model calls", ["service", "model"]
+)
+model_calls_in_flight = Gauge(
+    "diplosense_model_calls_in_flight", "Model calls sent and not yet answered", ["model"], multiprocess_mode="livesum"
+)
+frame_queue_depth = Gauge(
+    "diplosense_frame_queue_depth", "Video frames accepted for analysis and not yet analyzed", ["source"],
+    multiprocess_mode="livesum"
+)
+persistence_queue_depth = Gauge(
+    "diplosense_persistence_queue_depth", "Rows waiting in the write-behind queue", multiprocess_mode="livesum"
+)
+websocket_connections = Gauge(
+    "diplosense_websocket_connections", "Connected WebSocket clients per meeting", ["meeting_id"],
+    multiprocess_mode="livesum"
+)
+broadcast_duration = Histogram(
+    "diplosense_websocket_broadcast_seconds", "Time to fan one event out to a meeting's clients", ["event"],
+    buckets=FANOUT_BUCKETS
+)
+cache_requests = Counter(
+    "diplosense_cache_requests", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+)
+
+
+# Labelled children by metric and label values; labels() validates and locks on every call, a dict lookup does not
+_children: Dict[Tuple[Any, Tuple[str, ...]], Any] = {}
+
+
+def child(metric, *labelvalues: str):
+    key = (metric, labelvalues)
+    labelled = _children.get(key)
+    if labelled is None:
+        labelled = _children[key] = metric.labels(*labelvalues)
+    return labelled
+
+
+def record_cache(cache: str, hit: bool):
+    child(cache_requests, cache, "hit" if hit else "miss").inc()
+
+
+def record_broadcast(event: str, seconds: float):
+    child(broadcast_duration, event).observe(seconds)
+
+
+def record_model_call(service: str, model: str, response_time_ms: float, error: Optional[str] = None,
+                      prompt_tokens: int = 0, completion_tokens: int = 0, image_tokens: int = 0, cost: float = 0.0):
+    child(model_call_duration, service, model, "error" if error else "ok").observe(response_time_ms / 1000)
+    if prompt_tokens:
+        child(model_tokens, service, model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        child(model_tokens, service, model, "completion").inc(completion_tokens)
+    if image_tokens:
+        child(model_tokens, service, model, "image").inc(image_tokens)
+    if cost:
+        child(model_cost, service, model).inc(cost)
+
+
+def set_websocket_connections(meeting_id: str, count: int):
+    if count:
+        child(websocket_connections, meeting_id).set(count)
+    else:
+        # Meeting ids are unbounded, so a meeting's series goes away with its last client
+        websocket_connections.labels(meeting_id).set(0)
+        websocket_connections.remove(meeting_id)
+        _children.pop((websocket_connections, (meeting_id,)), None)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request under its route template rather than its raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            child(http_request_duration, scope["method"], getattr(route, "path", "unmatched"), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def render_metrics() -> tuple:
+    """Exposition body and content type, aggregated over all workers in multiprocess mode"""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_stopped():
+    """Drop this worker's live gauges from the aggregate; called on shutdown"""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,25 +1,218 @@
-import openai
 from config import settings
+import asyncio
 import base64
 import io
 import time
-from PIL import Image
-import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 # from .usage_tracker import usage_tracker  # Temporarily disabled
-from .simple_usage_tracker import simple_usage_tracker
+from .accounting import usage_accountant, estimate_prompt_tokens
+from .rate_governor import rate_governor
+from .resilience import resilient_caller
+from .cultural_engine import cultural_engine
+from .local_classifier import local_classifier
+from .document_chunker import news_chunk_cache, split_into_chunks, merge_news_analyses
+from .structured_logging import get_logger
+from .tracing import tracer
+from .metrics import child, model_calls_in_flight
+
+logger = get_logger("openai")
+
+NEWS_ANALYSIS_PROMPT = """You are a senior diplomatic intelligence analyst. Analyze the provided text and provide comprehensive diplomatic intelligence including:
+
+1. A diplomatic overview of the situation
+2. Risk level assessment (low/medium/high/critical)
+3. Strategic recommendations for diplomatic response
+4. Key entities, countries, or organizations mentioned
+5. Sentiment analysis with confidence score
+6. Geopolitical implications
+
+Return your analysis in valid JSON format with the following structure:
+{
+  "diplomatic_overview": "Brief overview of the diplomatic situation",
+  "risk_level": "low|medium|high|critical",
+  "strategic_recommendations": ["recommendation 1", "recommendation 2"],
+  "key_entities": ["entity 1", "entity 2"],
+  "sentiment_analysis": {
+    "overall_sentiment": "positive|negative|neutral",
+    "confidence": 0.85
+  },
+  "geopolitical_implications": ["implication 1", "implication 2"]
+}"""
+
+# The three cable agents, in cable order: output key, usage service name, prompt and parsing
+CABLE_SECTIONS = {
+    "summary": {
+        "key": "executive_summary",
+        "service": "openai_cable_summary",
+        "prompt": "You are a senior diplomatic analyst. Summarize the key findings from this multimodal analysis data into a concise executive summary for a diplomatic cable.",
+        "json": False
+    },
+    "risk": {
+        "key": "risk_assessment",
+        "service": "openai_cable_risk",
+        "prompt": "You are a diplomatic risk assessor. Based on this analysis, provide a risk level (LOW/MEDIUM/HIGH) and specific recommendations for diplomatic strategy. Return JSON format.",
+        "json": True,
+        "fallback": {"risk_level": "Unknown", "recommendations": ["Unable to assess risk due to parsing error"]}
+    },
+    "cultural": {
+        "key": "cultural_analysis",
+        "service": "openai_cable_cultural",
+        "prompt": "You are a cultural affairs expert. Provide cultural context and strategic communication advice based on this analysis. Return JSON format with cultural_insights and strategic_recommendations.",
+        "json": True,
+        "fallback": {"cultural_insights": "Unable to parse cultural analysis"}
+    }
+}
+
+CABLE_REVISION_INSTRUCTIONS = " You are revising the previous version of this section of an ongoing cable. Keep what still holds, update what the listed changes affect, and return the complete revised section in the same format."
 
 class OpenAIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self._client = None
+
+    @property
+    def client(self):
+        """The OpenAI client, created on first use so that importing the service does not load the SDK"""
+        if self._client is None:
+            import httpx
+            import openai
+            openai.api_key = settings.OPENAI_API_KEY
+            # Calls run on the blocking thread pool, so the pool keeps about one connection per thread alive
+            limits = httpx.Limits(max_connections=settings.OPENAI_POOL_CONNECTIONS,
+                                  max_keepalive_connections=settings.OPENAI_POOL_CONNECTIONS)
+            # Retries are handled by the resilience layer, so the SDK's own retries are disabled
+            self._client = openai.OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                max_retries=0,
+                http_client=httpx.Client(limits=limits, follow_redirects=True)
+            )
+        return self._client
+
+    def warm_up(self):
+        self.client
+
+    def close(self):
+        """Close the client's connection pool; a later call opens a new one"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def _create_chat_completion(
+        self,
+        service: str,
+        request_data: Dict[str, Any],
+        meeting_id: Optional[str] = None,
+        images: List[bytes] = (),
+        latency_critical: bool = False
+    ):
+        """Send a chat completion through budget checks, the rate governor and usage accounting"""
+        start_time = time.time()
+        with tracer.span("model.call", service=service, meeting_id=meeting_id, images=len(images)) as span:
+            try:
+                request_data, decision = usage_accountant.preflight_chat(meeting_id, request_data, images)
+                fallback = decision.fallback
+                # Time spent waiting for rate-limit headroom, separate from the request itself
+                with tracer.span("model.admit", model=decision.model):
+                    model = await rate_governor.admit(
+                        meeting_id, decision.model, decision.estimated_tokens, decision.estimated_cost,
+                        latency_critical=latency_critical,
+                        degraded=(fallback.model, fallback.estimated_tokens, fallback.estimated_cost) if fallback else None
+                    )
+                if model != decision.model:
+                    decision = fallback
+                    request_data = usage_accountant.downgrade_request(request_data, model)
+                span.set_attribute("model", request_data["model"])
+
+                def admit_hedge() -> bool:
+                    # A hedge is a second billed request, so it is only sent with budget and rate headroom to spare
+                    return usage_accountant.has_headroom(meeting_id, decision.estimated_cost) and rate_governor.try_admit(
+                        meeting_id, decision.model, decision.estimated_tokens, decision.estimated_cost
+                    )
+
+                def record_abandoned(abandoned):
+                    # A timed-out or losing hedged request that still completed upstream is billed all the same
+                    abandoned_cost = usage_accountant.record_chat(
+                        service, request_data["model"], abandoned.usage,
+                        (time.time() - start_time) * 1000, meeting_id, decision.image_tokens
+                    )
+                    rate_governor.settle(
+                        meeting_id, decision.model, decision.estimated_tokens, abandoned.usage.total_tokens,
+                        decision.estimated_cost, abandoned_cost
+                    )
+
+                with child(model_calls_in_flight, request_data["model"]).track_inprogress():
+                    response = await resilient_caller.call(
+                        request_data["model"],
+                        lambda: self.client.chat.completions.create(**request_data),
+                        hedge=latency_critical,
+                        admit_hedge=admit_hedge,
+                        on_abandoned=record_abandoned
+                    )
+            except Exception as e:
+                usage_accountant.record_error(
+                    service, request_data["model"], (time.time() - start_time) * 1000, meeting_id, str(e)
+                )
+                raise
+
+            cost = usage_accountant.record_chat(
+                service, request_data["model"], response.usage,
+                (time.time() - start_time) * 1000, meeting_id, decision.image_tokens
+            )
+            rate_governor.settle(
+                meeting_id, decision.model, decision.estimated_tokens, response.usage.total_tokens,
+                decision.estimated_cost, cost
+            )
+            return response
+
+    async def _create_audio_request(
+        self,
+        service: str,
+        endpoint: str,
+        audio_data: bytes,
+        meeting_id: Optional[str] = None,
+        **kwargs
+    ):
+        """Send a Whisper transcription or translation billed by the duration of the audio bytes"""
+        start_time = time.time()
+        with tracer.span("model.call", service=service, meeting_id=meeting_id, audio_bytes=len(audio_data)) as span:
+            model = "whisper-1"
+            try:
+                audio_seconds, duration_estimated, decision = usage_accountant.preflight_audio(meeting_id, model, audio_data)
+                span.set_attributes(model=model, audio_seconds=round(audio_seconds, 2), audio_duration_estimated=duration_estimated)
+                with tracer.span("model.admit", model=model):
+                    await rate_governor.admit(meeting_id, model, 0, decision.estimated_cost)
+
+                api = self.client.audio.transcriptions if endpoint == "transcriptions" else self.client.audio.translations
+
+                def send():
+                    # Create a fresh file-like object for each attempt, since retries re-read it
+                    audio_file = io.BytesIO(audio_data)
+                    audio_file.name = "audio.wav"
+                    return api.create(model=model, file=audio_file, **kwargs)
+
+                with child(model_calls_in_flight, model).track_inprogress():
+                    response = await resilient_caller.call(
+                        model, send,
+                        on_abandoned=lambda _: usage_accountant.record_audio(
+                            service, model, audio_seconds, (time.time() - start_time) * 1000, meeting_id, duration_estimated
+                        )
+                    )
+            except Exception as e:
+                usage_accountant.record_error(service, model, (time.time() - start_time) * 1000, meeting_id, str(e))
+                raise
+
+            usage_accountant.record_audio(
+                service, model, audio_seconds, (time.time() - start_time) * 1000, meeting_id, duration_estimated
+            )
+            return response
 
-    async def analyze_audio_emotion(self, audio_data: bytes) -> Dict[str, Any]:
+    async def analyze_audio_emotion(self, audio_data: bytes, meeting_id: str = None) -> Dict[str, Any]:
         """Analyze emotional tone from audio using OpenAI with translation support"""
         try:
             # Transcribe audio first with language detection and translation
-            transcription_result = await self.transcribe_audio(audio_data, "emotion_analysis")
+            transcription_result = await self.transcribe_audio(audio_data, meeting_id)
             
             # Use English translation for emotion analysis
             text_to_analyze = transcription_result.get("english_translation", "")
@@ -31,7 +224,7 @@ class OpenAIService:
                 return {"error": "No text to analyze from audio"}
             
             # Analyze emotion from transcript (using English version)
-            response = self.client.chat.completions.create(
+            response = await self._create_chat_completion("openai_audio_emotion", dict(
                 model="gpt-4o",
                 messages=[
                     {
@@ -44,21 +237,23 @@ class OpenAIService:
                     }
                 ],
                 response_format={"type": "json_object"}
-            )
+            ), meeting_id)
             
             # Safe JSON parsing
-            try:
-                result = json.loads(response.choices[0].message.content) if response.choices[0].message.content else {}
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"[EMOTION ANALYSIS] Error parsing JSON: {e}")
-                result = {
-                    "emotion_score": 0,
-                    "stress_level": 0,
-                    "tone": "unknown",
-                    "detected_emotions": [],
-                    "diplomatic_risk_level": "unknown",
-                    "error": f"JSON parsing failed: {str(e)}"
-                }
+            with tracer.span("model.parse") as span:
+                try:
+                    result = json.loads(response.choices[0].message.content) if response.choices[0].message.content else {}
+                except (json.JSONDecodeError, TypeError) as e:
+                    logger.warning("Could not parse emotion analysis JSON", meeting_id=meeting_id, error=str(e))
+                    span.set_error(f"JSON parsing failed: {str(e)}")
+                    result = {
+                        "emotion_score": 0,
+                        "stress_level": 0,
+                        "tone": "unknown",
+                        "detected_emotions": [],
+                        "diplomatic_risk_level": "unknown",
+                        "error": f"JSON parsing failed: {str(e)}"
+                    }
             
             # Include transcription details
             result["transcript"] = text_to_analyze  # English version for compatibility
@@ -67,162 +262,112 @@ class OpenAIService:
             result["is_translated"] = is_translated
             
             if is_translated:
-                print(f"[EMOTION ANALYSIS] Analyzed translated text from {detected_language}: {text_to_analyze}")
+                logger.debug("Analyzed translated transcript", meeting_id=meeting_id, language=detected_language, transcript=text_to_analyze)
             
             return result
             
         except Exception as e:
-            print(f"Error in audio emotion analysis: {e}")
+            logger.error("Audio emotion analysis failed", meeting_id=meeting_id, error=str(e))
             return {"error": str(e)}
 
-    async def analyze_facial_expressions(self, image_data: bytes, meeting_id: str = None) -> Dict[str, Any]:
-        """Analyze facial microexpressions using GPT-4o vision"""
-        # Start usage tracking
-        start_time = time.time()
+    def build_facial_analysis_request(self, image_data: bytes) -> Dict[str, Any]:
+        """Build the GPT-4o vision request for one JPEG frame"""
+        # Convert image to base64
+        base64_image = base64.b64encode(image_data).decode('utf-8')
         
-        try:
-            # Convert image to base64
-            base64_image = base64.b64encode(image_data).decode('utf-8')
-            
-            print(f"[OpenAI] Making facial expression analysis request to GPT-4o Vision")
-            print(f"[OpenAI] Image size: {len(image_data)} bytes")
-            
-            request_data = {
-                "model": "gpt-4o",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an expert in behavioral analysis for diplomatic settings. Analyze the general emotional tone and body language visible in this image without identifying any individuals. Focus on observable behavioral indicators like posture, gesture patterns, and general emotional atmosphere. Return a JSON response with emotions (list of objects with emotion and confidence), observable_behaviors (list), and overall_confidence_score (0 to 1)."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Analyze the general behavioral and emotional indicators in this scene without identifying any individuals:"
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
+        return {
+            "model": "gpt-4o",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are an expert in behavioral analysis for diplomatic settings. Analyze the general emotional tone and body language visible in this image without identifying any individuals. Focus on observable behavioral indicators like posture, gesture patterns, and general emotional atmosphere. Return a JSON response with emotions (list of objects with emotion and confidence), observable_behaviors (list), and overall_confidence_score (0 to 1)."
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": "Analyze the general behavioral and emotional indicators in this scene without identifying any individuals:"
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}"
                             }
-                        ]
-                    }
-                ],
-                "response_format": {"type": "json_object"}
-            }
-            
-            response = self.client.chat.completions.create(**request_data)
-            
-            # Safe JSON parsing
-            try:
-                result = json.loads(response.choices[0].message.content) if response.choices[0].message.content else {}
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"[OpenAI] Error parsing facial analysis JSON: {e}")
-                result = {
-                    "emotions": [],
-                    "observable_behaviors": [],
-                    "overall_confidence_score": 0,
-                    "error": f"JSON parsing failed: {str(e)}"
+                        }
+                    ]
                 }
-            print(f"[OpenAI] Response received from GPT-4o Vision:")
-            print(f"[OpenAI] Usage: {response.usage}")
-            print(f"[OpenAI] Analysis result: {result}")
+            ],
+            "response_format": {"type": "json_object"}
+        }
+
+    async def analyze_facial_expressions(self, image_data: bytes, meeting_id: str = None, latency_critical: bool = False) -> Dict[str, Any]:
+        """Analyze facial microexpressions using GPT-4o vision"""
+        try:
+            with tracer.span("model.build_request", image_bytes=len(image_data)):
+                request_data = self.build_facial_analysis_request(image_data)
             
-            # Log usage with simple tracker
-            end_time = time.time()
-            response_time_ms = (end_time - start_time) * 1000
-            tokens = response.usage.total_tokens
-            cost = simple_usage_tracker.estimate_openai_cost("gpt-4o", tokens)
+            response = await self._create_chat_completion(
+                "openai_vision", request_data, meeting_id, [image_data], latency_critical=latency_critical
+            )
             
-            simple_usage_tracker.log_request(
-                service="openai_vision",
-                model="gpt-4o", 
-                tokens=tokens,
-                cost=cost,
-                response_time_ms=response_time_ms,
-                meeting_id=meeting_id
+            # Safe JSON parsing
+            with tracer.span("model.parse") as span:
+                try:
+                    result = json.loads(response.choices[0].message.content) if response.choices[0].message.content else {}
+                except (json.JSONDecodeError, TypeError) as e:
+                    logger.warning("Could not parse facial analysis JSON", meeting_id=meeting_id, error=str(e))
+                    span.set_error(f"JSON parsing failed: {str(e)}")
+                    result = {
+                        "emotions": [],
+                        "observable_behaviors": [],
+                        "overall_confidence_score": 0,
+                        "error": f"JSON parsing failed: {str(e)}"
+                    }
+            # Per frame, so sampled; the full result goes to the client, not the log
+            logger.sampled(
+                "Facial analysis completed",
+                meeting_id=meeting_id,
+                image_bytes=len(image_data),
+                total_tokens=getattr(response.usage, "total_tokens", None),
+                result=result
             )
             
             return result
             
         except Exception as e:
-            print(f"Error in facial expression analysis: {e}")
-            # Log error (temporarily disabled)
-            # await usage_tracker.log_openai_request(
-            #     tracking_context, {}, {}, "gpt-4o", meeting_id, str(e)
-            # )
+            logger.error("Facial expression analysis failed", meeting_id=meeting_id, error=str(e))
             return {"error": str(e)}
 
     async def transcribe_audio(self, audio_data: bytes, meeting_id: str = None) -> Dict[str, Any]:
         """Transcribe audio using OpenAI Whisper with automatic language detection and translation"""
-        # Start usage tracking
-        start_time = time.time()
-        
         try:
-            import io
-            
-            print(f"[OpenAI] Making audio transcription request to Whisper")
-            print(f"[OpenAI] Audio size: {len(audio_data)} bytes")
-            
-            # Create file-like object for Whisper API
-            audio_file = io.BytesIO(audio_data)
-            audio_file.name = "audio.wav"
-            
             # First, transcribe with language detection
-            transcript_with_language = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
+            transcript_with_language = await self._create_audio_request(
+                "openai_whisper", "transcriptions", audio_data, meeting_id,
                 response_format="json"  # Changed to JSON to get language info
             )
             
             original_text = transcript_with_language.text
             detected_language = transcript_with_language.language
             
-            print(f"[OpenAI] Whisper detected language: {detected_language}")
-            print(f"[OpenAI] Original transcription: {original_text}")
+            logger.info("Audio transcribed", meeting_id=meeting_id, audio_bytes=len(audio_data), language=detected_language)
+            logger.debug("Original transcription", meeting_id=meeting_id, transcript=original_text)
             
             # If the detected language is not English, translate it
             english_translation = original_text
             if detected_language and detected_language.lower() != 'en' and detected_language.lower() != 'english':
-                print(f"[OpenAI] Non-English language detected, translating from {detected_language}")
-                
-                # Reset the audio file for translation
-                audio_file = io.BytesIO(audio_data)
-                audio_file.name = "audio.wav"
-                
                 try:
-                    translation_response = self.client.audio.translations.create(
-                        model="whisper-1",
-                        file=audio_file,
+                    translation_response = await self._create_audio_request(
+                        "openai_whisper_translation", "translations", audio_data, meeting_id,
                         response_format="text"
                     )
                     english_translation = translation_response
-                    print(f"[OpenAI] English translation: {english_translation}")
+                    logger.debug("English translation", meeting_id=meeting_id, language=detected_language, transcript=english_translation)
                 except Exception as translation_error:
-                    print(f"[OpenAI] Translation failed, using original text: {translation_error}")
+                    logger.warning("Translation failed, using original text", meeting_id=meeting_id, language=detected_language, error=str(translation_error))
                     english_translation = original_text
             
-            # Log usage with simple tracker
-            end_time = time.time()
-            response_time_ms = (end_time - start_time) * 1000
-            # Estimate tokens for Whisper (audio duration based)
-            estimated_tokens = max(10, len(original_text.split()) * 1.3) if original_text else 10
-            if english_translation != original_text:
-                estimated_tokens += max(10, len(english_translation.split()) * 1.3)  # Add translation tokens
-            
-            cost = simple_usage_tracker.estimate_openai_cost("whisper-1", int(estimated_tokens))
-            
-            simple_usage_tracker.log_request(
-                service="openai_whisper",
-                model="whisper-1",
-                tokens=int(estimated_tokens),
-                cost=cost,
-                response_time_ms=response_time_ms,
-                meeting_id=meeting_id
-            )
-            
             return {
                 "original_text": original_text,
                 "english_translation": english_translation,
@@ -231,20 +376,7 @@ class OpenAIService:
             }
             
         except Exception as e:
-            print(f"Error in audio transcription: {e}")
-            # Log error with simple tracker
-            end_time = time.time()
-            response_time_ms = (end_time - start_time) * 1000
-            
-            simple_usage_tracker.log_request(
-                service="openai_whisper",
-                model="whisper-1",
-                tokens=0,
-                cost=0.0,
-                response_time_ms=response_time_ms,
-                meeting_id=meeting_id,
-                error=str(e)
-            )
+            logger.error("Audio transcription failed", meeting_id=meeting_id, error=str(e))
             return {
                 "original_text": "",
                 "english_translation": "",
@@ -252,32 +384,90 @@ class OpenAIService:
                 "is_translated": False
             }
 
-    async def analyze_text_sentiment(self, text: str, cultures: List[str] = []) -> Dict[str, Any]:
-        """Analyze text sentiment and cultural context"""
+    def build_text_sentiment_request(self, text: str, cultures: List[str] = []) -> Dict[str, Any]:
+        """Build the GPT-4o sentiment and cultural-context request for one text"""
+        culture_context = ""
+        if cultures:
+            culture_context = f" Consider the cultural backgrounds: {', '.join(cultures)}."
+        
+        return dict(
+            model="gpt-4o",
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"You are an expert in diplomatic communication and cross-cultural analysis. Analyze the sentiment, cultural implications, and potential friction points in this text.{culture_context} Return JSON with sentiment (positive/negative/neutral), polarity (-1 to 1), cultural_flags (list of potential issues), and communication_style_analysis."
+                },
+                {
+                    "role": "user",
+                    "content": f"Analyze this diplomatic text: {text}"
+                }
+            ],
+            response_format={"type": "json_object"}
+        )
+
+    def build_packed_text_sentiment_request(self, texts: Dict[str, str], cultures: List[str] = []) -> Dict[str, Any]:
+        """Build one GPT-4o request that analyzes several short texts independently, keyed by id"""
+        culture_context = ""
+        if cultures:
+            culture_context = f" Consider the cultural backgrounds: {', '.join(cultures)}."
+        
+        return dict(
+            model="gpt-4o",
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"You are an expert in diplomatic communication and cross-cultural analysis. You will receive a JSON list of independent texts, each with an id. Analyze each text on its own, without letting the other texts influence it, for sentiment, cultural implications, and potential friction points.{culture_context} Return JSON of the form {{\"results\": [...]}} with exactly one entry per input id, each containing id, sentiment (positive/negative/neutral), polarity (-1 to 1), cultural_flags (list of potential issues), and communication_style_analysis."
+                },
+                {
+                    "role": "user",
+                    "content": "Analyze these diplomatic texts: " + json.dumps([{"id": item_id, "text": text} for item_id, text in texts.items()])
+                }
+            ],
+            response_format={"type": "json_object"}
+        )
+
+    async def analyze_text_sentiment_model(self, text: str, cultures: List[str] = [], meeting_id: str = None) -> Dict[str, Any]:
+        """Model-only sentiment analysis for one text, without the local cultural engine checks"""
+        response = await self._create_chat_completion(
+            "openai_text_sentiment", self.build_text_sentiment_request(text, cultures), meeting_id
+        )
+        return json.loads(response.choices[0].message.content)
+
+    async def analyze_text_sentiment_packed(self, texts: Dict[str, str], cultures: List[str] = [], meeting_id: str = None) -> Dict[str, Dict[str, Any]]:
+        """Analyze several short texts in one model call; returns results by id, omitting any the model skipped"""
+        response = await self._create_chat_completion(
+            "openai_text_sentiment_packed", self.build_packed_text_sentiment_request(texts, cultures), meeting_id
+        )
         try:
-            from .cultural_engine import CulturalEngine
-            cultural_engine = CulturalEngine()
-            
-            culture_context = ""
-            if cultures:
-                culture_context = f" Consider the cultural backgrounds: {', '.join(cultures)}."
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are an expert in diplomatic communication and cross-cultural analysis. Analyze the sentiment, cultural implications, and potential friction points in this text.{culture_context} Return JSON with sentiment (positive/negative/neutral), polarity (-1 to 1), cultural_flags (list of potential issues), and communication_style_analysis."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analyze this diplomatic text: {text}"
-                    }
-                ],
-                response_format={"type": "json_object"}
-            )
+            entries = json.loads(response.choices[0].message.content or "{}").get("results", [])
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning("Could not parse packed sentiment JSON", meeting_id=meeting_id, texts=len(texts), error=str(e))
+            return {}
+        results = {}
+        for entry in entries:
+            if isinstance(entry, dict) and str(entry.get("id")) in texts:
+                item_id = str(entry.pop("id"))
+                results[item_id] = entry
+        return results
+
+    def classify_text_locally(self, text: str, cultures: List[str] = []):
+        """Run the local tier and record whether the model call was skipped"""
+        started = time.perf_counter()
+        decision = local_classifier.classify(text, cultures)
+        skipped_tokens = 0 if decision.escalate else estimate_prompt_tokens(self.build_text_sentiment_request(text, cultures)["messages"])
+        local_classifier.record(decision, (time.perf_counter() - started) * 1000, skipped_tokens)
+        return decision
+
+    async def analyze_text_sentiment(self, text: str, cultures: List[str] = [], meeting_id: str = None, force_model: bool = False) -> Dict[str, Any]:
+        """Analyze text sentiment and cultural context, answering confident trivial texts locally"""
+        try:
+            decision = None
+            if not force_model:
+                decision = self.classify_text_locally(text, cultures)
+                if not decision.escalate:
+                    return decision.result
             
-            result = json.loads(response.choices[0].message.content)
+            result = await self.analyze_text_sentiment_model(text, cultures, meeting_id)
             
             # Add cultural engine analysis
             cultural_analysis = cultural_engine.analyze_cultural_context(cultures, text)
@@ -285,166 +475,156 @@ class OpenAIService:
             
             result["cultural_analysis"] = cultural_analysis
             result["cultural_flags_detailed"] = cultural_flags
+            result["analysis_tier"] = "model"
+            result["escalation_reason"] = decision.reason if decision else "forced"
             
             return result
             
         except Exception as e:
-            print(f"Error in text sentiment analysis: {e}")
+            logger.error("Text sentiment analysis failed", meeting_id=meeting_id, error=str(e))
             return {"error": str(e)}
 
-    async def generate_diplomatic_cable(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_cable_section_request(
+        self,
+        section: str,
+        analysis_json: str,
+        previous: Any = None,
+        changes_json: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build one cable agent's request, either from scratch or as a revision of its previous output"""
+        spec = CABLE_SECTIONS[section]
+        if previous is None:
+            system_prompt = spec["prompt"]
+            user_content = f"Analysis data: {analysis_json}"
+        else:
+            system_prompt = spec["prompt"] + CABLE_REVISION_INSTRUCTIONS
+            previous_text = previous if isinstance(previous, str) else json.dumps(previous, separators=(",", ":"))
+            user_content = f"Previous version: {previous_text}\n\nChanges since the previous version: {changes_json}"
+        
+        request_data = dict(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ]
+        )
+        if spec["json"]:
+            request_data["response_format"] = {"type": "json_object"}
+        return request_data
+
+    async def generate_cable_section(
+        self,
+        section: str,
+        analysis_json: str,
+        meeting_id: str = None,
+        previous: Any = None,
+        changes_json: Optional[str] = None
+    ) -> Any:
+        """Run one cable agent and parse its output, falling back to a placeholder on bad JSON"""
+        spec = CABLE_SECTIONS[section]
+        response = await self._create_chat_completion(
+            spec["service"], self.build_cable_section_request(section, analysis_json, previous, changes_json), meeting_id
+        )
+        content = response.choices[0].message.content
+        if not spec["json"]:
+            return content or "Analysis in progress"
+        try:
+            return json.loads(content) if content else {}
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning("Could not parse cable section JSON", meeting_id=meeting_id, section=section, error=str(e))
+            return dict(spec["fallback"], error=str(e))
+
+    async def generate_diplomatic_cable(self, analysis_data: Dict[str, Any], meeting_id: str = None) -> Dict[str, Any]:
         """Generate diplomatic cable using multi-agent approach"""
         try:
-            # First agent: Summarize key findings
-            summary_response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a senior diplomatic analyst. Summarize the key findings from this multimodal analysis data into a concise executive summary for a diplomatic cable."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analysis data: {json.dumps(analysis_data, indent=2)}"
-                    }
-                ]
-            )
+            # Serialized once and compactly, since all three agents receive the same input
+            analysis_json = json.dumps(analysis_data, separators=(",", ":"))
             
-            # Second agent: Risk assessment and recommendations
-            risk_response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a diplomatic risk assessor. Based on this analysis, provide a risk level (LOW/MEDIUM/HIGH) and specific recommendations for diplomatic strategy. Return JSON format."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analysis data: {json.dumps(analysis_data, indent=2)}"
-                    }
-                ],
-                response_format={"type": "json_object"}
+            # Summary, risk and cultural agents are independent, so they run concurrently
+            sections = await asyncio.gather(
+                *(self.generate_cable_section(section, analysis_json, meeting_id) for section in CABLE_SECTIONS)
             )
             
-            # Third agent: Cultural context and strategic advice
-            cultural_response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a cultural affairs expert. Provide cultural context and strategic communication advice based on this analysis. Return JSON format with cultural_insights and strategic_recommendations."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analysis data: {json.dumps(analysis_data, indent=2)}"
-                    }
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            # Combine results with safe JSON parsing
-            try:
-                risk_assessment = json.loads(risk_response.choices[0].message.content) if risk_response.choices[0].message.content else {}
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"Error parsing risk assessment JSON: {e}")
-                risk_assessment = {"risk_level": "Unknown", "recommendations": ["Unable to assess risk due to parsing error"]}
-            
-            try:
-                cultural_analysis = json.loads(cultural_response.choices[0].message.content) if cultural_response.choices[0].message.content else {}
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"Error parsing cultural analysis JSON: {e}")
-                cultural_analysis = {"cultural_insights": "Unable to parse cultural analysis", "error": str(e)}
-            
-            cable = {
-                "executive_summary": summary_response.choices[0].message.content or "Analysis in progress",
-                "risk_assessment": risk_assessment,
-                "cultural_analysis": cultural_analysis,
-                "raw_analysis": analysis_data
-            }
+            cable = {CABLE_SECTIONS[section]["key"]: output for section, output in zip(CABLE_SECTIONS, sections)}
+            cable["raw_analysis"] = analysis_data
             
             return cable
             
         except Exception as e:
-            print(f"Error in diplomatic cable generation: {e}")
+            logger.error("Diplomatic cable generation failed", meeting_id=meeting_id, error=str(e))
             return {"error": str(e)}
 
+    def build_news_analysis_request(self, text: str) -> Dict[str, Any]:
+        """Build the GPT-4o diplomatic intelligence request for one news text or chunk"""
+        return dict(
+            model="gpt-4o",
+            messages=[
+                {
+                    "role": "system",
+                    "content": NEWS_ANALYSIS_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": f"Analyze this text for diplomatic intelligence:\n\n{text}"
+                }
+            ],
+            response_format={"type": "json_object"}
+        )
+
+    async def _analyze_news_chunk(self, chunk: str, analysis_type: str, semaphore: asyncio.Semaphore) -> tuple:
+        """Analyze one chunk, reusing the cached result if this exact chunk was analyzed before; returns (result, cached)"""
+        request_data = self.build_news_analysis_request(chunk)
+        cache_key = news_chunk_cache.key(request_data["model"], NEWS_ANALYSIS_PROMPT, analysis_type, chunk)
+        cached = news_chunk_cache.get(cache_key)
+        if cached is not None:
+            return cached, True
+
+        async with semaphore:
+            response = await self._create_chat_completion("openai_news_analysis", request_data, "news_analysis")
+        result = json.loads(response.choices[0].message.content)
+        logger.debug("News chunk analyzed", chunk_chars=len(chunk), total_tokens=getattr(response.usage, "total_tokens", None))
+        news_chunk_cache.put(cache_key, result)
+        return result, False
+
     async def analyze_news_text(self, text: str, analysis_type: str = "diplomatic") -> Dict[str, Any]:
-        """Analyze news text for diplomatic intelligence"""
-        start_time = time.time()
-        
+        """Analyze news text for diplomatic intelligence.
+
+        Long texts are split into chunks within NEWS_CHUNK_TOKENS, analyzed
+        concurrently (map) and merged into one report (reduce).
+        """
         try:
-            print(f"[OpenAI] Making news analysis request to GPT-4o")
-            print(f"[OpenAI] Text length: {len(text)} characters")
+            chunks = split_into_chunks(text, settings.NEWS_CHUNK_TOKENS) or [text]
+            logger.info("Starting news analysis", characters=len(text), chunks=len(chunks))
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a senior diplomatic intelligence analyst. Analyze the provided text and provide comprehensive diplomatic intelligence including:
-
-1. A diplomatic overview of the situation
-2. Risk level assessment (low/medium/high/critical)
-3. Strategic recommendations for diplomatic response
-4. Key entities, countries, or organizations mentioned
-5. Sentiment analysis with confidence score
-6. Geopolitical implications
-
-Return your analysis in valid JSON format with the following structure:
-{
-  "diplomatic_overview": "Brief overview of the diplomatic situation",
-  "risk_level": "low|medium|high|critical",
-  "strategic_recommendations": ["recommendation 1", "recommendation 2"],
-  "key_entities": ["entity 1", "entity 2"],
-  "sentiment_analysis": {
-    "overall_sentiment": "positive|negative|neutral",
-    "confidence": 0.85
-  },
-  "geopolitical_implications": ["implication 1", "implication 2"]
-}"""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analyze this text for diplomatic intelligence:\n\n{text}"
-                    }
-                ],
-                response_format={"type": "json_object"}
+            semaphore = asyncio.Semaphore(settings.NEWS_CHUNK_CONCURRENCY)
+            outcomes = await asyncio.gather(
+                *(self._analyze_news_chunk(chunk, analysis_type, semaphore) for chunk in chunks),
+                return_exceptions=True
             )
             
-            result = json.loads(response.choices[0].message.content)
-            print(f"[OpenAI] News analysis completed successfully")
-            print(f"[OpenAI] Usage: {response.usage}")
-            
-            # Log usage with simple tracker
-            end_time = time.time()
-            response_time_ms = (end_time - start_time) * 1000
-            tokens = response.usage.total_tokens
-            cost = simple_usage_tracker.estimate_openai_cost("gpt-4o", tokens)
-            
-            simple_usage_tracker.log_request(
-                service="openai_news_analysis",
-                model="gpt-4o",
-                tokens=tokens,
-                cost=cost,
-                response_time_ms=response_time_ms,
-                meeting_id="news_analysis"
-            )
+            analyses, weights, failed, cached_chunks = [], [], [], 0
+            for index, (chunk, outcome) in enumerate(zip(chunks, outcomes)):
+                if isinstance(outcome, Exception):
+                    logger.warning("News chunk failed", chunk=index, error=str(outcome))
+                    failed.append(index)
+                else:
+                    analyses.append(outcome[0])
+                    weights.append(len(chunk))
+                    cached_chunks += outcome[1]
+            if not analyses:
+                raise outcomes[0]
+            
+            result = merge_news_analyses(analyses, weights)
+            if len(chunks) > 1:
+                result["chunking"] = {
+                    "chunks": len(chunks),
+                    "cached_chunks": cached_chunks,
+                    "failed_chunks": failed
+                }
+            logger.info("News analysis completed", chunks=len(chunks), cached_chunks=cached_chunks, failed_chunks=len(failed))
             
             return result
             
         except Exception as e:
-            print(f"Error in news analysis: {e}")
-            # Log error
-            end_time = time.time()
-            response_time_ms = (end_time - start_time) * 1000
-            
-            simple_usage_tracker.log_request(
-                service="openai_news_analysis",
-                model="gpt-4o",
-                tokens=0,
-                cost=0.0,
-                response_time_ms=response_time_ms,
-                meeting_id="news_analysis",
-                error=str(e)
-            )
-            return {"error": str(e)}
\ No newline at end of file
+            logger.error("News analysis failed", error=str(e))
+            return {"error": str(e)}
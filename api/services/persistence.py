@@ -0,0 +1,192 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from .supabase_service import SupabaseService, get_supabase_service, rejection_kind
+from .structured_logging import get_logger
+from .tracing import tracer
+from .metrics import persistence_queue_depth
+
+logger = get_logger("persistence")
+
+
+class WriteBehindQueue:
+    """Persists analyses and cables asynchronously, in batched inserts, without blocking request handlers.
+
+    Request handlers only enqueue rows. A background worker drains the queue
+    into bulk inserts per table, flushing when a batch is full or the flush
+    interval passes, and retries failed inserts with jittered backoff. Rows
+    PostgREST rejects outright are not retried; the batch is split until only
+    the offending rows are dead-lettered. When the queue is full new rows are
+    shed and counted rather than awaited, so a slow or unavailable database
+    never adds latency to the API.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_retries: int = 5, retry_base_delay: float = 0.5, enabled: bool = True):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.enabled = enabled
+        self.store = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        # Rows that were rejected or exhausted their retries, kept for inspection
+        self.dead_letters: deque = deque(maxlen=100)
+        self.stats: Dict[str, int] = {
+            "enqueued": 0, "written": 0, "batches": 0, "retries": 0, "splits": 0, "rejected": 0, "shed": 0, "failed": 0
+        }
+        self._last_shed_warning = 0.0
+
+    def _get_store(self):
+        if self.store is None:
+            self.store = get_supabase_service()
+        return self.store
+
+    def enqueue(self, table: str, row: Dict[str, Any]) -> bool:
+        """Queue a row for writing; returns False if persistence is off or the queue is full"""
+        if not self.enabled or self.queue is None:
+            return False
+        with tracer.span("persistence.enqueue", table=table, meeting_id=row.get("meeting_id")) as span:
+            try:
+                self.queue.put_nowait((table, row))
+            except asyncio.QueueFull:
+                self.stats["shed"] += 1
+                span.set_error("Queue full")
+                if time.monotonic() - self._last_shed_warning > 10:
+                    self._last_shed_warning = time.monotonic()
+                    logger.warning("Queue full, shedding writes", max_queue=self.max_queue, shed=self.stats["shed"])
+                return False
+            span.set_attribute("queue_depth", self.queue.qsize())
+            persistence_queue_depth.set(self.queue.qsize())
+        self.stats["enqueued"] += 1
+        return True
+
+    def enqueue_analysis(self, meeting_id: str, analysis_type: str, data: Dict[str, Any]) -> bool:
+        return self.enqueue("analyses", SupabaseService.analysis_row(meeting_id, analysis_type, data))
+
+    def enqueue_cable(self, meeting_id: str, cable_data: Dict[str, Any]) -> bool:
+        return self.enqueue("diplomatic_cables", SupabaseService.cable_row(meeting_id, cable_data))
+
+    async def _next_batch(self) -> Tuple[List[Tuple[str, Dict[str, Any]]], bool]:
+        """Wait for a first row, then gather more until the batch is full or the flush interval passes.
+
+        Returns the batch and whether the shutdown sentinel was reached.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            deadline = deadline or time.monotonic() + self.flush_interval
+        return batch, False
+
+    async def _write(self, table: str, rows: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries):
+            try:
+                # The worker has no request around it, so each batch insert is a trace of its own
+                with tracer.span("persistence.write", table=table, rows=len(rows), attempt=attempt + 1):
+                    await self._get_store().insert_rows(table, rows)
+                self.stats["written"] += len(rows)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                kind = rejection_kind(e)
+                if kind is not None:
+                    await self._reject(table, rows, kind, e)
+                    return
+                if attempt == self.max_retries - 1:
+                    self.stats["failed"] += len(rows)
+                    self.dead_letters.extend((table, row) for row in rows)
+                    logger.error("Giving up on insert", table=table, rows=len(rows), attempts=self.max_retries, error=str(e))
+                    return
+                self.stats["retries"] += 1
+                delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                logger.warning("Insert failed, retrying", table=table, rows=len(rows), error=str(e), delay_seconds=round(delay, 2))
+                await asyncio.sleep(delay)
+
+    async def _reject(self, table: str, rows: List[Dict[str, Any]], kind: str, error: Exception):
+        """Dead-letter rows PostgREST refused; a row-level error splits the batch so the good rows are still written"""
+        if kind == "row" and len(rows) > 1:
+            self.stats["splits"] += 1
+            middle = len(rows) // 2
+            await self._write(table, rows[:middle])
+            await self._write(table, rows[middle:])
+            return
+        self.stats["rejected"] += len(rows)
+        self.stats["failed"] += len(rows)
+        self.dead_letters.extend((table, row) for row in rows)
+        logger.error("Insert rejected", table=table, rows=len(rows), error=str(error))
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        for table, rows in by_table.items():
+            await self._write(table, rows)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            persistence_queue_depth.set(self.queue.qsize())
+            if batch:
+                await self._flush(batch)
+
+    @property
+    def running(self) -> bool:
+        return self._worker_task is not None and not self._worker_task.done()
+
+    def start(self):
+        if not self.enabled:
+            logger.warning("No Supabase or PostgREST URL configured; analyses will not be persisted")
+            return
+        if self._worker_task is None or self._worker_task.done():
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker_task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush what is still queued and stop the worker, giving up after the timeout"""
+        if self._worker_task is None:
+            return
+        if self.queue.qsize():
+            logger.info("Flushing queued rows before shutdown", rows=self.queue.qsize())
+        try:
+            # The sentinel is queued behind every pending row, so the worker drains them first
+            await asyncio.wait_for(self.queue.put(None), timeout=timeout)
+            await asyncio.wait_for(asyncio.shield(self._worker_task), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error("Shutdown flush timed out", unpersisted_rows=self.queue.qsize())
+            self._worker_task.cancel()
+        self._worker_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "max_queue": self.max_queue,
+            "dead_letters": len(self.dead_letters)
+        }
+
+
+# Global instance
+write_behind_queue = WriteBehindQueue(
+    max_queue=settings.PERSISTENCE_MAX_QUEUE,
+    batch_size=settings.PERSISTENCE_BATCH_SIZE,
+    flush_interval=settings.PERSISTENCE_FLUSH_SECONDS,
+    max_retries=settings.PERSISTENCE_MAX_RETRIES,
+    enabled=bool(settings.SUPABASE_URL or settings.SUPABASE_REST_URL)
+)
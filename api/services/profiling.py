@@ -0,0 +1,259 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional
+from config import settings
+from .structured_logging import get_logger
+from .admin_auth import is_admin_password
+
+logger = get_logger("profiling")
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapsed(stacks: Dict[str, int]) -> str:
+    """Folded stacks, one "root;...;leaf count" line each, as read by flamegraph.pl, speedscope and inferno"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+class StackSampler:
+    """Samples every thread's Python stack at a fixed interval from a background thread.
+
+    Statistical rather than tracing, so the profiled code runs at full speed:
+    the cost is one stack walk per thread per interval, on the sampler's own
+    thread. On the event loop thread the running coroutine's frames are on
+    the stack, so time shows up under the handler that is using it; an idle
+    loop shows up as its selector wait.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.stacks: Dict[str, int] = defaultdict(int)
+        self.samples = 0
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.time() - self.started
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "type": "cpu",
+            "started": self.started,
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": dict(self.stacks)
+        }
+
+
+class AllocationTracer:
+    """Traces allocations with tracemalloc and reports what was allocated and still held at the end of the window"""
+
+    def __init__(self, frames: int = 25):
+        self.frames = frames
+        self.started = 0.0
+        self.baseline = None
+        self._owns_tracing = False
+
+    def start(self):
+        self.started = time.time()
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start(self.frames)
+        self.baseline = tracemalloc.take_snapshot()
+
+    def stop(self, top: int = 50) -> Dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot()
+        overhead = tracemalloc.get_tracemalloc_memory()
+        if self._owns_tracing:
+            tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        snapshot, baseline = snapshot.filter_traces(filters), self.baseline.filter_traces(filters)
+
+        stacks: Dict[str, int] = defaultdict(int)
+        for diff in snapshot.compare_to(baseline, "traceback"):
+            if diff.size_diff > 0:
+                # tracemalloc tracebacks are innermost first
+                labels = [f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in reversed(diff.traceback)]
+                stacks[";".join(labels)] += diff.size_diff
+        lines = [
+            {"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff, "size_bytes": stat.size}
+            for stat in snapshot.compare_to(baseline, "lineno")[:top]
+        ]
+        return {
+            "type": "memory",
+            "started": self.started,
+            "duration_seconds": round(time.time() - self.started, 3),
+            "tracemalloc_overhead_bytes": overhead,
+            "top_lines": lines,
+            "stacks": dict(stacks)
+        }
+
+
+class ProfileManager:
+    """Runs one CPU and one allocation profile at a time per worker and keeps recent per-request profiles"""
+
+    def __init__(self, max_seconds: float = 60, interval_ms: float = 10, history: int = 20):
+        self.max_seconds = max_seconds
+        self.interval = interval_ms / 1000
+        self.history = history
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cpu_busy = False
+        self._memory_busy = False
+
+    def _duration(self, seconds: float) -> float:
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be between 0 and {self.max_seconds}")
+        return seconds
+
+    def start_cpu(self, interval_ms: Optional[float] = None) -> StackSampler:
+        if self._cpu_busy:
+            raise ProfilerBusy("A CPU profile is already running on this worker")
+        self._cpu_busy = True
+        sampler = StackSampler(interval_ms / 1000 if interval_ms else self.interval)
+        sampler.start()
+        return sampler
+
+    def stop_cpu(self, sampler: StackSampler) -> Dict[str, Any]:
+        try:
+            sampler.stop()
+        finally:
+            self._cpu_busy = False
+        return sampler.result()
+
+    async def profile_cpu(self, seconds: float, interval_ms: Optional[float] = None) -> Dict[str, Any]:
+        """Sample all threads of this worker for `seconds` while it keeps serving requests"""
+        seconds = self._duration(seconds)
+        sampler = self.start_cpu(interval_ms)
+        logger.info("CPU profile started", seconds=seconds)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Joining the sampler waits at most one interval
+            result = self.stop_cpu(sampler)
+        return result
+
+    async def profile_memory(self, seconds: float, frames: int = 25) -> Dict[str, Any]:
+        """Trace allocations for `seconds`; tracing slows allocation-heavy code while it runs"""
+        seconds = self._duration(seconds)
+        if self._memory_busy:
+            raise ProfilerBusy("An allocation profile is already running on this worker")
+        self._memory_busy = True
+        try:
+            tracer = AllocationTracer(frames)
+            tracer.start()
+            logger.info("Allocation profile started", seconds=seconds, frames=frames)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                result = await asyncio.to_thread(tracer.stop)
+        finally:
+            self._memory_busy = False
+        return result
+
+    def store(self, profile: Dict[str, Any], profile_id: Optional[str] = None, **metadata) -> str:
+        profile_id = profile_id or uuid.uuid4().hex[:12]
+        self.profiles[profile_id] = {**profile, **metadata, "id": profile_id}
+        while len(self.profiles) > self.history:
+            self.profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {key: value for key, value in profile.items() if key != "stacks"}
+            for profile in reversed(self.profiles.values())
+        ]
+
+
+class RequestProfilingMiddleware:
+    """Profiles single /analyze requests sent with an X-Profile: cpu header and the admin password.
+
+    The profile is stored on this worker and its id returned in the
+    X-Profile-Id response header, to fetch from /admin/profiles/{id}. The
+    sampler sees the whole worker, so concurrent requests show up too.
+    """
+
+    def __init__(self, app, manager: ProfileManager, path_prefix: str = "/api/v1/analyze/"):
+        self.app = app
+        self.manager = manager
+        self.path_prefix = path_prefix
+
+    def _wanted(self, scope) -> bool:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            return False
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"cpu":
+            return False
+        return is_admin_password(headers.get(b"x-admin-password", b"").decode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        try:
+            sampler = self.manager.start_cpu()
+        except ProfilerBusy:
+            await self.app(scope, receive, send)
+            return
+        profile_id = uuid.uuid4().hex[:12]
+        finished = False
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+            finished = True
+        finally:
+            self.manager.store(self.manager.stop_cpu(sampler), profile_id, path=scope["path"], completed=finished)
+
+
+# Global instance
+profile_manager = ProfileManager(
+    max_seconds=settings.PROFILE_MAX_SECONDS,
+    interval_ms=settings.PROFILE_SAMPLE_INTERVAL_MS,
+    history=settings.PROFILE_HISTORY
+)
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+from config import settings
+from .structured_logging import get_logger
+
+logger = get_logger("governor")
+
+
+class RateLimitedError(Exception):
+    """Raised when the governor sheds a request instead of sending it upstream"""
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket; a limit of 0 means unlimited"""
+
+    def __init__(self, limit: float, window_seconds: float):
+        self.limit = limit
+        self.capacity = limit
+        self.refill_rate = limit / window_seconds if limit > 0 else 0.0
+        self.level = limit
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be consumed (0 if available now)"""
+        if self.limit <= 0:
+            return 0.0
+        self._refill()
+        # Requests larger than the whole bucket are admitted once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_rate
+
+    def consume(self, amount: float):
+        if self.limit <= 0:
+            return
+        self._refill()
+        self.level -= amount
+
+    def snapshot(self) -> Dict[str, float]:
+        if self.limit > 0:
+            self._refill()
+        return {"limit": self.limit, "available": round(self.level, 6)}
+
+
+@dataclass
+class GovernorKey:
+    requests: TokenBucket
+    tokens: TokenBucket
+    usd: TokenBucket
+    admitted: int = 0
+    queued: int = 0
+    degraded: int = 0
+    shed: int = 0
+    last_seen: float = field(default_factory=time.monotonic)
+
+    def wait_time(self, tokens: float, cost: float) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens), self.usd.wait_time(cost))
+
+    def consume(self, tokens: float, cost: float):
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.usd.consume(cost)
+        self.admitted += 1
+        self.last_seen = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests.snapshot(),
+            "tokens_per_minute": self.tokens.snapshot(),
+            "usd_per_hour": self.usd.snapshot(),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "degraded": self.degraded,
+            "shed": self.shed
+        }
+
+
+class RateGovernor:
+    """Token-bucket governor keyed by meeting_id and by model.
+
+    Latency-critical calls (live camera frames) are degraded to a cheaper model
+    or shed when a limit is hit; everything else queues until a deadline.
+    """
+
+    def __init__(
+        self,
+        meeting_limits: Tuple[float, float, float],
+        model_limits: Tuple[float, float, float],
+        queue_deadline_seconds: float = 10.0,
+        max_keys: int = 10000
+    ):
+        self.meeting_limits = meeting_limits
+        self.model_limits = model_limits
+        self.queue_deadline_seconds = queue_deadline_seconds
+        self.max_keys = max_keys
+        self.keys: Dict[str, GovernorKey] = {}
+
+    def _key(self, kind: str, name: str) -> GovernorKey:
+        key_name = f"{kind}:{name}"
+        if key_name not in self.keys:
+            if len(self.keys) >= self.max_keys:
+                # Evict the least recently used key so idle meetings do not accumulate
+                oldest = min(self.keys, key=lambda k: self.keys[k].last_seen)
+                del self.keys[oldest]
+            rpm, tpm, usd_per_hour = self.meeting_limits if kind == "meeting" else self.model_limits
+            self.keys[key_name] = GovernorKey(
+                requests=TokenBucket(rpm, 60),
+                tokens=TokenBucket(tpm, 60),
+                usd=TokenBucket(usd_per_hour, 3600)
+            )
+        return self.keys[key_name]
+
+    def _keys_for(self, meeting_id: Optional[str], model: str) -> List[GovernorKey]:
+        return [self._key("meeting", meeting_id or "default"), self._key("model", model)]
+
+    def _wait_time(self, meeting_id: Optional[str], model: str, tokens: float, cost: float) -> float:
+        return max(key.wait_time(tokens, cost) for key in self._keys_for(meeting_id, model))
+
+    async def admit(
+        self,
+        meeting_id: Optional[str],
+        model: str,
+        tokens: float,
+        cost: float,
+        latency_critical: bool = False,
+        degraded: Optional[Tuple[str, float, float]] = None
+    ) -> str:
+        """Admit a request and return the model to use.
+
+        `degraded` is an optional (model, tokens, cost) fallback that is used
+        instead of waiting when the preferred model is over its limits.
+        """
+        meeting_key = self._key("meeting", meeting_id or "default")
+        deadline = time.monotonic() + self.queue_deadline_seconds
+        queued = False
+
+        while True:
+            wait = self._wait_time(meeting_id, model, tokens, cost)
+            if wait == 0:
+                for key in self._keys_for(meeting_id, model):
+                    key.consume(tokens, cost)
+                return model
+
+            if degraded is not None:
+                degraded_model, degraded_tokens, degraded_cost = degraded
+                if self._wait_time(meeting_id, degraded_model, degraded_tokens, degraded_cost) == 0:
+                    for key in self._keys_for(meeting_id, degraded_model):
+                        key.consume(degraded_tokens, degraded_cost)
+                    meeting_key.degraded += 1
+                    logger.warning("Degraded model", model=model, degraded_to=degraded_model, meeting_id=meeting_id)
+                    return degraded_model
+
+            if latency_critical or time.monotonic() + wait > deadline:
+                meeting_key.shed += 1
+                raise RateLimitedError(
+                    f"Rate limit reached for meeting {meeting_id or 'default'} on {model}; retry in {wait:.1f}s"
+                )
+
+            if not queued:
+                meeting_key.queued += 1
+                queued = True
+            await asyncio.sleep(min(wait, max(0.0, deadline - time.monotonic())))
+
+    def try_admit(self, meeting_id: Optional[str], model: str, tokens: float, cost: float) -> bool:
+        """Admit a request only if there is headroom now; never waits, degrades or sheds"""
+        if self._wait_time(meeting_id, model, tokens, cost) > 0:
+            return False
+        for key in self._keys_for(meeting_id, model):
+            key.consume(tokens, cost)
+        return True
+
+    def settle(self, meeting_id: Optional[str], model: str, estimated_tokens: float, actual_tokens: float,
+               estimated_cost: float, actual_cost: float):
+        """Correct the buckets once the real usage of an admitted request is known"""
+        for key in self._keys_for(meeting_id, model):
+            key.tokens.consume(actual_tokens - estimated_tokens)
+            key.usd.consume(actual_cost - estimated_cost)
+
+    def get_state(self) -> Dict[str, Any]:
+        meetings = {}
+        models = {}
+        for name, key in self.keys.items():
+            kind, _, key_id = name.partition(":")
+            (meetings if kind == "meeting" else models)[key_id] = key.snapshot()
+        return {
+            "queue_deadline_seconds": self.queue_deadline_seconds,
+            "meetings": meetings,
+            "models": models
+        }
+
+
+# Global instance
+rate_governor = RateGovernor(
+    meeting_limits=(
+        settings.GOVERNOR_MEETING_RPM,
+        settings.GOVERNOR_MEETING_TPM,
+        settings.GOVERNOR_MEETING_USD_PER_HOUR
+    ),
+    model_limits=(
+        settings.GOVERNOR_MODEL_RPM,
+        settings.GOVERNOR_MODEL_TPM,
+        settings.GOVERNOR_MODEL_USD_PER_HOUR
+    ),
+    queue_deadline_seconds=settings.GOVERNOR_QUEUE_DEADLINE_SECONDS
+)
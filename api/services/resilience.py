@@ -0,0 +1,259 @@
+import asyncio
+import random
+import time
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+from config import settings
+from .structured_logging import get_logger
+
+logger = get_logger("resilience")
+
+# Status codes worth retrying; everything else (400, 401, 404, ...) fails immediately
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while a model's circuit breaker is open"""
+    pass
+
+
+def is_retryable(error: Exception) -> bool:
+    # Only reached after a call failed, by which time the client has loaded the SDK
+    import openai
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def is_rate_limited(error: Exception) -> bool:
+    import openai
+    return isinstance(error, openai.RateLimitError)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's Retry-After hint from a failed response, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class CircuitBreaker:
+    """Per-model breaker: opens after consecutive failures, half-opens after a cooldown"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self.trial_in_flight = False
+        if self.state == "half_open" and not self.trial_in_flight:
+            # Let a single trial request through to probe the upstream
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """End a half-open trial that said nothing about upstream health (a 429 or a cancellation); the next call probes again"""
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("Circuit opened", consecutive_failures=self.consecutive_failures)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            if self.state == "open" else 0.0
+        }
+
+
+class ResilientCaller:
+    """Runs blocking upstream calls with timeouts, jittered retries, optional hedging and circuit breaking"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        timeout_seconds: float = 30.0,
+        hedge_delay_seconds: float = 0.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout_seconds = timeout_seconds
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats: Dict[str, int] = {
+            "calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "hedges_skipped": 0,
+            "abandoned": 0, "abandoned_completed": 0, "short_circuited": 0
+        }
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+        return self.breakers[model]
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        hinted = retry_after_seconds(error)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _report_abandoned(self, on_abandoned: Optional[Callable[[Any], None]], request: asyncio.Future):
+        if request.cancelled() or request.exception() is not None:
+            return
+        self.stats["abandoned_completed"] += 1
+        if on_abandoned is not None:
+            try:
+                on_abandoned(request.result())
+            except Exception as e:
+                logger.error("Failed to record abandoned request", error=str(e))
+
+    async def _attempt(self, fn: Callable[[], Any], on_abandoned: Optional[Callable[[Any], None]] = None) -> Any:
+        request = asyncio.ensure_future(asyncio.to_thread(fn))
+        try:
+            return await asyncio.wait_for(asyncio.shield(request), timeout=self.timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Giving up does not stop the thread, and the upstream still bills the request once it
+            # completes, so its response is handed to on_abandoned to be accounted for
+            self.stats["abandoned"] += 1
+            request.add_done_callback(partial(self._report_abandoned, on_abandoned))
+            raise
+
+    async def _hedged_attempt(
+        self,
+        fn: Callable[[], Any],
+        admit_hedge: Optional[Callable[[], bool]] = None,
+        on_abandoned: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """Start a duplicate request if the first has not answered within the hedge delay.
+
+        The duplicate is a second billed request: it is only sent if `admit_hedge`
+        charges it against the caller's budget and rate limits, and the loser's
+        usage is reported through `on_abandoned` when it completes.
+        """
+        primary = asyncio.ensure_future(self._attempt(fn, on_abandoned))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay_seconds)
+        if done:
+            return primary.result()
+        if admit_hedge is not None and not admit_hedge():
+            self.stats["hedges_skipped"] += 1
+            return await primary
+
+        self.stats["hedges"] += 1
+        hedge = asyncio.ensure_future(self._attempt(fn, on_abandoned))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is hedge:
+                        self.stats["hedge_wins"] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def call(
+        self,
+        model: str,
+        fn: Callable[[], Any],
+        hedge: bool = False,
+        admit_hedge: Optional[Callable[[], bool]] = None,
+        on_abandoned: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """Call `fn` (a blocking SDK call) for `model` with retries and circuit breaking.
+
+        `on_abandoned` receives the response of any request that was given up on
+        (timed out, or lost a hedge) but still completed upstream.
+        """
+        breaker = self.breaker(model)
+        self.stats["calls"] += 1
+        use_hedging = hedge and self.hedge_delay_seconds > 0
+
+        for attempt in range(self.max_attempts):
+            if not breaker.allow():
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(f"Circuit open for {model}; upstream is failing, not sending request")
+            trial = breaker.state == "half_open"
+            try:
+                result = await (
+                    self._hedged_attempt(fn, admit_hedge, on_abandoned) if use_hedging else self._attempt(fn, on_abandoned)
+                )
+                breaker.record_success()
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered (e.g. a 400), so it is healthy
+                    breaker.record_success()
+                    raise
+                # 429s are backpressure rather than an unhealthy upstream, so they do not trip the breaker
+                if not is_rate_limited(e):
+                    breaker.record_failure()
+                if attempt == self.max_attempts - 1:
+                    raise
+                error = e
+            finally:
+                if trial and breaker.trial_in_flight:
+                    # The trial ended in a 429 or was cancelled without recording an outcome; free the slot so
+                    # the next attempt probes again rather than waiting on a trial that never reports
+                    breaker.release_trial()
+            delay = self._backoff(attempt, error)
+            self.stats["retries"] += 1
+            logger.warning("Model call failed, retrying", model=model, attempt=attempt + 1, error_type=type(error).__name__, delay_seconds=round(delay, 2))
+            await asyncio.sleep(delay)
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            "stats": dict(self.stats),
+            "circuit_breakers": {model: breaker.snapshot() for model, breaker in self.breakers.items()}
+        }
+
+
+# Global instance
+resilient_caller = ResilientCaller(
+    max_attempts=settings.OPENAI_MAX_ATTEMPTS,
+    timeout_seconds=settings.OPENAI_TIMEOUT_SECONDS,
+    hedge_delay_seconds=settings.OPENAI_HEDGE_DELAY_SECONDS,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_seconds=settings.CIRCUIT_RESET_SECONDS
+)
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from config import settings
+from .openai_service import OpenAIService
+from .batch_analyzer import BatchTextAnalyzer
+from .cable_revisions import CableReviser
+from .frame_pool import FramePool
+from .cultural_engine import cultural_engine
+from .event_stream import connection_manager
+from .persistence import write_behind_queue
+from .resilience import resilient_caller
+from .supabase_service import close_supabase_service, get_supabase_service
+from .structured_logging import get_logger
+from .metrics import mark_worker_stopped
+
+logger = get_logger("lifecycle")
+
+PERSISTENCE_CONFIGURED = bool(settings.SUPABASE_URL or settings.SUPABASE_REST_URL)
+
+
+class ResourceContainer:
+    """Owns a worker's clients, pools and background workers from startup to shutdown.
+
+    The app's lifespan calls start() and stop(). Analysis requests are counted
+    by DrainMiddleware, so drain() can stop admitting new ones and let those
+    running finish before WebSocket clients are told to reconnect, the
+    write-behind queue is flushed and connections are closed. drain() also
+    runs on its own from /admin/drain, ahead of the shutdown signal, for
+    rolling restarts behind a load balancer.
+    """
+
+    def __init__(self, blocking_threads: int = 32, drain_seconds: float = 30.0,
+                 check_timeout: float = 2.0, check_cache_seconds: float = 5.0,
+                 frame_pool_mode: str = "thread", frame_pool_workers: int = 0):
+        self.openai = OpenAIService()
+        self.batch_analyzer = BatchTextAnalyzer(self.openai)
+        self.cable_reviser = CableReviser(self.openai)
+        self.frames = FramePool(frame_pool_mode, frame_pool_workers)
+        self.blocking_threads = blocking_threads
+        self.drain_seconds = drain_seconds
+        self.check_timeout = check_timeout
+        self.check_cache_seconds = check_cache_seconds
+        # stopped -> ready -> draining -> stopped
+        self.state = "stopped"
+        self.in_flight = 0
+        self.temp_dir: Optional[str] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._database_check: Optional[Dict[str, Any]] = None
+        self._database_checked_at = 0.0
+
+    @property
+    def accepting(self) -> bool:
+        return self.state == "ready"
+
+    async def start(self):
+        # asyncio.to_thread and the synchronous SDK calls run on this pool, which is sized here and shut down in stop()
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(self.blocking_threads, thread_name_prefix="blocking")
+        )
+        # Uploads and extracted audio go here, so whatever a cancelled request leaves behind is removed at shutdown
+        self.temp_dir = tempfile.mkdtemp(prefix="diplosense-")
+        self._idle = asyncio.Event()
+        self._idle.set()
+        if PERSISTENCE_CONFIGURED:
+            # Keep the cultural rulebase in sync with the rule store without a round-trip per request
+            cultural_engine.start_background_refresh()
+        write_behind_queue.start()
+        if settings.WARM_UP_ON_STARTUP:
+            # Frame pool workers load OpenCV as they start
+            self.frames.start()
+            # Heavy dependencies stay off the import path; load them in a thread while the server starts taking requests
+            self._warm_up_task = asyncio.create_task(asyncio.to_thread(self.warm_up))
+        self.state = "ready"
+        logger.info("Resources started", blocking_threads=self.blocking_threads, frame_pool=self.frames.mode,
+                    frame_workers=self.frames.workers, temp_dir=self.temp_dir)
+
+    def warm_up(self):
+        """Create the OpenAI client and build the cultural matrix; runs off the event loop"""
+        self.openai.warm_up()
+        cultural_engine.warm_up()
+
+    def begin(self):
+        self.in_flight += 1
+        self._idle.clear()
+
+    def end(self):
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Stop admitting analyses, wait for the running ones, then flush and close WebSocket clients"""
+        if self.state == "ready":
+            self.state = "draining"
+            logger.info("Draining", in_flight=self.in_flight)
+        timeout = self.drain_seconds if timeout is None else timeout
+        started = time.monotonic()
+        if self._idle is not None:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.error("Drain timed out with analyses still running", in_flight=self.in_flight, timeout_seconds=timeout)
+        closed = await connection_manager.close_all()
+        return {
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "waited_seconds": round(time.monotonic() - started, 3),
+            "closed_connections": closed
+        }
+
+    async def stop(self):
+        """Drain, flush the write-behind queue, then close clients, pools and temp files"""
+        if self.state == "stopped":
+            return
+        await self.drain()
+        await cultural_engine.stop_background_refresh()
+        # Inserts run on the blocking pool and through the PostgREST client, so both are closed after the flush
+        await write_behind_queue.stop()
+        self.openai.close()
+        close_supabase_service()
+        await asyncio.to_thread(self.frames.stop)
+        # Waits for blocking calls still running, including a warm-up that has not finished
+        await asyncio.get_running_loop().shutdown_default_executor()
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        mark_worker_stopped()
+        self.state = "stopped"
+        logger.info("Resources stopped")
+
+    @contextmanager
+    def temporary_path(self, suffix: str = ""):
+        """A fresh path in this worker's temp directory, removed when the block exits"""
+        path = os.path.join(self.temp_dir or tempfile.gettempdir(), f"{uuid.uuid4().hex}{suffix}")
+        try:
+            yield path
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def temporary_directory(self) -> tempfile.TemporaryDirectory:
+        return tempfile.TemporaryDirectory(dir=self.temp_dir)
+
+    async def _check_executor(self) -> Dict[str, Any]:
+        # A no-op that cannot get a thread within the timeout means blocking calls are queueing
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(lambda: None), timeout=self.check_timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "Blocking thread pool saturated", "threads": self.blocking_threads}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2), "threads": self.blocking_threads}
+
+    async def _check_database(self) -> Dict[str, Any]:
+        if not PERSISTENCE_CONFIGURED:
+            return {"ok": True, "configured": False}
+        # The probe is a real query, so frequent health checks reuse a recent result
+        if self._database_check is not None and time.monotonic() - self._database_checked_at < self.check_cache_seconds:
+            return self._database_check
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(get_supabase_service().ping(), timeout=self.check_timeout)
+            result = {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"No answer within {self.check_timeout}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        self._database_check, self._database_checked_at = result, time.monotonic()
+        return result
+
+    def _check_persistence(self) -> Dict[str, Any]:
+        if not write_behind_queue.enabled:
+            return {"ok": True, "enabled": False}
+        stats = write_behind_queue.get_stats()
+        return {
+            "ok": write_behind_queue.running and stats["queued"] < stats["max_queue"],
+            "running": write_behind_queue.running,
+            "queued": stats["queued"],
+            "max_queue": stats["max_queue"]
+        }
+
+    def _check_openai(self) -> Dict[str, Any]:
+        open_circuits = [model for model, breaker in resilient_caller.breakers.items() if breaker.state == "open"]
+        return {
+            "ok": bool(settings.OPENAI_API_KEY) and not open_circuits,
+            "api_key_configured": bool(settings.OPENAI_API_KEY),
+            "open_circuits": open_circuits
+        }
+
+    def _check_cultural_rules(self) -> Dict[str, Any]:
+        snapshot = cultural_engine.snapshot
+        return {
+            "ok": not PERSISTENCE_CONFIGURED or cultural_engine.refreshing,
+            "version": snapshot.version,
+            "source": snapshot.source,
+            "refreshing": cultural_engine.refreshing
+        }
+
+    def _check_warm_up(self) -> Dict[str, Any]:
+        task = self._warm_up_task
+        if task is None:
+            return {"ok": True, "state": "disabled"}
+        if not task.done():
+            return {"ok": True, "state": "running"}
+        if task.cancelled() or task.exception() is not None:
+            # Not fatal: the modules are imported again on first use
+            return {"ok": False, "state": "failed", "error": "cancelled" if task.cancelled() else str(task.exception())}
+        return {"ok": True, "state": "done"}
+
+    async def health(self) -> Dict[str, Any]:
+        executor, database = await asyncio.gather(self._check_executor(), self._check_database())
+        checks = {
+            "executor": executor,
+            "database": database,
+            "persistence": self._check_persistence(),
+            "openai": self._check_openai(),
+            "cultural_rules": self._check_cultural_rules(),
+            "warm_up": self._check_warm_up()
+        }
+        if self.state != "ready":
+            status = self.state
+        else:
+            status = "healthy" if all(check["ok"] for check in checks.values()) else "degraded"
+        return {"status": status, "service": "diplosense-api", "in_flight": self.in_flight, "checks": checks}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "blocking_threads": self.blocking_threads,
+            "frame_pool": self.frames.get_stats()
+        }
+
+
+class DrainMiddleware:
+    """Counts analysis requests in flight and turns new ones away with a 503 once draining has begun"""
+
+    def __init__(self, app, resources: ResourceContainer, path_prefixes=("/api/v1/analyze/", "/api/v1/generate/", "/api/v1/demo/analyze")):
+        self.app = app
+        self.resources = resources
+        self.path_prefixes = path_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+        if not self.resources.accepting:
+            # Retry-After lets clients and the load balancer send the retry to another replica
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"), (b"retry-after", b"1"), (b"connection", b"close")
+            ]})
+            await send({"type": "http.response.body", "body": b'{"detail":"Server is shutting down"}'})
+            return
+        self.resources.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.resources.end()
+
+
+# Global instance
+resources = ResourceContainer(
+    blocking_threads=settings.BLOCKING_POOL_THREADS,
+    drain_seconds=settings.SHUTDOWN_DRAIN_SECONDS,
+    check_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    check_cache_seconds=settings.HEALTH_CHECK_CACHE_SECONDS,
+    frame_pool_mode=settings.FRAME_POOL_MODE,
+    frame_pool_workers=settings.FRAME_POOL_WORKERS
+)
@@ -0,0 +1,94 @@
+from typing import Any, Dict
+import orjson
+from fastapi.responses import JSONResponse
+from .metrics import record_cache
+
+# Non-string keys (e.g. frame numbers) are stringified like json.dumps does; NumPy values come from OpenCV paths
+DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# How much serialization work is done and how much is saved by reusing encoded payloads
+serialization_stats: Dict[str, int] = {"encodes": 0, "bytes_encoded": 0, "reuses": 0, "bytes_reused": 0, "response_bytes": 0}
+
+
+class Encoded:
+    """A value serialized once, whose bytes are spliced into every envelope that carries it.
+
+    Wrap a result that goes out more than once, e.g. in a WebSocket event
+    and in the HTTP response, and pass the wrapper as a top-level value of
+    each envelope; dumps() then reuses the cached bytes instead of encoding
+    the result again.
+    """
+
+    __slots__ = ("value", "_bytes")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self._bytes = None
+
+    @property
+    def bytes(self) -> bytes:
+        if self._bytes is None:
+            self._bytes = orjson.dumps(self.value, default=_default, option=DUMPS_OPTIONS)
+            serialization_stats["encodes"] += 1
+            serialization_stats["bytes_encoded"] += len(self._bytes)
+            record_cache("encoded_payload", False)
+        else:
+            serialization_stats["reuses"] += 1
+            serialization_stats["bytes_reused"] += len(self._bytes)
+            record_cache("encoded_payload", True)
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._bytes if self._bytes is not None else self.bytes)
+
+
+def unwrap(value: Any) -> Any:
+    return value.value if isinstance(value, Encoded) else value
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Encoded):
+        # Nested below the top level: correct, just not reused
+        return obj.value
+    if type(obj).__module__ == "numpy" and hasattr(obj, "item"):
+        # NumPy scalars orjson does not handle natively; checked by module so NumPy is not imported here
+        return obj.item()
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes, splicing in the cached bytes of top-level Encoded values"""
+    if isinstance(obj, Encoded):
+        return obj.bytes
+    if isinstance(obj, dict) and any(isinstance(value, Encoded) for value in obj.values()):
+        plain = {key: value for key, value in obj.items() if not isinstance(value, Encoded)}
+        parts = [orjson.dumps(plain, default=_default, option=DUMPS_OPTIONS)[:-1]]
+        for key, value in obj.items():
+            if isinstance(value, Encoded):
+                parts.append(b"," if len(parts) > 1 or plain else b"")
+                parts.append(orjson.dumps(str(key)) + b":" + value.bytes)
+        parts.append(b"}")
+        return b"".join(parts)
+    return orjson.dumps(obj, default=_default, option=DUMPS_OPTIONS)
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode()
+
+
+def serialized_size(obj: Any) -> int:
+    """Size of the JSON encoding in bytes, for accounting"""
+    return len(obj) if isinstance(obj, Encoded) else len(dumps(obj))
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, reusing the bytes of Encoded values in the content"""
+
+    def render(self, content: Any) -> bytes:
+        body = dumps(content)
+        serialization_stats["response_bytes"] += len(body)
+        return body
+
+
+def get_serialization_stats() -> Dict[str, int]:
+    return dict(serialization_stats)
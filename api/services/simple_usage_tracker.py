@@ -3,6 +3,11 @@ import json
 from typing import Dict, Any, List
 from datetime import datetime
 from collections import defaultdict
+from .structured_logging import get_logger
+from .tracing import current_span
+from .metrics import record_model_call
+
+logger = get_logger("usage")
 
 class SimpleUsageTracker:
     def __init__(self):
@@ -11,6 +16,10 @@ class SimpleUsageTracker:
             "request_count": 0,
             "total_cost": 0.0,
             "total_tokens": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "image_tokens": 0,
+            "audio_seconds": 0.0,
             "total_response_time": 0.0
         })
     
@@ -22,7 +31,13 @@ class SimpleUsageTracker:
         cost: float,
         response_time_ms: float,
         meeting_id: str = None,
-        error: str = None
+        error: str = None,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        image_tokens: int = 0,
+        audio_seconds: float = 0.0,
+        audio_duration_estimated: bool = False,
+        pricing_version: str = None
     ):
         """Log an API request"""
         request_data = {
@@ -30,7 +45,13 @@ class SimpleUsageTracker:
             "service": service,
             "model": model,
             "tokens": tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "image_tokens": image_tokens,
+            "audio_seconds": audio_seconds,
+            "audio_duration_estimated": audio_duration_estimated,
             "cost": cost,
+            "pricing_version": pricing_version,
             "response_time_ms": response_time_ms,
             "meeting_id": meeting_id,
             "timestamp": datetime.now().isoformat(),
@@ -44,9 +65,17 @@ class SimpleUsageTracker:
         stats["request_count"] += 1
         stats["total_cost"] += cost
         stats["total_tokens"] += tokens
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["image_tokens"] += image_tokens
+        stats["audio_seconds"] += audio_seconds
         stats["total_response_time"] += response_time_ms
         
-        print(f"[USAGE] Logged {service} request: {tokens} tokens, ${cost:.4f}, {response_time_ms:.0f}ms")
+        record_model_call(service, model, response_time_ms, error, prompt_tokens, completion_tokens, image_tokens, cost)
+        # Recorded inside the model call's span, so traces show what each call cost
+        current_span().set_attributes(tokens=tokens, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                      image_tokens=image_tokens, cost_usd=round(cost, 6))
+        logger.debug("Request logged", service=service, meeting_id=meeting_id, tokens=tokens, cost_usd=round(cost, 6), response_time_ms=round(response_time_ms))
     
     def get_stats(self, limit: int = 100) -> Dict[str, Any]:
         """Get usage statistics"""
@@ -66,6 +95,10 @@ class SimpleUsageTracker:
                 "request_count": stats["request_count"],
                 "total_cost": stats["total_cost"],
                 "total_tokens": stats["total_tokens"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "image_tokens": stats["image_tokens"],
+                "audio_seconds": stats["audio_seconds"],
                 "avg_response_time": avg_response_time
             })
         
@@ -82,15 +115,11 @@ class SimpleUsageTracker:
         }
     
     def estimate_openai_cost(self, model: str, tokens: int) -> float:
-        """Estimate OpenAI API cost"""
-        # Simplified pricing (per 1K tokens)
-        pricing = {
-            "gpt-4o": 0.005,      # Average of input/output
-            "whisper-1": 0.006    # Per minute, but estimated per token
-        }
-        
-        rate = pricing.get(model, 0.005)
-        return (tokens / 1000) * rate
+        """Estimate OpenAI API cost when only a total token count is known"""
+        # Exact costs are computed by services.accounting from response.usage;
+        # this blended estimate prices all tokens at the input rate
+        from .accounting import pricing_table
+        return pricing_table.chat_cost(model, tokens, 0)
 
 # Global instance
 simple_usage_tracker = SimpleUsageTracker()
\ No newline at end of file
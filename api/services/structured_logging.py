@@ -0,0 +1,220 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+import orjson
+from config import settings
+
+ROOT_LOGGER = "diplosense"
+
+logging_stats: Dict[str, int] = {"dropped": 0, "sampled_out": 0, "format_errors": 0}
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Cap strings and nested payloads so a single record cannot carry a whole analysis result"""
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if not isinstance(value, str):
+        try:
+            encoded = orjson.dumps(value, default=str).decode()
+        except TypeError:
+            encoded = repr(value)
+        if len(encoded) <= max_chars:
+            return value
+        value = encoded
+    if len(value) > max_chars:
+        return f"{value[:max_chars]}...(+{len(value) - max_chars} chars)"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, category, message and the record's structured fields"""
+
+    def __init__(self, max_field_chars: int = 200):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def fields(self, record: logging.LogRecord) -> Dict[str, Any]:
+        return {key: truncate(value, self.max_field_chars) for key, value in (getattr(record, "fields", None) or {}).items()}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "category": record.name.removeprefix(f"{ROOT_LOGGER}."),
+            "msg": truncate(record.getMessage(), self.max_field_chars * 4)
+        }
+        try:
+            entry.update(self.fields(record))
+        except Exception:
+            logging_stats["format_errors"] += 1
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(JsonFormatter):
+    """Readable single-line records for local development: [category] message key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        category = record.name.removeprefix(f"{ROOT_LOGGER}.").upper()
+        line = f"{record.levelname} [{category}] {record.getMessage()}"
+        try:
+            fields = self.fields(record)
+        except Exception:
+            logging_stats["format_errors"] += 1
+            fields = {}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without formatting them or ever waiting on a full queue"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; the record is not pickled, so it can go as is
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logging_stats["dropped"] += 1
+
+
+class Sampler:
+    """Per-message token buckets that let a burst through, then a steady trickle of each repeated message"""
+
+    def __init__(self, per_second: float, burst: int):
+        self.per_second = per_second
+        self.burst = burst
+        self.buckets: Dict[Tuple[str, str], list] = {}
+        self.lock = threading.Lock()
+
+    def allow(self, key: Tuple[str, str]) -> Tuple[bool, int]:
+        """Whether to emit this occurrence, and how many were suppressed since the last one emitted"""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                # tokens, last refill, suppressed since last emit
+                bucket = self.buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                suppressed, bucket[2] = bucket[2], 0
+                return True, suppressed
+            bucket[2] += 1
+        logging_stats["sampled_out"] += 1
+        return False, 0
+
+
+class StructuredLogger:
+    """Category logger taking a constant message plus structured fields.
+
+    Disabled levels return before any work. sampled() is for per-frame and
+    other per-item messages: each distinct message is rate limited, and the
+    next record that gets through carries the number suppressed in between.
+    """
+
+    def __init__(self, category: str, sampler: Sampler):
+        self.category = category
+        self.logger = logging.getLogger(f"{ROOT_LOGGER}.{category}")
+        self.sampler = sampler
+
+    def _log(self, level: int, msg: str, fields: Dict[str, Any], exc_info: Any = None):
+        if exc_info is True:
+            exc_info = sys.exc_info()
+        # Built directly rather than via Logger.log, which walks the stack to find the caller on every call
+        record = self.logger.makeRecord(self.logger.name, level, "", 0, msg, (), exc_info, extra={"fields": fields})
+        self.logger.handle(record)
+
+    def debug(self, msg: str, **fields):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, fields)
+
+    def info(self, msg: str, **fields):
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, fields)
+
+    def warning(self, msg: str, **fields):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, fields)
+
+    def error(self, msg: str, exc_info: Any = None, **fields):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, fields, exc_info)
+
+    def sampled(self, msg: str, level: int = logging.INFO, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        allowed, suppressed = self.sampler.allow((self.category, msg))
+        if allowed:
+            if suppressed:
+                fields["suppressed"] = suppressed
+            self._log(level, msg, fields)
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Per-category levels from e.g. "openai=WARNING,frames=ERROR" """
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            category, level = part.split("=", 1)
+            levels[category.strip()] = logging.getLevelName(level.strip().upper())
+    return {category: level for category, level in levels.items() if isinstance(level, int)}
+
+
+class LoggingSystem:
+    def __init__(self):
+        self.sampler = Sampler(settings.LOG_SAMPLE_PER_SECOND, settings.LOG_SAMPLE_BURST)
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.queue: Optional[queue.Queue] = None
+
+    def configure(self, stream=None):
+        """Route the diplosense loggers through a bounded queue to a stdout writer thread"""
+        self.stop()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(logging.getLevelName(settings.LOG_LEVEL.upper()))
+        root.propagate = False
+        for category, level in parse_levels(settings.LOG_LEVELS).items():
+            logging.getLogger(f"{ROOT_LOGGER}.{category}").setLevel(level)
+
+        formatter = TextFormatter if settings.LOG_FORMAT == "text" else JsonFormatter
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(formatter(settings.LOG_MAX_FIELD_CHARS))
+        self.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        root.handlers = [NonBlockingQueueHandler(self.queue)]
+        self.listener = logging.handlers.QueueListener(self.queue, output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Flush queued records; called at exit"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        self.listener = None
+
+    def get_logger(self, category: str) -> StructuredLogger:
+        return StructuredLogger(category, self.sampler)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**logging_stats, "queued": self.queue.qsize() if self.queue else 0}
+
+
+# Global instance
+logging_system = LoggingSystem()
+logging_system.configure()
+atexit.register(logging_system.stop)
+
+
+def get_logger(category: str) -> StructuredLogger:
+    return logging_system.get_logger(category)
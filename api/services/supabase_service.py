@@ -1,70 +1,242 @@
-from supabase import create_client, Client
 from config import settings
 from typing import Dict, List, Any, Optional
+import asyncio
+import base64
 import json
-from datetime import datetime
+import re
+from datetime import datetime, timezone
+from .structured_logging import get_logger
+
+logger = get_logger("supabase")
+
+# Projected fields are dotted paths into an analysis' JSONB data, e.g. "emotion_analysis.stress_level"
+FIELD_PATH_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+# PostgREST reports the SQLSTATE or its own PGRST code rather than the HTTP status. These classes are
+# answered with a 4xx, so retrying the same request cannot succeed: data exceptions and constraint
+# violations come from individual rows, the others from the request as a whole (bad column, no grant)
+ROW_ERROR_CODE_PREFIXES = ("22", "23")
+REQUEST_ERROR_CODE_PREFIXES = ("42", "PGRST1", "PGRST2", "PGRST3")
+
+
+def rejection_kind(error: Exception) -> Optional[str]:
+    """'row' or 'request' if PostgREST rejected an insert with a client error, None if it may succeed on retry"""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        # A non-JSON error body carries the HTTP status instead
+        return "request" if 400 <= code < 500 and code not in (408, 429) else None
+    if not isinstance(code, str):
+        return None
+    if code.startswith(ROW_ERROR_CODE_PREFIXES):
+        return "row"
+    if code.startswith(REQUEST_ERROR_CODE_PREFIXES):
+        return "request"
+    return None
+
+
+def encode_cursor(timestamp: str, row_id: int) -> str:
+    """Opaque keyset cursor pointing just past the row with this (timestamp, id)"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        datetime.fromisoformat(timestamp)
+        return timestamp, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
 
 class SupabaseService:
     def __init__(self):
-        self.client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        # The clients are imported here, when persistence or the rule store first needs them, not at startup
+        if settings.SUPABASE_REST_URL:
+            from postgrest import SyncPostgrestClient
+            # Plain PostgREST (e.g. the local stand-in in docker-compose.yml) serves tables at its root
+            headers = {"apikey": settings.SUPABASE_KEY, "Authorization": f"Bearer {settings.SUPABASE_KEY}"} if settings.SUPABASE_KEY else {}
+            self.client = SyncPostgrestClient(settings.SUPABASE_REST_URL, headers=headers)
+        else:
+            from supabase import create_client
+            self.client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+    @property
+    def postgrest(self):
+        return self.client if settings.SUPABASE_REST_URL else self.client.postgrest
+
+    async def ping(self):
+        """Cheapest real round-trip to the database, for health checks; raises on failure"""
+        await asyncio.to_thread(lambda: self.client.table('analyses').select('id').limit(1).execute())
+
+    def close(self):
+        """Close the pooled HTTP connections to PostgREST"""
+        self.postgrest.session.close()
+
+    @staticmethod
+    def analysis_row(meeting_id: str, analysis_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'meeting_id': meeting_id,
+            'analysis_type': analysis_type,
+            'data': data,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+
+    @staticmethod
+    def cable_row(meeting_id: str, cable_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'meeting_id': meeting_id,
+            'cable_data': cable_data,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+
+    async def insert_rows(self, table: str, rows: List[Dict[str, Any]]):
+        """Insert many rows in one request; raises on failure so callers can retry"""
+        # The client is synchronous, so the request runs off the event loop
+        from postgrest.types import ReturnMethod
+        await asyncio.to_thread(lambda: self.client.table(table).insert(rows, returning=ReturnMethod.minimal).execute())
 
     async def store_analysis(self, meeting_id: str, analysis_type: str, data: Dict[str, Any]) -> bool:
         """Store analysis data in Supabase"""
         try:
-            result = self.client.table('analyses').insert({
-                'meeting_id': meeting_id,
-                'analysis_type': analysis_type,
-                'data': json.dumps(data),
-                'timestamp': datetime.now().isoformat()
-            }).execute()
+            await self.insert_rows('analyses', [self.analysis_row(meeting_id, analysis_type, data)])
             return True
         except Exception as e:
-            print(f"Error storing analysis: {e}")
+            logger.error("Storing analysis failed", meeting_id=meeting_id, error=str(e))
             return False
 
     async def store_diplomatic_cable(self, meeting_id: str, cable_data: Dict[str, Any]) -> bool:
         """Store diplomatic cable in Supabase"""
         try:
-            result = self.client.table('diplomatic_cables').insert({
-                'meeting_id': meeting_id,
-                'cable_data': json.dumps(cable_data),
-                'timestamp': datetime.now().isoformat()
-            }).execute()
+            await self.insert_rows('diplomatic_cables', [self.cable_row(meeting_id, cable_data)])
             return True
         except Exception as e:
-            print(f"Error storing diplomatic cable: {e}")
+            logger.error("Storing diplomatic cable failed", meeting_id=meeting_id, error=str(e))
             return False
 
-    async def get_meeting_analyses(self, meeting_id: str) -> List[Dict[str, Any]]:
-        """Get all analyses for a meeting"""
+    async def get_meeting_timeline(self, meeting_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                                   analysis_types: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                                   cursor: Optional[str] = None, limit: int = 100, descending: bool = False) -> Dict[str, Any]:
+        """One page of a meeting's analyses in time order, using keyset pagination on (timestamp, id).
+
+        Served by the (meeting_id, timestamp, id) index, so each page costs the
+        same however deep into a long meeting it is. With fields, only those
+        paths of each analysis' data are selected and returned.
+        """
+        for path in fields or []:
+            if not FIELD_PATH_PATTERN.match(path):
+                raise ValueError(f"Invalid field: {path}")
+        after = decode_cursor(cursor) if cursor else None
+
+        columns = ["id", "analysis_type", "timestamp"]
+        if fields:
+            # Aliased JSON path selections so Postgres extracts just these values from the JSONB
+            columns += [f"f{i}:data->" + "->".join(path.split(".")) for i, path in enumerate(fields)]
+        else:
+            columns.append("data")
+        query = self.client.table('analyses').select(",".join(columns)).eq('meeting_id', meeting_id)
+        if start:
+            query = query.gte('timestamp', start)
+        if end:
+            query = query.lt('timestamp', end)
+        if analysis_types:
+            query = query.in_('analysis_type', analysis_types)
+        if after:
+            timestamp, row_id = after
+            op = "lt" if descending else "gt"
+            query.params = query.params.add(
+                "or", f'(timestamp.{op}."{timestamp}",and(timestamp.eq."{timestamp}",id.{op}.{row_id}))'
+            )
+        direction = ".desc" if descending else ""
+        query.params = query.params.add("order", f"timestamp{direction},id{direction}")
+        # One extra row tells us whether another page exists without a count query
+        query = query.limit(limit + 1)
+
         try:
-            result = self.client.table('analyses').select('*').eq('meeting_id', meeting_id).execute()
-            return result.data
+            result = await asyncio.to_thread(query.execute)
         except Exception as e:
-            print(f"Error retrieving analyses: {e}")
-            return []
+            logger.error("Retrieving meeting timeline failed", meeting_id=meeting_id, error=str(e))
+            return {"error": str(e)}
+
+        rows = result.data[:limit]
+        if fields:
+            for row in rows:
+                data: Dict[str, Any] = {}
+                for i, path in enumerate(fields):
+                    *parents, leaf = path.split(".")
+                    target = data
+                    for key in parents:
+                        target = target.setdefault(key, {})
+                    target[leaf] = row.pop(f"f{i}", None)
+                row["data"] = data
+        has_more = len(result.data) > limit
+        return {
+            "items": rows,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(rows[-1]["timestamp"], rows[-1]["id"]) if has_more else None
+        }
+
+    async def get_meeting_analyses(self, meeting_id: str) -> List[Dict[str, Any]]:
+        """Get all analyses for a meeting, in time order"""
+        analyses: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            page = await self.get_meeting_timeline(meeting_id, cursor=cursor, limit=1000)
+            if "error" in page:
+                return analyses
+            analyses.extend(page["items"])
+            if not page["has_more"]:
+                return analyses
+            cursor = page["next_cursor"]
 
     async def get_cultural_rules(self) -> Dict[str, Any]:
         """Get cultural rules from database"""
         try:
-            result = self.client.table('cultural_rules').select('*').execute()
+            result = await asyncio.to_thread(self.client.table('cultural_rules').select('*').execute)
             rules = {}
             for item in result.data:
-                rules[item['culture']] = json.loads(item['rules'])
+                rules[item['culture']] = json.loads(item['rules']) if isinstance(item['rules'], str) else item['rules']
             return rules
         except Exception as e:
-            print(f"Error retrieving cultural rules: {e}")
+            logger.error("Retrieving cultural rules failed", error=str(e))
             return {}
 
+    async def get_cultural_rules_version(self) -> Optional[str]:
+        """Get the version of the cultural rule set, used to skip unchanged reloads.
+
+        The latest updated_at catches inserts and updates; the row count catches deletions.
+        """
+        query = self.client.table('cultural_rules').select('updated_at', count='exact').order('updated_at', desc=True).limit(1)
+        result = await asyncio.to_thread(query.execute)
+        return f"{result.data[0]['updated_at']}/{result.count}" if result.data else None
+
     async def store_cultural_rule(self, culture: str, rules: Dict[str, Any]) -> bool:
         """Store or update cultural rule"""
         try:
-            result = self.client.table('cultural_rules').upsert({
+            await asyncio.to_thread(self.client.table('cultural_rules').upsert({
                 'culture': culture,
-                'rules': json.dumps(rules),
-                'updated_at': datetime.now().isoformat()
-            }).execute()
+                'rules': rules,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }).execute)
             return True
         except Exception as e:
-            print(f"Error storing cultural rule: {e}")
-            return False
\ No newline at end of file
+            logger.error("Storing cultural rule failed", culture=culture, error=str(e))
+            return False
+
+_supabase_service: Optional[SupabaseService] = None
+
+
+def get_supabase_service() -> SupabaseService:
+    """Shared service instance, created on first use so the API starts without database settings"""
+    global _supabase_service
+    if _supabase_service is None:
+        _supabase_service = SupabaseService()
+    return _supabase_service
+
+
+def close_supabase_service():
+    """Close the shared instance's connections, if it was ever created"""
+    global _supabase_service
+    if _supabase_service is not None:
+        _supabase_service.close()
+        _supabase_service = None
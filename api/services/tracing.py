@@ -0,0 +1,290 @@
+import atexit
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+from config import settings
+
+tracing_stats: Dict[str, int] = {"started": 0, "exported": 0, "dropped": 0, "export_errors": 0}
+
+# The innermost open span of the current task; asyncio tasks inherit it from whoever created them
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class NoopSpan:
+    """Stands in for a span that is not recorded; children of an unsampled span are not recorded either"""
+
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+
+class UnsampledRootSpan(NoopSpan):
+    """Marks the task's context as unsampled, so stages below a dropped trace do not start traces of their own"""
+
+    def __enter__(self):
+        self._token = _current_span.set(NOOP_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    """One timed stage of a trace, with OpenTelemetry-style ids, attributes and status"""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns",
+                 "error", "_token")
+    sampled = True
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.exporter.export(self)
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def set_error(self, message: str):
+        self.error = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """OTLP/HTTP JSON body for a batch of finished spans"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "diplosense"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                               if value is not None],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            } for span in spans]
+        }]
+    }]}
+
+
+class SpanExporter:
+    """Buffers finished spans and writes them in batches from a background thread.
+
+    Ending a span only appends it to a bounded buffer; when the buffer is
+    full the span is dropped and counted. The thread writes the buffer every
+    interval, either as JSON lines on stdout or as an OTLP/HTTP JSON post to
+    a local collector.
+    """
+
+    def __init__(self, target: str = "stdout", endpoint: str = "", service_name: str = "diplosense-api",
+                 max_buffer: int = 10000, interval: float = 2.0, stream=None):
+        self.target = target
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.interval = interval
+        self.stream = stream
+        self.buffer: deque = deque()
+        self.max_buffer = max_buffer
+        self._client = None
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    def export(self, span: Span):
+        if len(self.buffer) >= self.max_buffer:
+            tracing_stats["dropped"] += 1
+            return
+        self.buffer.append(span)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self.flush()
+
+    def flush(self):
+        spans = []
+        while self.buffer:
+            spans.append(self.buffer.popleft())
+        if not spans:
+            return
+        try:
+            if self.target == "otlp":
+                self._post(to_otlp(spans, self.service_name))
+            else:
+                stream = self.stream or sys.stdout
+                stream.write("".join(orjson.dumps({"span": span.to_dict()}, default=str).decode() + "\n" for span in spans))
+                stream.flush()
+            tracing_stats["exported"] += len(spans)
+        except Exception:
+            tracing_stats["export_errors"] += 1
+
+    def _post(self, body: Dict[str, Any]):
+        if self._client is None:
+            import httpx
+            self._client = httpx.Client(timeout=5.0)
+        response = self._client.post(self.endpoint, content=orjson.dumps(body, default=str),
+                                     headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+
+    def stop(self):
+        """Write out whatever is buffered; called at exit"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self.flush()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span id, sampled) from a W3C traceparent header, or None if absent or malformed"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class Tracer:
+    """Starts spans for pipeline stages, deciding once per trace whether it is recorded.
+
+    A span opened with no span around it starts a trace, which is sampled
+    with probability sample_ratio; every span inside a sampled trace is
+    recorded and none inside an unsampled one. When tracing is off span()
+    returns a shared no-op, so instrumented code costs one call per stage.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter], sample_ratio: float = 1.0):
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.enabled = exporter is not None and sample_ratio > 0
+
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is not None:
+            if not parent.sampled:
+                return NOOP_SPAN
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            # A caller's traceparent continues its trace and carries its sampling decision
+            remote = parse_traceparent(traceparent)
+            if remote is not None:
+                trace_id, parent_id, sampled = remote
+            else:
+                trace_id, parent_id, sampled = f"{random.getrandbits(128):032x}", None, random.random() < self.sample_ratio
+            if not sampled:
+                return UnsampledRootSpan()
+        tracing_stats["started"] += 1
+        return Span(self, name, trace_id, parent_id, attributes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "exporter": self.exporter.target if self.exporter else None,
+            "sample_ratio": self.sample_ratio,
+            "buffered": len(self.exporter.buffer) if self.exporter else 0,
+            **tracing_stats
+        }
+
+
+def current_span():
+    """The innermost open span, for adding attributes (e.g. token counts) from deeper in the call"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def create_tracer() -> Tracer:
+    if settings.TRACE_EXPORTER not in ("stdout", "otlp"):
+        return Tracer(None, 0.0)
+    exporter = SpanExporter(settings.TRACE_EXPORTER, settings.TRACE_OTLP_ENDPOINT, settings.TRACE_SERVICE_NAME,
+                            settings.TRACE_MAX_BUFFER, settings.TRACE_EXPORT_INTERVAL_SECONDS)
+    exporter.start()
+    atexit.register(exporter.stop)
+    return Tracer(exporter, settings.TRACE_SAMPLE_RATIO)
+
+
+# Global instance
+tracer = create_tracer()
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+# Runs on the frame pool's threads or processes. Pool processes import this module on its own, so it imports
+# nothing from the API (no config, logging or clients) and loads OpenCV when the first job arrives
+
+# Maximum number of frames sampled from an uploaded or downloaded video
+MAX_SAMPLED_FRAMES = 10
+JPEG_QUALITY = 95
+
+Frame = Tuple[int, bytes]
+
+
+def warm_up():
+    import cv2
+    return cv2.__version__
+
+
+@contextmanager
+def open_video(path: str):
+    """An opened cv2.VideoCapture of the file, released however the block exits; ValueError if it cannot be read"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {path}")
+        yield cap
+    finally:
+        cap.release()
+
+
+def video_info(cap) -> Dict[str, Any]:
+    import cv2
+    return {"total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), "fps": cap.get(cv2.CAP_PROP_FPS)}
+
+
+def encode_frame_jpeg(frame, quality: int = JPEG_QUALITY) -> bytes:
+    """Encode a decoded BGR frame as JPEG bytes for the vision model"""
+    import cv2
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def read_sampled_frames(cap, max_frames: int = MAX_SAMPLED_FRAMES, quality: int = JPEG_QUALITY):
+    """Yield (frame_index, jpeg_bytes) for up to `max_frames` evenly spaced frames of an open capture"""
+    import cv2
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_interval = max(1, total_frames // max_frames)
+    for i in range(0, total_frames, frame_interval):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, frame = cap.read()
+        if ret:
+            yield i, encode_frame_jpeg(frame, quality)
+
+
+def sample_video(path: str, max_frames: int = MAX_SAMPLED_FRAMES, quality: int = JPEG_QUALITY) -> Tuple[Dict[str, Any], List[Frame]]:
+    """The video's frame count and fps, and its sampled frames as JPEG"""
+    with open_video(path) as cap:
+        return video_info(cap), list(read_sampled_frames(cap, max_frames, quality))
+
+
+def extract_frame(path: str, progress: float, quality: int = JPEG_QUALITY) -> Tuple[Dict[str, Any], List[Frame]]:
+    """The frame at `progress` (0-1) through the video as JPEG, falling back to one near the end if it cannot be read"""
+    import cv2
+    with open_video(path) as cap:
+        info = video_info(cap)
+        total_frames = info["total_frames"]
+        # Ensure we don't exceed video bounds
+        target_frame = min(int(total_frames * progress), total_frames - 1)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+        ret, frame = cap.read()
+        if not ret:
+            # Try to get the last available frame
+            target_frame = max(total_frames - 10, 0)
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+            ret, frame = cap.read()
+            if not ret:
+                raise ValueError(f"Could not read any frame near position {target_frame}")
+        return info, [(target_frame, encode_frame_jpeg(frame, quality))]
+
+
+def to_shared_memory(result: Tuple[Dict[str, Any], List[Frame]]) -> Tuple[Dict[str, Any], str, List[Tuple[int, int, int]]]:
+    """Copy a job's frames into one shared memory block; returns its name and each frame's (index, offset, length)"""
+    info, frames = result
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(len(jpeg) for _, jpeg in frames)))
+    layout, offset = [], 0
+    for index, jpeg in frames:
+        block.buf[offset:offset + len(jpeg)] = jpeg
+        layout.append((index, offset, len(jpeg)))
+        offset += len(jpeg)
+    # The parent unlinks the block once it has read the frames
+    block.close()
+    return info, block.name, layout
+
+
+def from_shared_memory(name: str, layout: List[Tuple[int, int, int]]) -> List[Frame]:
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return [(index, bytes(block.buf[offset:offset + length])) for index, offset, length in layout]
+    finally:
+        block.close()
+        block.unlink()
+
+
+def unlink_shared_memory(name: str):
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+def sample_video_shared(path: str, max_frames: int = MAX_SAMPLED_FRAMES, quality: int = JPEG_QUALITY):
+    return to_shared_memory(sample_video(path, max_frames, quality))
+
+
+def extract_frame_shared(path: str, progress: float, quality: int = JPEG_QUALITY):
+    return to_shared_memory(extract_frame(path, progress, quality))
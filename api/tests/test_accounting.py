@@ -0,0 +1,160 @@
+import io
+import struct
+import wave
+from types import SimpleNamespace
+import pytest
+
+import services.accounting as accounting
+from services.accounting import (
+    BudgetExceededError, UsageAccountant, audio_duration_seconds, estimate_audio_seconds, pricing_table
+)
+
+
+def wav_bytes(seconds: float, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def mp3_frame(bitrate_index: int, bitrate_kbps: int) -> bytes:
+    """An MPEG-1 Layer III frame at 44.1 kHz with a silent payload"""
+    header = bytes([0xFF, 0xFB, bitrate_index << 4, 0x00])
+    return header + b"\0" * (144 * bitrate_kbps * 1000 // 44100 - 4)
+
+
+def ebml(element_id: int, payload: bytes) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + bytes([0x80 | len(payload)]) + payload
+
+
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def test_wav_duration_is_exact():
+    assert audio_duration_seconds(wav_bytes(2.5)) == 2.5
+
+
+def test_vbr_mp3_duration_counts_frames():
+    # 100 frames at 128 kbps and 100 at 320 kbps: a nominal bitrate would misjudge the length
+    data = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\0" * 10 + mp3_frame(9, 128) * 100 + mp3_frame(14, 320) * 100
+    assert abs(audio_duration_seconds(data) - 200 * 1152 / 44100) < 1e-9
+
+
+def test_opus_duration_from_last_granule():
+    def page(granule: int, packet: bytes) -> bytes:
+        return b"OggS\x00\x02" + struct.pack("<qIIIB", granule, 1, 0, 0, 1) + bytes([len(packet)]) + packet
+
+    head = b"OpusHead" + bytes([1, 1]) + struct.pack("<HIhB", 312, 48000, 0, 0)
+    data = page(0, head) + page(48000 * 3 + 312, b"\0" * 10)
+    assert audio_duration_seconds(data) == 3.0
+
+
+def test_webm_duration_from_segment_info():
+    info = ebml(0x1549A966, ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big")) + ebml(0x4489, struct.pack(">f", 2500.0)))
+    data = ebml(0x1A45DFA3, b"\x42\x82\x84webm") + b"\x18\x53\x80\x67" + UNKNOWN_SIZE + info
+    assert audio_duration_seconds(data) == 2.5
+
+
+def test_webm_without_duration_uses_last_block():
+    # MediaRecorder writes no Duration and unknown-size Segment and Cluster elements
+    block = ebml(0xA3, b"\x81" + struct.pack(">h", 480) + b"\x80" + b"\0" * 8)
+    cluster = b"\x1f\x43\xb6\x75" + UNKNOWN_SIZE + ebml(0xE7, (2000).to_bytes(2, "big")) + block
+    data = ebml(0x1A45DFA3, b"\x42\x82\x84webm") + b"\x18\x53\x80\x67" + UNKNOWN_SIZE + cluster
+    assert audio_duration_seconds(data) == 2.48
+
+
+def test_m4a_duration_from_mvhd():
+    mvhd = b"mvhd" + b"\0" * 12 + struct.pack(">II", 1000, 4200) + b"\0" * 80
+    moov = struct.pack(">I", len(mvhd) + 8 + 4) + b"moov" + struct.pack(">I", len(mvhd) + 4) + mvhd
+    data = struct.pack(">I", 16) + b"ftypM4A \0\0\0\0" + moov
+    assert audio_duration_seconds(data) == 4.2
+
+
+def test_unparseable_audio_has_no_duration():
+    data = b"not audio at all" * 100
+    assert audio_duration_seconds(data) is None
+    assert estimate_audio_seconds(data) > 0
+
+
+class FakeTracker:
+    def __init__(self):
+        self.requests = []
+
+    def log_request(self, **kwargs):
+        self.requests.append(kwargs)
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    fake = FakeTracker()
+    monkeypatch.setattr(accounting, "simple_usage_tracker", fake)
+    return fake
+
+
+def chat_request(model="gpt-4o"):
+    return {"model": model, "messages": [{"role": "user", "content": [
+        {"type": "text", "text": "Summarise the meeting"},
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+    ]}]}
+
+
+def test_record_chat_costs_uncached_cached_and_completion_tokens(tracker):
+    accountant = UsageAccountant(pricing_table)
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=200,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=400))
+    cost = accountant.record_chat("analysis", "gpt-4o", usage, 12.0, meeting_id="m1")
+    # 600 uncached at $2.50/1M, 400 cached at $1.25/1M, 200 completion at $10/1M
+    assert cost == pytest.approx(0.004)
+    accountant.record_chat("analysis", "gpt-4o", usage, 12.0, meeting_id="m1")
+    assert accountant.get_meeting_spend() == {"m1": pytest.approx(0.008)}
+    assert tracker.requests[0]["tokens"] == 1200
+    assert tracker.requests[0]["pricing_version"] == pricing_table.version
+
+
+def test_record_audio_costs_by_duration(tracker):
+    accountant = UsageAccountant(pricing_table)
+    cost = accountant.record_audio("transcription", "whisper-1", 90, 50.0, meeting_id="m1", duration_estimated=True)
+    assert cost == pytest.approx(0.009)
+    assert tracker.requests[0]["audio_duration_estimated"] is True
+
+
+def test_budget_allows_then_downgrades_then_rejects(tracker):
+    accountant = UsageAccountant(pricing_table, meeting_budget_usd=1.0, downgrade_ratio=0.8)
+
+    request, decision = accountant.preflight_chat("m1", chat_request())
+    assert decision.action == "allow"
+    assert request["model"] == "gpt-4o"
+
+    accountant.meeting_spend["m1"] = 0.799
+    request, decision = accountant.preflight_chat("m1", chat_request())
+    assert decision.action == "downgrade"
+    assert request["model"] == "gpt-4o-mini"
+    assert request["messages"][0]["content"][1]["image_url"]["detail"] == "low"
+
+    accountant.meeting_spend["m1"] = 0.9999
+    with pytest.raises(BudgetExceededError):
+        accountant.preflight_chat("m1", chat_request())
+    # Other meetings have budgets of their own
+    assert accountant.preflight_chat("m2", chat_request())[1].action == "allow"
+
+
+def test_no_budget_cap_always_allows(tracker):
+    accountant = UsageAccountant(pricing_table, meeting_budget_usd=0.0)
+    accountant.meeting_spend["m1"] = 1000.0
+    assert accountant.preflight_chat("m1", chat_request())[1].action == "allow"
+    assert accountant.has_headroom("m1", 1.0)
+
+
+def test_audio_preflight_rejects_over_budget(tracker):
+    accountant = UsageAccountant(pricing_table, meeting_budget_usd=0.01)
+    seconds, estimated, decision = accountant.preflight_audio("m1", "whisper-1", wav_bytes(60))
+    assert seconds == pytest.approx(60) and not estimated
+    assert decision.estimated_cost == pytest.approx(0.006)
+
+    accountant.meeting_spend["m1"] = 0.005
+    assert not accountant.has_headroom("m1", 0.006)
+    with pytest.raises(BudgetExceededError):
+        accountant.preflight_audio("m1", "whisper-1", wav_bytes(60))
@@ -0,0 +1,100 @@
+import asyncio
+
+from services.cable_revisions import CableReviser, distribution_shift
+
+
+class FakeCableService:
+    """Records section agent calls; `fail` makes a section return the unparseable-output placeholder"""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = set()
+
+    async def generate_cable_section(self, section, analysis_json, meeting_id=None, previous=None, changes_json=None):
+        self.calls.append({"section": section, "previous": previous, "changes": changes_json})
+        if section in self.fail:
+            return {"error": "bad JSON"}
+        return {"section": section, "call": len(self.calls)}
+
+
+def state(risk="low", stress=0.2, emotions=None, cultures=("american",)):
+    return {
+        "facial": {"emotion_histogram": emotions or {"calm": 10}},
+        "audio": {"highest_risk_level": risk, "stress": {"mean": stress}},
+        "text": {"cultures": list(cultures)},
+        "flagged_moments": []
+    }
+
+
+def reviser(service, **kwargs):
+    return CableReviser(service, risk_shift=0.2, emotion_shift=0.25, history_size=5, full_refresh_every=10, max_meetings=10, **kwargs)
+
+
+def revise(cables, *args, **kwargs):
+    return asyncio.run(cables.revise("m1", *args, **kwargs))
+
+
+def test_distribution_shift():
+    assert distribution_shift({"calm": 5}, {"calm": 50}) == 0.0
+    assert distribution_shift({"calm": 5}, {"angry": 5}) == 1.0
+    assert distribution_shift({"calm": 3, "angry": 1}, {"calm": 1, "angry": 1}) == 0.25
+
+
+def test_small_changes_reuse_the_previous_cable():
+    service = FakeCableService()
+    cables = reviser(service)
+    assert revise(cables, state())["revision"]["mode"] == "full"
+    cable = revise(cables, state(stress=0.3, emotions={"calm": 11}))
+    assert cable["revision"]["unchanged"]
+    assert len(service.calls) == 3
+
+
+def test_risk_change_regenerates_risk_and_summary_only():
+    service = FakeCableService()
+    cables = reviser(service)
+    revise(cables, state())
+    cable = revise(cables, state(risk="high"))
+    assert cable["revision"]["mode"] == "delta"
+    assert cable["revision"]["reasons"] == {"risk": "risk_level_changed", "summary": "dependent_sections_changed"}
+    delta_calls = service.calls[3:]
+    assert {call["section"] for call in delta_calls} == {"risk", "summary"}
+    assert all(call["previous"] is not None for call in delta_calls)
+
+
+def test_stress_shift_threshold():
+    service = FakeCableService()
+    cables = reviser(service)
+    revise(cables, state(stress=0.2))
+    assert revise(cables, state(stress=0.39))["revision"].get("unchanged")
+    assert revise(cables, state(stress=0.45))["revision"]["reasons"]["risk"].startswith("stress_shift")
+
+
+def test_growing_client_context_is_revised_incrementally():
+    service = FakeCableService()
+    cables = reviser(service)
+    revise(cables, state(), {"transcript": "Opening remarks."})
+    cable = revise(cables, state(), {"transcript": "Opening remarks. We object."})
+    assert cable["revision"]["mode"] == "delta"
+    assert cable["revision"]["reasons"] == {"risk": "client_context_changed", "summary": "dependent_sections_changed"}
+    assert '"client_context"' in service.calls[-1]["changes"]
+
+
+def test_failed_section_is_regenerated_from_scratch():
+    service = FakeCableService()
+    service.fail = {"cultural"}
+    cables = reviser(service)
+    revise(cables, state())
+    service.fail = set()
+    cable = revise(cables, state())
+    assert cable["revision"]["reasons"]["cultural"] == "previous_section_failed"
+    cultural = [call for call in service.calls[3:] if call["section"] == "cultural"]
+    assert cultural[0]["previous"] is None
+    assert "error" not in cable["cultural_analysis"]
+
+
+def test_periodic_full_refresh():
+    service = FakeCableService()
+    cables = CableReviser(service, risk_shift=0.2, emotion_shift=0.25, history_size=5, full_refresh_every=2, max_meetings=10)
+    revise(cables, state())
+    assert revise(cables, state(risk="high"))["revision"]["mode"] == "delta"
+    assert revise(cables, state(risk="critical"))["revision"]["mode"] == "full"
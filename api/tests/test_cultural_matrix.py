@@ -0,0 +1,98 @@
+from itertools import combinations, permutations
+import pytest
+
+from services.cultural_engine import DEFAULT_CULTURAL_RULES, CulturalEngine, build_snapshot
+
+EXTRA_RULES = {
+    "korean": {"communication_style": "indirect", "directness_score": 0.25, "formality_level": "formal"},
+    "dutch": {"communication_style": "direct", "directness_score": 0.95, "formality_level": "informal"},
+    "brazilian": {"communication_style": "relational", "directness_score": 0.5, "formality_level": "semi-formal"},
+}
+
+
+def pairwise_analysis(rules, cultures):
+    """The original pair-by-pair loop the precomputed matrix replaced"""
+    profiles = [{"culture": c, **rules[c]} for c in (c.lower().strip() for c in cultures) if c in rules]
+    mismatches = []
+    for i, profile1 in enumerate(profiles):
+        for profile2 in profiles[i + 1:]:
+            gap = abs(profile1["directness_score"] - profile2["directness_score"])
+            if gap > 0.4:
+                mismatches.append({
+                    "type": "communication_style",
+                    "cultures": f"{profile1['culture']} vs {profile2['culture']}",
+                    "issue": f"Significant directness gap: {profile1['communication_style']} vs {profile2['communication_style']}",
+                    "severity": "high" if gap > 0.6 else "medium"
+                })
+            if profile1["formality_level"] != profile2["formality_level"]:
+                mismatches.append({
+                    "type": "formality",
+                    "cultures": f"{profile1['culture']} vs {profile2['culture']}",
+                    "issue": f"Formality mismatch: {profile1['formality_level']} vs {profile2['formality_level']}",
+                    "severity": "medium"
+                })
+
+    recommendations = []
+    if not mismatches:
+        recommendations.append("Cultural alignment appears good - maintain current communication approach")
+    else:
+        for mismatch in mismatches:
+            if mismatch["type"] == "communication_style":
+                if "direct" in mismatch["issue"] and "indirect" in mismatch["issue"]:
+                    recommendations.append("Bridge communication styles: Use clear statements followed by diplomatic softening")
+                    recommendations.append("Allow extra time for indirect communicators to process and respond")
+            elif mismatch["type"] == "formality":
+                recommendations.append("Adapt formality level: Err on the side of more formal communication")
+                recommendations.append("Use titles and respectful address until informality is explicitly established")
+        present = [p["culture"] for p in profiles]
+        if "japanese" in present or "chinese" in present:
+            recommendations.append("Allow for face-saving opportunities and avoid direct confrontation")
+        if "german" in present:
+            recommendations.append("Provide detailed documentation and structured agenda")
+        if "american" in present and any(c in ["japanese", "chinese"] for c in present):
+            recommendations.append("Americans: Slow down decision-making pace; Asians: Be more explicit about concerns")
+
+    scores = [p["directness_score"] for p in profiles]
+    levels = {p["formality_level"] for p in profiles}
+    return {
+        "cultural_profiles": profiles,
+        "potential_mismatches": mismatches,
+        "recommendations": recommendations,
+        "directness_gap": max(scores) - min(scores),
+        "levels_present": levels,
+        "aligned": len(levels) == 1,
+    }
+
+
+def queries(cultures):
+    yield from permutations(cultures, 2)
+    yield from combinations(cultures, 3)
+    yield from combinations(cultures, 5)
+    yield tuple(cultures)
+    yield ("Japanese ", "american", "japanese", "martian")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = CulturalEngine(cache_path=str(tmp_path / "rules.json"))
+    engine.snapshot = build_snapshot("test", {**DEFAULT_CULTURAL_RULES, **EXTRA_RULES}, "test")
+    return engine
+
+
+def test_matrix_matches_pairwise_loop(engine):
+    rules = engine.cultural_rules
+    for cultures in queries(sorted(rules)):
+        expected = pairwise_analysis(rules, cultures)
+        result = engine.analyze_cultural_context(list(cultures))
+        assert result["cultural_profiles"] == expected["cultural_profiles"]
+        assert result["potential_mismatches"] == expected["potential_mismatches"], cultures
+        assert result["recommendations"] == expected["recommendations"], cultures
+        assert result["directness_gap"] == pytest.approx(expected["directness_gap"])
+        assert set(result["formality_alignment"]["levels_present"]) == expected["levels_present"]
+        assert result["formality_alignment"]["aligned"] == expected["aligned"]
+
+
+def test_fewer_than_two_known_cultures(engine):
+    result = engine.analyze_cultural_context(["german", "martian"])
+    assert [p["culture"] for p in result["cultural_profiles"]] == ["german"]
+    assert result["potential_mismatches"] == []
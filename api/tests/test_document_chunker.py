@@ -0,0 +1,62 @@
+from services.document_chunker import CHARS_PER_TOKEN, merge_news_analyses, split_into_chunks
+
+
+def test_paragraphs_are_packed_within_the_budget():
+    paragraphs = [f"Paragraph {i}. " + "word " * 30 for i in range(10)]
+    chunks = split_into_chunks("\n\n".join(paragraphs), max_tokens=100)
+    assert len(chunks) > 1
+    assert all(len(chunk) // CHARS_PER_TOKEN <= 100 for chunk in chunks)
+    # Paragraphs are kept whole and in order
+    assert "\n\n".join(chunks).split("\n\n") == [p.strip() for p in paragraphs]
+
+
+def test_oversized_paragraph_is_split_on_sentences():
+    paragraph = " ".join(f"Sentence number {i} is here." for i in range(50))
+    chunks = split_into_chunks(paragraph, max_tokens=40)
+    assert all(len(chunk) // CHARS_PER_TOKEN <= 40 for chunk in chunks)
+    assert " ".join(chunks).split() == paragraph.split()
+
+
+def test_editing_one_paragraph_changes_only_its_chunk():
+    paragraphs = ["word " * 30 + str(i) for i in range(8)]
+    before = split_into_chunks("\n\n".join(paragraphs), max_tokens=80)
+    paragraphs[5] = paragraphs[5].replace("word", "term", 1)
+    after = split_into_chunks("\n\n".join(paragraphs), max_tokens=80)
+    assert sum(a != b for a, b in zip(before, after)) == 1
+
+
+def test_merge_reduces_chunk_analyses():
+    merged = merge_news_analyses([
+        {
+            "diplomatic_overview": "First.",
+            "risk_level": "medium",
+            "key_entities": ["UN", "France"],
+            "strategic_recommendations": ["Engage early"],
+            "sentiment_analysis": {"overall_sentiment": "negative", "confidence": 0.8},
+            "geopolitical_implications": ["Regional tension"]
+        },
+        {
+            "diplomatic_overview": "Second.",
+            "risk_level": "High",
+            "key_entities": ["france", "Germany"],
+            "strategic_recommendations": ["engage early ", "Monitor"],
+            "sentiment_analysis": {"overall_sentiment": "neutral", "confidence": 0.6},
+            "geopolitical_implications": ["Regional tension"]
+        },
+    ], weights=[1, 3])
+    assert merged["diplomatic_overview"] == "First. Second."
+    assert merged["risk_level"] == "high"
+    assert merged["key_entities"] == ["France", "UN", "Germany"]
+    assert merged["strategic_recommendations"] == ["Engage early", "Monitor"]
+    assert merged["geopolitical_implications"] == ["Regional tension"]
+    assert merged["sentiment_analysis"] == {"overall_sentiment": "neutral", "confidence": 0.65}
+
+
+def test_merge_treats_string_fields_as_single_items():
+    merged = merge_news_analyses([
+        {"key_entities": "NATO", "strategic_recommendations": "Hold talks", "geopolitical_implications": None},
+        {"key_entities": ["NATO"], "strategic_recommendations": ["Hold talks"], "geopolitical_implications": "Shift"},
+    ], weights=[1, 1])
+    assert merged["key_entities"] == ["NATO"]
+    assert merged["strategic_recommendations"] == ["Hold talks"]
+    assert merged["geopolitical_implications"] == ["Shift"]
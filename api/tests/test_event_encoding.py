@@ -0,0 +1,90 @@
+import asyncio
+import json
+import pytest
+
+from services.event_stream import ConnectionManager, EventEncoder, merge_patch
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        self.messages.append(json.loads(message))
+
+
+def apply_patch(target, patch):
+    """RFC 7396 application, to check that patches reproduce the new document"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_patch(result.get(key), value)
+    return result
+
+
+@pytest.mark.parametrize("old, new, patch", [
+    ({"a": 1, "b": 2}, {"a": 1, "b": 3}, {"b": 3}),
+    ({"a": 1, "b": 2}, {"a": 1}, {"b": None}),
+    ({"a": 1}, {"a": 1, "c": [1, 2]}, {"c": [1, 2]}),
+    ({"a": {"x": 1, "y": 2}}, {"a": {"x": 1, "y": 5}}, {"a": {"y": 5}}),
+    ({"a": [1, 2]}, {"a": [1, 3]}, {"a": [1, 3]}),
+    ({"a": {"x": 1}}, {"a": 7}, {"a": 7}),
+    ({"a": 1}, {"a": 1}, {}),
+])
+def test_merge_patch(old, new, patch):
+    assert merge_patch(old, new) == patch
+    assert apply_patch(old, patch) == new
+
+
+def test_delta_encoder_sends_patches_per_event_type():
+    encoder = EventEncoder(delta=True)
+    first = json.loads(encoder.encode({"type": "progress", "meeting_id": "m1", "data": {"frame": 1, "total": 10}}))
+    assert first == {"type": "progress", "data": {"frame": 1, "total": 10}}
+    second = json.loads(encoder.encode({"type": "progress", "meeting_id": "m1", "data": {"frame": 2, "total": 10}}))
+    assert second == {"type": "progress", "patch": {"frame": 2}}
+    other = json.loads(encoder.encode({"type": "done", "meeting_id": "m1", "data": {"frame": 2}}))
+    assert other == {"type": "done", "data": {"frame": 2}}
+
+
+def update(frame):
+    return {"type": "facial_analysis_update", "meeting_id": "m1", "data": {"frame": frame}}
+
+
+def test_coalescing_sends_only_the_latest_update_per_window():
+    manager = ConnectionManager(buffer_size=50)
+    websocket = FakeWebSocket()
+
+    async def run():
+        await manager.connect(websocket, "m1", encoder=EventEncoder(coalesce_ms=50))
+        for frame in range(1, 5):
+            await manager.broadcast(update(frame))
+        # The first goes out at once; of the rest only the latest is held back
+        assert [m["data"]["frame"] for m in websocket.messages] == [1]
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert [m["data"]["frame"] for m in websocket.messages] == [1, 4]
+    assert manager.stats["coalesced"] == 2
+
+
+def test_other_events_flush_the_held_update_first():
+    manager = ConnectionManager(buffer_size=50)
+    websocket = FakeWebSocket()
+
+    async def run():
+        await manager.connect(websocket, "m1", encoder=EventEncoder(coalesce_ms=1000))
+        await manager.broadcast(update(1))
+        await manager.broadcast(update(2))
+        await manager.broadcast({"type": "video_analysis_complete", "meeting_id": "m1", "data": {"frames": 2}})
+
+    asyncio.run(run())
+    assert [(m["type"], m["seq"]) for m in websocket.messages] == [
+        ("facial_analysis_update", 1), ("facial_analysis_update", 2), ("video_analysis_complete", 3)
+    ]
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+from services.event_stream import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.messages.append(json.loads(message))
+
+    async def send_bytes(self, message):
+        await self.send_text(message.decode())
+
+    async def close(self, code=1000):
+        pass
+
+
+def event(i, meeting_id="m1"):
+    return {"type": "text_analysis", "meeting_id": meeting_id, "data": {"i": i}}
+
+
+def reconnect(manager, last_seq, meeting_id="m1"):
+    websocket = FakeWebSocket()
+    asyncio.run(manager.connect(websocket, meeting_id, last_seq=last_seq))
+    return websocket.messages
+
+
+def broadcast_all(manager, count, meeting_id="m1"):
+    async def run():
+        for i in range(count):
+            await manager.broadcast(event(i, meeting_id))
+    asyncio.run(run())
+
+
+def test_reconnect_replays_only_missed_events():
+    manager = ConnectionManager(buffer_size=10)
+    broadcast_all(manager, 3)
+    messages = reconnect(manager, last_seq=1)
+    assert [m.get("seq") for m in messages[:-1]] == [2, 3]
+    assert messages[-1] == {"type": "replay_complete", "meeting_id": "m1", "replayed": 2, "last_seq": 3}
+    assert manager.stats["incomplete_replays"] == 0
+
+
+def test_gap_older_than_the_buffer_is_reported():
+    manager = ConnectionManager(buffer_size=3)
+    broadcast_all(manager, 5)
+    messages = reconnect(manager, last_seq=0)
+    assert messages[0] == {
+        "type": "replay_incomplete", "meeting_id": "m1", "requested_from": 1, "oldest_seq": 3, "last_seq": 5
+    }
+    assert [m.get("seq") for m in messages[1:-1]] == [3, 4, 5]
+    assert messages[-1]["type"] == "replay_complete"
+    assert manager.stats["incomplete_replays"] == 1
+
+
+def test_gap_ending_at_the_oldest_buffered_event_is_complete():
+    manager = ConnectionManager(buffer_size=3)
+    broadcast_all(manager, 5)
+    messages = reconnect(manager, last_seq=2)
+    assert [m["type"] for m in messages] == ["text_analysis"] * 3 + ["replay_complete"]
+
+
+def test_sequence_from_before_a_restart_is_incomplete():
+    manager = ConnectionManager(buffer_size=10)
+    broadcast_all(manager, 2)
+    messages = reconnect(manager, last_seq=40)
+    assert messages[0]["type"] == "replay_incomplete"
+    assert messages[-1] == {"type": "replay_complete", "meeting_id": "m1", "replayed": 0, "last_seq": 2}
+
+
+def test_sequences_are_per_meeting():
+    manager = ConnectionManager(buffer_size=10)
+    broadcast_all(manager, 3, "m1")
+    broadcast_all(manager, 1, "m2")
+    assert [m.get("seq") for m in reconnect(manager, last_seq=0, meeting_id="m2")] == [1, None]
+
+
+def test_dead_socket_is_dropped_on_broadcast():
+    manager = ConnectionManager(buffer_size=10)
+
+    async def run():
+        await manager.connect(FakeWebSocket(fail=True), "m1")
+        return await manager.broadcast(event(0))
+
+    assert asyncio.run(run()) == 1
+    assert manager.stats["dropped_connections"] == 1
+    assert manager.get_stats()["connections"] == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from services.cultural_engine import CulturalEngine
+from services.lexicon_matcher import LexiconMatcher, build_pattern
+
+CATEGORIES = {
+    "criticism": {"terms": ["no", "not", "bad idea"]},
+    "pressure": {"terms": ["now", "urgent"]},
+}
+
+
+def terms(text):
+    return [(hit["category"], hit["term"]) for hit in LexiconMatcher(CATEGORIES).find_all(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("no", [("criticism", "no")]),
+    ("now", [("pressure", "now")]),
+    ("not", [("criticism", "not")]),
+    ("note", []),
+    ("know", []),
+    ("nobody", []),
+    ("no-go", [("criticism", "no")]),
+    ("No, not now!", [("criticism", "no"), ("criticism", "not"), ("pressure", "now")]),
+])
+def test_terms_sharing_a_prefix_match_only_whole_words(text, expected):
+    assert terms(text) == expected
+
+
+def test_multi_word_term_matches_any_whitespace_and_case():
+    hits = LexiconMatcher(CATEGORIES).find_all("That is a BAD\n  idea.")
+    assert [(hit["term"], hit["start"], hit["end"]) for hit in hits] == [("bad idea", 10, 20)]
+
+
+def test_multi_word_term_needs_its_boundaries():
+    assert terms("a bad ideas list") == []
+    assert terms("abad idea") == []
+
+
+def test_build_pattern_escapes_regex_characters():
+    pattern = build_pattern(["a.s.a.p", "c++"])
+    assert pattern.search("reply a.s.a.p please")
+    assert not pattern.search("reply axsxaxp please")
+    assert pattern.fullmatch("C++")
+
+
+def test_engine_flags_only_whole_words_for_sensitive_cultures(tmp_path):
+    engine = CulturalEngine(cache_path=str(tmp_path / "rules.json"))
+    flags = engine.flag_cultural_issues_in_text("I know this is wrong, we need it now", ["japanese"])
+    matches = {flag["type"]: [m["term"] for m in flag["matches"]] for flag in flags}
+    assert matches == {"direct_criticism": ["wrong"]}
+    assert engine.flag_cultural_issues_in_text("This is wrong", ["american"]) == []
+
+
+def test_batch_flags_match_single_text_flags(tmp_path):
+    engine = CulturalEngine(cache_path=str(tmp_path / "rules.json"))
+    texts = ["No mistake here", "urgent: deadline today", "nothing to see", "a bad\nidea"]
+    cultures = [["japanese"], ["arab"], ["chinese"], ["korean"]]
+    assert engine.flag_cultural_issues_batch(texts, cultures) == [
+        engine.flag_cultural_issues_in_text(text, c) for text, c in zip(texts, cultures)
+    ]
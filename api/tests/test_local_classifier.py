@@ -0,0 +1,59 @@
+from services.local_classifier import local_classifier
+
+
+def test_courtesy_formula_alone_is_answered_locally():
+    decision = local_classifier.classify("Thank you, Mr. Chairman.")
+    assert not decision.escalate
+    assert decision.result["sentiment"] == "neutral"
+    assert decision.result["analysis_tier"] == "local"
+    assert decision.confidence == 0.9
+
+
+def test_thank_you_very_much_is_answered_locally():
+    decision = local_classifier.classify("Thank you very much.")
+    assert not decision.escalate
+    assert decision.result["sentiment"] == "neutral"
+
+
+def test_courtesy_before_substantive_text_goes_to_the_model():
+    decision = local_classifier.classify("Thank you, Mr. Chairman. We will attack at dawn.")
+    assert decision.escalate
+    assert decision.reason == "low_confidence"
+    assert decision.confidence == 0.7
+
+
+def test_rejection_goes_to_the_model():
+    decision = local_classifier.classify("We strongly reject this unacceptable proposal and demand changes.")
+    assert decision.escalate
+    assert decision.reason == "sentiment_language"
+
+
+def test_support_goes_to_the_model():
+    decision = local_classifier.classify("We welcome and support this constructive agreement.")
+    assert decision.escalate
+    assert decision.reason == "sentiment_language"
+
+
+def test_negated_sentiment_goes_to_the_model():
+    decision = local_classifier.classify("We do not support the resolution.")
+    assert decision.escalate
+    assert decision.reason == "negation"
+
+
+def test_escalation_language_goes_to_the_model():
+    decision = local_classifier.classify("Thank you. Further sanctions will follow.")
+    assert decision.escalate
+    assert decision.reason == "escalation_language"
+
+
+def test_long_text_goes_to_the_model():
+    decision = local_classifier.classify("Thank you, Mr. Chairman. " * 40)
+    assert decision.escalate
+    assert decision.reason == "too_long"
+
+
+def test_terms_match_whole_words_only():
+    # "no" and "not" must not match inside "now" or "nothing"; "war" not inside "toward"
+    assert local_classifier.matcher.find_all("We know now is the moment to move toward nothing less.") == []
+    decision = local_classifier.classify("We now support the proposal.")
+    assert decision.reason == "sentiment_language"
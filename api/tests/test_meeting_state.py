@@ -0,0 +1,46 @@
+from services.meeting_state import MeetingState, MeetingStateStore
+
+TEXT_RESULT = {"sentiment": "neutral", "polarity": 0.1}
+
+
+def test_least_recently_updated_meeting_is_evicted():
+    store = MeetingStateStore(max_meetings=2)
+    store.fold("m1", "text", TEXT_RESULT)
+    store.fold("m2", "text", TEXT_RESULT)
+    # Touching m1 makes m2 the least recently used
+    store.fold("m1", "text", TEXT_RESULT)
+    store.fold("m3", "text", TEXT_RESULT)
+    assert list(store.meetings) == ["m1", "m3"]
+    assert store.get("m1").counts == {"text": 2}
+
+
+def test_idle_meetings_are_evicted():
+    store = MeetingStateStore(max_meetings=10, idle_ttl_seconds=60)
+    store.fold("idle", "text", TEXT_RESULT)
+    store.fold("active", "text", TEXT_RESULT)
+    store.get("idle").updated_at -= 120
+    # Idle meetings go on the next fold, whichever meeting it is for
+    store.fold("active", "text", TEXT_RESULT)
+    assert store.get("idle") is None
+    assert store.summary("idle") is None
+    assert [m["meeting_id"] for m in store.list_meetings()] == ["active"]
+
+
+def test_fold_without_meeting_id_is_ignored():
+    store = MeetingStateStore()
+    store.fold("", "text", TEXT_RESULT)
+    assert store.meetings == {}
+
+
+def test_state_stays_bounded():
+    state = MeetingState("m1", trend_points=3, max_moments=2, max_excerpts=2, max_labels=2)
+    for i in range(10):
+        state.fold("audio", {
+            "transcript": f"excerpt {i}",
+            "emotion_analysis": {"tone": f"tone-{i}", "stress_level": 0.9, "diplomatic_risk_level": "low"},
+        })
+    assert len(state.stress_trend) == 3
+    assert len(state.flagged_moments) == 2
+    assert list(state.transcript_excerpts) == ["excerpt 8", "excerpt 9"]
+    assert state.tones == {"tone-0": 1, "tone-1": 1}
+    assert state.stress.count == 10
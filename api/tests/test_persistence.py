@@ -0,0 +1,75 @@
+import asyncio
+import httpx
+from postgrest.exceptions import APIError
+
+from services.persistence import WriteBehindQueue
+
+
+class FakeStore:
+    """Rejects any batch holding a row without a meeting_id, like a NOT NULL violation"""
+
+    def __init__(self, transient_failures=0):
+        self.transient_failures = transient_failures
+        self.calls = 0
+        self.inserted = []
+
+    async def insert_rows(self, table, rows):
+        self.calls += 1
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise httpx.ConnectError("connection refused")
+        if any(row.get("meeting_id") is None for row in rows):
+            raise APIError({"code": "23502", "message": "null value in column \"meeting_id\""})
+        self.inserted.extend(rows)
+
+
+def make_queue(store, **kwargs):
+    queue = WriteBehindQueue(retry_base_delay=0, **kwargs)
+    queue.store = store
+    return queue
+
+
+def test_rejected_row_is_dead_lettered_alone():
+    store = FakeStore()
+    queue = make_queue(store)
+    rows = [{"meeting_id": str(i)} for i in range(8)]
+    rows[5] = {"meeting_id": None}
+    asyncio.run(queue._write("analyses", rows))
+    assert len(store.inserted) == 7
+    assert list(queue.dead_letters) == [("analyses", {"meeting_id": None})]
+    assert queue.stats["retries"] == 0
+    assert queue.stats["rejected"] == 1
+    assert queue.stats["failed"] == 1
+    assert queue.stats["written"] == 7
+
+
+def test_request_rejection_is_not_retried_or_split():
+    class MissingColumnStore(FakeStore):
+        async def insert_rows(self, table, rows):
+            self.calls += 1
+            raise APIError({"code": "PGRST204", "message": "Could not find the 'x' column"})
+
+    store = MissingColumnStore()
+    queue = make_queue(store)
+    asyncio.run(queue._write("analyses", [{"meeting_id": "1"}, {"meeting_id": "2"}]))
+    assert store.calls == 1
+    assert len(queue.dead_letters) == 2
+    assert queue.stats["splits"] == 0
+
+
+def test_transient_error_is_retried():
+    store = FakeStore(transient_failures=2)
+    queue = make_queue(store)
+    asyncio.run(queue._write("analyses", [{"meeting_id": "1"}]))
+    assert store.inserted == [{"meeting_id": "1"}]
+    assert queue.stats["retries"] == 2
+    assert not queue.dead_letters
+
+
+def test_transient_error_gives_up_after_max_retries():
+    store = FakeStore(transient_failures=10)
+    queue = make_queue(store, max_retries=3)
+    asyncio.run(queue._write("analyses", [{"meeting_id": "1"}, {"meeting_id": "2"}]))
+    assert store.calls == 3
+    assert len(queue.dead_letters) == 2
+    assert queue.stats["rejected"] == 0
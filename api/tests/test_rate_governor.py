@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+
+from services.rate_governor import RateGovernor, RateLimitedError
+
+UNLIMITED = (0, 0, 0)
+
+
+def test_latency_critical_request_is_shed_at_the_limit():
+    governor = RateGovernor(meeting_limits=(2, 0, 0), model_limits=UNLIMITED)
+    for _ in range(2):
+        assert asyncio.run(governor.admit("m1", "gpt-4o", 100, 0.01, latency_critical=True)) == "gpt-4o"
+    with pytest.raises(RateLimitedError):
+        asyncio.run(governor.admit("m1", "gpt-4o", 100, 0.01, latency_critical=True))
+    state = governor.get_state()["meetings"]["m1"]
+    assert state["admitted"] == 2
+    assert state["shed"] == 1
+    # The limit is per meeting
+    assert asyncio.run(governor.admit("m2", "gpt-4o", 100, 0.01, latency_critical=True)) == "gpt-4o"
+
+
+def test_over_limit_model_degrades_to_fallback():
+    governor = RateGovernor(meeting_limits=UNLIMITED, model_limits=(1, 0, 0))
+    assert asyncio.run(governor.admit("m1", "gpt-4o", 100, 0.01)) == "gpt-4o"
+    model = asyncio.run(governor.admit("m1", "gpt-4o", 100, 0.01, latency_critical=True,
+                                       degraded=("gpt-4o-mini", 100, 0.001)))
+    assert model == "gpt-4o-mini"
+    assert governor.get_state()["meetings"]["m1"]["degraded"] == 1
+
+
+def test_queued_request_is_admitted_after_refill():
+    # 60 tokens a minute refills one token a second
+    governor = RateGovernor(meeting_limits=(0, 60, 0), model_limits=UNLIMITED, queue_deadline_seconds=1.0)
+    asyncio.run(governor.admit("m1", "gpt-4o", 60, 0.0))
+    assert asyncio.run(governor.admit("m1", "gpt-4o", 0.05, 0.0)) == "gpt-4o"
+    assert governor.get_state()["meetings"]["m1"]["queued"] == 1
+
+
+def test_request_past_the_queue_deadline_is_shed():
+    governor = RateGovernor(meeting_limits=(0, 60, 0), model_limits=UNLIMITED, queue_deadline_seconds=0.01)
+    asyncio.run(governor.admit("m1", "gpt-4o", 60, 0.0))
+    with pytest.raises(RateLimitedError):
+        asyncio.run(governor.admit("m1", "gpt-4o", 30, 0.0))
+
+
+def test_try_admit_never_waits_or_sheds():
+    governor = RateGovernor(meeting_limits=(1, 0, 0), model_limits=UNLIMITED)
+    assert governor.try_admit("m1", "gpt-4o", 100, 0.01)
+    assert not governor.try_admit("m1", "gpt-4o", 100, 0.01)
+    state = governor.get_state()["meetings"]["m1"]
+    assert state["admitted"] == 1
+    assert state["shed"] == 0
+
+
+def test_settle_charges_the_difference_to_actual_usage():
+    governor = RateGovernor(meeting_limits=(0, 6000, 0), model_limits=(0, 6000, 0))
+    asyncio.run(governor.admit("m1", "gpt-4o", 100, 0.0))
+    governor.settle("m1", "gpt-4o", estimated_tokens=100, actual_tokens=2500, estimated_cost=0.0, actual_cost=0.0)
+    state = governor.get_state()
+    # 100 tokens a second refill, so allow for the time the test takes
+    assert state["meetings"]["m1"]["tokens_per_minute"]["available"] == pytest.approx(3500, abs=10)
+    assert state["models"]["gpt-4o"]["tokens_per_minute"]["available"] == pytest.approx(3500, abs=10)
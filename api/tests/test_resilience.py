@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import httpx
+import openai
+import pytest
+
+from services.resilience import CircuitOpenError, ResilientCaller
+
+
+def status_error(cls, status_code):
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return cls("upstream error", response=response, body=None)
+
+
+def raiser(error):
+    def fn():
+        raise error
+    return fn
+
+
+def open_breaker(caller, model="gpt-4o"):
+    """Trip the model's breaker"""
+    # With retries, the attempt after the failure is short-circuited
+    with pytest.raises((openai.InternalServerError, CircuitOpenError)):
+        asyncio.run(caller.call(model, raiser(status_error(openai.InternalServerError, 500))))
+    assert caller.breaker(model).state == "open"
+
+
+def test_rate_limited_trial_stays_half_open():
+    caller = ResilientCaller(max_attempts=1, failure_threshold=1, reset_seconds=60)
+    open_breaker(caller)
+    caller.breaker("gpt-4o").opened_at -= 60
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(caller.call("gpt-4o", raiser(status_error(openai.RateLimitError, 429))))
+    # A 429 is backpressure, not a failure: the breaker neither re-opens nor keeps the trial slot
+    assert caller.breaker("gpt-4o").state == "half_open"
+    assert not caller.breaker("gpt-4o").trial_in_flight
+
+    assert asyncio.run(caller.call("gpt-4o", lambda: "ok")) == "ok"
+    assert caller.breaker("gpt-4o").state == "closed"
+
+
+def test_rate_limited_trial_is_retried_not_short_circuited():
+    caller = ResilientCaller(max_attempts=2, base_delay=0.01, failure_threshold=1, reset_seconds=60)
+    open_breaker(caller)
+    caller.breaker("gpt-4o").opened_at -= 60
+    responses = [status_error(openai.RateLimitError, 429)]
+
+    def fn():
+        if responses:
+            raise responses.pop()
+        return "ok"
+
+    retries = caller.stats["retries"]
+    assert asyncio.run(caller.call("gpt-4o", fn)) == "ok"
+    assert caller.stats["retries"] == retries + 1
+
+
+def test_cancelled_trial_releases_breaker():
+    caller = ResilientCaller(max_attempts=1, failure_threshold=1, reset_seconds=60)
+    open_breaker(caller)
+    caller.breaker("gpt-4o").opened_at -= 60
+    release = threading.Event()
+
+    async def cancel_trial():
+        task = asyncio.create_task(caller.call("gpt-4o", release.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()
+
+    asyncio.run(cancel_trial())
+    assert caller.breaker("gpt-4o").state == "half_open"
+    assert asyncio.run(caller.call("gpt-4o", lambda: "ok")) == "ok"
+
+
+def test_open_breaker_short_circuits():
+    caller = ResilientCaller(max_attempts=1, failure_threshold=1, reset_seconds=60)
+    open_breaker(caller)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller.call("gpt-4o", lambda: "ok"))
+
+
+def slow_then_fast():
+    """First call answers after 0.3s, later calls at once"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            threading.Event().wait(0.3)
+            return "slow"
+        return "fast"
+    return fn, calls
+
+
+def test_hedge_skipped_without_headroom():
+    caller = ResilientCaller(hedge_delay_seconds=0.05)
+    fn, calls = slow_then_fast()
+    result = asyncio.run(caller.call("gpt-4o", fn, hedge=True, admit_hedge=lambda: False))
+    assert result == "slow"
+    assert len(calls) == 1
+    assert caller.stats["hedges_skipped"] == 1
+
+
+def test_losing_hedge_is_reported_when_it_completes():
+    caller = ResilientCaller(hedge_delay_seconds=0.05)
+    fn, calls = slow_then_fast()
+    abandoned = []
+
+    async def hedged():
+        result = await caller.call("gpt-4o", fn, hedge=True, admit_hedge=lambda: True, on_abandoned=abandoned.append)
+        # Let the losing request finish in its thread
+        await asyncio.sleep(0.5)
+        return result
+
+    assert asyncio.run(hedged()) == "fast"
+    assert len(calls) == 2
+    assert abandoned == ["slow"]
+    assert caller.stats["hedge_wins"] == 1
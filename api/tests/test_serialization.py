@@ -0,0 +1,48 @@
+import json
+import pytest
+
+from services.serialization import Encoded, dumps, get_serialization_stats, serialized_size, unwrap
+
+RESULT = {"emotions": [{"emotion": "calm", "confidence": 0.9}], "frame": 3, "note": "café \"quoted\""}
+
+
+@pytest.mark.parametrize("envelope", [
+    {"type": "facial_analysis_update", "meeting_id": "m1", "data": Encoded(RESULT)},
+    {"data": Encoded(RESULT)},
+    {"first": Encoded(RESULT), "type": "x", "second": Encoded([1, 2])},
+    {'key "with" quotes': Encoded(RESULT), 7: "non-string key"},
+])
+def test_spliced_output_equals_plain_encoding(envelope):
+    plain = {str(key): unwrap(value) for key, value in envelope.items()}
+    assert json.loads(dumps(envelope)) == plain
+
+
+def test_encoded_value_is_serialized_once_and_reused():
+    payload = Encoded(RESULT)
+    before = get_serialization_stats()
+    first = dumps({"type": "event", "data": payload})
+    second = dumps({"success": True, "result": payload})
+    after = get_serialization_stats()
+    assert after["encodes"] - before["encodes"] == 1
+    assert after["reuses"] - before["reuses"] == 1
+    assert payload.bytes in first and payload.bytes in second
+
+
+def test_spliced_bytes_are_the_cached_encoding():
+    payload = Encoded({"n": 1})
+    dumps({"data": payload})
+    # The wrapper is treated as immutable once encoded
+    payload.value["n"] = 2
+    assert json.loads(dumps({"data": payload})) == {"data": {"n": 1}}
+
+
+def test_nested_encoded_value_is_encoded_inline():
+    envelope = {"outer": {"inner": Encoded([1, 2])}}
+    assert json.loads(dumps(envelope)) == {"outer": {"inner": [1, 2]}}
+
+
+def test_top_level_encoded_and_size():
+    payload = Encoded(RESULT)
+    assert dumps(payload) == payload.bytes
+    assert serialized_size(payload) == len(payload.bytes)
+    assert serialized_size({"a": 1}) == len(b'{"a":1}')
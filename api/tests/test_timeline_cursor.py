@@ -0,0 +1,28 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+
+from services.supabase_service import SupabaseService, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    timestamp = "2026-03-01T12:00:00.123456+00:00"
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+
+def test_cursor_from_a_row_timestamp_round_trips():
+    row = SupabaseService.analysis_row("meeting-1", "sentiment", {"score": 0.2})
+    assert datetime.fromisoformat(row["timestamp"]).utcoffset() is not None
+    assert decode_cursor(encode_cursor(row["timestamp"], 7)) == (row["timestamp"], 7)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    base64.urlsafe_b64encode(b"{}").decode(),
+    base64.urlsafe_b64encode(json.dumps(["yesterday", 1]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(["2026-03-01T12:00:00", "x"]).encode()).decode(),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)